@@ -4,7 +4,21 @@ import sys
 
 # Use absolute import for the utils module
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from utils.google_llm import create_google_llm
+from utils.llm_providers import create_llm
+from utils.local_embeddings import create_embeddings
+
+STREAM_PROMPT = """You are a study assistant. Use the following pieces of context from the
+student's material to answer the question at the end. If you don't know the answer,
+say that you don't know; don't try to make one up.
+
+Context:
+{context}
+
+Conversation so far:
+{history}
+
+Question: {question}
+Helpful answer:"""
 
 
 class ChatAgent:
@@ -17,21 +31,20 @@ class ChatAgent:
     def _ensure_llm_and_embeddings(self):
         # Initialize llm and embeddings if they weren't provided.
         try:
-            from langchain_openai import OpenAIEmbeddings
             from langchain_openai import ChatOpenAI
         except Exception:
-            OpenAIEmbeddings = None
             ChatOpenAI = None
 
         if self.embeddings is None:
-            if OpenAIEmbeddings is not None:
-                self.embeddings = OpenAIEmbeddings()
-            else:
+            # Provider follows EMBEDDINGS_PROVIDER, so local deployments stay offline
+            try:
+                self.embeddings = create_embeddings()
+            except Exception:
                 self.embeddings = None
 
         if self.llm is None:
             if os.environ.get("GOOGLE_API_KEY"):
-                self.llm = create_google_llm()
+                self.llm = create_llm("google")
             elif ChatOpenAI is not None:
                 self.llm = ChatOpenAI(model_name="gpt-4o-mini", temperature=0.1)
             else:
@@ -54,3 +67,35 @@ class ChatAgent:
             retriever=retriever,
             return_source_documents=True,
         )
+
+    def stream_answer(self, question, docs, chat_history=None):
+        """
+        Yield answer text incrementally for already-retrieved `docs`.
+
+        Unlike build_chain, the question is not condensed against the history
+        first; the history is included in the prompt instead, so the first
+        token is produced by a single LLM call.
+        """
+        self._ensure_llm_and_embeddings()
+        if self.llm is None:
+            raise RuntimeError("No LLM is configured for ChatAgent")
+
+        history = "\n".join(
+            f"Student: {turn[0]}\nAssistant: {turn[1]}"
+            for turn in (chat_history or [])
+            if isinstance(turn, (list, tuple)) and len(turn) == 2
+        )
+        prompt = STREAM_PROMPT.format(
+            context="\n\n".join(d.page_content for d in docs),
+            history=history or "(none)",
+            question=question,
+        )
+        if not hasattr(self.llm, "stream"):
+            # Plain predict-only LLMs (e.g. DummyLLM) yield the whole answer at once
+            yield self.llm.predict(prompt)
+            return
+        for chunk in self.llm.stream(prompt):
+            # LLMs yield str; chat models yield message chunks with .content
+            text = chunk if isinstance(chunk, str) else getattr(chunk, "content", "")
+            if text:
+                yield text
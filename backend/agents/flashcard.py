@@ -1,11 +1,6 @@
 # flashcard.py
-import json
-import re
-try:
-    from langchain import LLMChain, PromptTemplate
-except Exception:
-    LLMChain = None
-    PromptTemplate = None
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 # Do not import langchain_openai at module import time: it may pull heavy optional
 # dependencies (transformers/torch) and slow or block demo runs. The agent uses
 # the provided `llm` object or the google_llm factory when available.
@@ -13,8 +8,15 @@ except Exception:
 # Use absolute import for the utils module
 import sys
 import os
+import logging
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from utils.google_llm import create_google_llm
+from utils import metrics
+from utils.log import get_logger, log_sampled
+from utils.llm_providers import create_llm, acomplete, output_token_limit
+from utils.batching import count_tokens, pack_chunks, format_batch, split_batch_response
+from utils.parsing import response_to_text, parse_flashcards, validate_flashcard
+
+logger = get_logger("flashcard")
 
 FLASH_PROMPT = """You are a flashcard generator.
 Given the following text chunk, produce between 1 and 6 question-answer pairs and return them as a valid JSON array (only the JSON array, nothing else).
@@ -41,105 +43,231 @@ Text to use for generating flashcards:
 Return strictly a JSON array.
 """
 
+# Multi-chunk variant used when batching is enabled. Always filled with
+# str.replace (never PromptTemplate), so braces are written literally.
+FLASH_BATCH_PROMPT = """You are a flashcard generator.
+Below are several text chunks, each introduced by a header such as "### Chunk 3".
+For EACH chunk, produce between 1 and 6 question-answer pairs based only on that chunk.
+
+Requirements:
+- Output must be a single valid JSON object using double quotes only.
+- Keys are the chunk numbers as strings; each value is a JSON array of objects with exactly two keys: "question" and "answer".
+- Include every chunk number; use an empty array if no suitable Q/A can be produced.
+- Keep questions concise (<= 120 characters) and answers concise (<= 400 characters).
+- Do NOT include any explanatory text, markdown, or code fences — output only the JSON object.
+
+Example output:
+{"3": [{"question": "What is X?", "answer": "X is ..."}], "4": []}
+
+Chunks:
+
+{chunks}
+
+
+Return strictly a JSON object.
+"""
+
+# Response tokens reserved per chunk in a batch (up to 6 concise pairs)
+BATCH_OUTPUT_TOKENS_PER_CHUNK = 400
+
 class FlashcardAgent:
-    def __init__(self, llm=None):
+    def __init__(self, llm=None, max_concurrency=1, batch_tokens=0, max_batch_chunks=8):
         # If an explicit llm is provided (e.g., ChatOpenAI or DummyLLM), use it.
         # If none is provided, attempt to create a Google LLM wrapper. If LangChain
         # components are missing, fall back to calling llm.predict directly.
+        # max_concurrency bounds how many chunks are sent to the LLM at once;
+        # 1 keeps the original sequential behaviour.
+        self.max_concurrency = max(1, int(max_concurrency or 1))
+        # batch_tokens > 0 packs several chunks into one prompt up to that many
+        # input tokens; 0 sends one chunk per request.
+        self.batch_tokens = int(batch_tokens or 0)
+        self.max_batch_chunks = max(1, int(max_batch_chunks or 1))
         if llm is None:
             try:
-                self.llm = create_google_llm()
+                self.llm = create_llm("google")
             except Exception:
                 self.llm = None
             self.chain = None
         else:
             self.llm = llm
+            try:
+                # langchain is slow to import, so it is only loaded once an agent is built
+                from langchain import LLMChain, PromptTemplate
+            except Exception:
+                LLMChain = PromptTemplate = None
             if LLMChain is not None and PromptTemplate is not None:
                 self.chain = LLMChain(llm=self.llm, prompt=PromptTemplate.from_template(FLASH_PROMPT))
             else:
                 self.chain = None
 
     def _response_to_text(self, resp):
+        """Normalize chain response into a string safely (see utils.parsing)."""
+        return response_to_text(resp)
+
+    def _groups(self, chunks):
+        """Chunk indices per request: one chunk each, or packed batches when batching is on."""
+        if self.batch_tokens > 0:
+            overhead = count_tokens(FLASH_BATCH_PROMPT)
+            return pack_chunks(
+                chunks, self.batch_tokens, overhead, self.max_batch_chunks,
+                max_output_tokens=output_token_limit(self.llm) or 0,
+                output_tokens_per_chunk=BATCH_OUTPUT_TOKENS_PER_CHUNK,
+            )
+        return [[i] for i in range(len(chunks))]
+
+    def generate_from_chunks(self, chunks, on_progress=None):
+        chunks = list(chunks)
+        logger.info("FlashcardAgent generating from %d chunks", len(chunks))
+        metrics.CHUNKS.inc(len(chunks), stage="flashcards")
+        groups = self._groups(chunks)
+
+        def run(indices):
+            if len(indices) == 1:
+                return [self._generate_for_chunk(chunks[indices[0]])]
+            return self._generate_for_batch(chunks, indices)
+
+        out = []
+        if self.max_concurrency > 1 and len(groups) > 1:
+            # Fan work out to a bounded pool; map() yields results in input
+            # order so the deck keeps the same ordering as the source chunks.
+            workers = min(self.max_concurrency, len(groups))
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                for per_chunk in pool.map(run, groups):
+                    for cards in per_chunk:
+                        out.extend(cards)
+                    if on_progress:
+                        on_progress(len(per_chunk))
+        else:
+            for indices in groups:
+                per_chunk = run(indices)
+                for cards in per_chunk:
+                    out.extend(cards)
+                if on_progress:
+                    on_progress(len(per_chunk))
+        return out
+
+    async def agenerate_from_chunks(self, chunks, on_progress=None):
         """
-        Normalize chain response into a string safely.
-        Newer versions of LangChain may return dicts (mapping output keys -> values).
-        Older versions may return a raw string.
+        Async counterpart of generate_from_chunks for use on an event loop.
+
+        Up to max_concurrency requests are in flight at once, bounded by a
+        semaphore rather than a thread each (the LLM's apredict/ainvoke is
+        used when it has one). Cards come back in chunk order.
         """
-        if resp is None:
-            return ""
-        if isinstance(resp, str):
-            return resp
-        if isinstance(resp, dict):
-            # try common keys
-            for k in ("text", "output_text", "response", "result"):
-                if k in resp and isinstance(resp[k], str):
-                    return resp[k]
-            # fallback: take the first string-like value
-            for v in resp.values():
-                if isinstance(v, str):
-                    return v
-            # last resort: convert to json string
-            try:
-                return json.dumps(resp)
-            except Exception:
-                return str(resp)
-        return str(resp)
+        chunks = list(chunks)
+        logger.info("FlashcardAgent generating from %d chunks (async)", len(chunks))
+        metrics.CHUNKS.inc(len(chunks), stage="flashcards")
+        limit = asyncio.Semaphore(self.max_concurrency)
 
-    def generate_from_chunks(self, chunks):
-        print("***FlashcardAgent generating from chunks...")
-        out = []
-        for c in chunks:
-            # Use .predict to avoid deprecated Chain.__call__/run usage.
-            # LLMChain.predict accepts kwargs for template variables.
-            print("***FlashcardAgent processing chunk...")
-            # If using GoogleLLM wrapper, call predict directly; otherwise use chain
-            try:
-                if self.chain is None:
-                    resp = self.llm.predict(FLASH_PROMPT.replace("{chunk}", c))
+        async def run(indices):
+            async with limit:
+                if len(indices) == 1:
+                    per_chunk = [await self._agenerate_for_chunk(chunks[indices[0]])]
                 else:
-                    resp = self.chain.predict(chunk=c)
-            except Exception as e:
-                print("***FlashcardAgent exception during prediction/invocation", e)
-                resp = ""
-            text = self._response_to_text(resp)
-            print(f"***FlashcardAgent processed text: {text}")
-            # try strict JSON parse first
-            try:
-                parsed = json.loads(text)
-                print(f"***FlashcardAgent parsed JSON: {parsed}")
-                if isinstance(parsed, list):
-                    out.extend(parsed)
-                    continue
-            except Exception:
-                pass
-
-            # salvage: find first JSON array in the output
-            m = re.search(r'(\[.*\])', text, re.S)
-            print(f"***FlashcardAgent regex search match: {m}")
-            if m:
-                try:
-                    parsed = json.loads(m.group(1))
-                    print(f"***FlashcardAgent salvaged parsed JSON: {parsed}")
-                    if isinstance(parsed, list):
-                        out.extend(parsed)
-                        continue
-                except Exception:
-                    # final fallback: try to parse line-by-line Q: A:
-                    pass
-
-            # fallback: naive line extraction as last resort
-            # split into QA pairs by lines containing '?' or 'Q:' / 'A:'
-            lines = [ln.strip() for ln in text.splitlines() if ln.strip()]
-            print(f"***FlashcardAgent fallback lines: {lines}")
-            qa = []
-            cur_q = None
-            for ln in lines:
-                if ln.endswith("?") and not cur_q:
-                    cur_q = ln
-                elif ln.lower().startswith("q:"):
-                    cur_q = ln[2:].strip()
-                elif ln.lower().startswith("a:") and cur_q:
-                    qa.append({"question": cur_q, "answer": ln[2:].strip()})
-                    cur_q = None
-            out.extend(qa)
+                    per_chunk = await self._agenerate_for_batch(chunks, indices)
+            if on_progress:
+                on_progress(len(per_chunk))
+            return per_chunk
+
+        out = []
+        for per_chunk in await asyncio.gather(*(run(indices) for indices in self._groups(chunks))):
+            for cards in per_chunk:
+                out.extend(cards)
         return out
+
+    def _generate_for_batch(self, chunks, indices):
+        """Generate cards for several chunks with one request; returns one list per chunk."""
+        log_sampled(logger, logging.DEBUG, "flashcard.batch", "FlashcardAgent processing batch of %d chunks",
+                    len(indices))
+        prompt = FLASH_BATCH_PROMPT.replace("{chunks}", format_batch(chunks, indices))
+        try:
+            text = self._response_to_text(self.llm.predict(prompt))
+        except Exception as e:
+            self._batch_failed(e)
+            text = ""
+        by_chunk = self._split_batch(text, indices)
+        missing = [i for i in indices if i not in by_chunk]
+        if by_chunk and len(missing) > 1:
+            # Partly answered (e.g. cut off at the output limit): ask again
+            # for just the missing chunks, still batched.
+            retried = dict(zip(missing, self._generate_for_batch(chunks, missing)))
+        else:
+            # Chunks the model skipped (or an unparseable batch) fall back to
+            # single-chunk requests so one bad batch doesn't lose cards.
+            retried = {i: self._generate_for_chunk(chunks[i]) for i in missing}
+        return [
+            [c for c in map(validate_flashcard, by_chunk[i]) if c]
+            if i in by_chunk else retried[i]
+            for i in indices
+        ]
+
+    async def _agenerate_for_batch(self, chunks, indices):
+        prompt = FLASH_BATCH_PROMPT.replace("{chunks}", format_batch(chunks, indices))
+        try:
+            text = await acomplete(self.llm, prompt)
+        except Exception as e:
+            self._batch_failed(e)
+            text = ""
+        by_chunk = self._split_batch(text, indices)
+        missing = [i for i in indices if i not in by_chunk]
+        if by_chunk and len(missing) > 1:
+            retried = dict(zip(missing, await self._agenerate_for_batch(chunks, missing)))
+        else:
+            retried = {i: await self._agenerate_for_chunk(chunks[i]) for i in missing}
+        return [
+            [c for c in map(validate_flashcard, by_chunk[i]) if c]
+            if i in by_chunk else retried[i]
+            for i in indices
+        ]
+
+    @staticmethod
+    def _batch_failed(e):
+        metrics.ERRORS.inc(component="flashcard")
+        log_sampled(logger, logging.WARNING, "flashcard.batch_error", "FlashcardAgent batch prediction failed: %s", e)
+
+    @staticmethod
+    def _split_batch(text, indices):
+        by_chunk = split_batch_response(text, indices) or {}
+        metrics.PARSE_PATHS.inc(len(by_chunk), kind="flashcard", path="batch")
+        metrics.PARSE_PATHS.inc(len(indices) - len(by_chunk), kind="flashcard", path="batch_fallback")
+        return by_chunk
+
+    def _generate_for_chunk(self, c):
+        # Use .predict to avoid deprecated Chain.__call__/run usage.
+        # LLMChain.predict accepts kwargs for template variables.
+        # If using GoogleLLM wrapper, call predict directly; otherwise use chain
+        try:
+            if self.chain is None:
+                resp = self.llm.predict(FLASH_PROMPT.replace("{chunk}", c))
+            else:
+                resp = self.chain.predict(chunk=c)
+        except Exception as e:
+            self._chunk_failed(e)
+            resp = ""
+        return self._parse_cards(resp)
+
+    async def _agenerate_for_chunk(self, c):
+        try:
+            if self.chain is None:
+                resp = await acomplete(self.llm, FLASH_PROMPT.replace("{chunk}", c))
+            else:
+                resp = await self.chain.apredict(chunk=c)
+        except Exception as e:
+            self._chunk_failed(e)
+            resp = ""
+        return self._parse_cards(resp)
+
+    @staticmethod
+    def _chunk_failed(e):
+        metrics.ERRORS.inc(component="flashcard")
+        log_sampled(logger, logging.WARNING, "flashcard.error", "FlashcardAgent prediction failed: %s", e)
+
+    def _parse_cards(self, resp):
+        text = self._response_to_text(resp)
+        # JSON array first (single pass), then Q:/A: line fallback; items are
+        # validated against the flashcard schema either way.
+        cards, path = parse_flashcards(text)
+        metrics.PARSE_PATHS.inc(kind="flashcard", path=path)
+        log_sampled(logger, logging.DEBUG, f"flashcard.parse.{path}", "FlashcardAgent parsed %d cards via %s",
+                    len(cards), path)
+        return cards
@@ -2,9 +2,13 @@
 import datetime
 import math
 
+from utils.srs import ReviewScheduler
+
 class PlannerAgent:
-    def __init__(self, start_date=None):
+    def __init__(self, start_date=None, scheduler=None):
         self.start_date = start_date or datetime.date.today()
+        # per-card review state; in-memory (nothing saved) unless one is passed in
+        self.scheduler = scheduler if scheduler is not None else ReviewScheduler()
 
     def plan_topics(self, topics, days_between=2):
         plan = []
@@ -25,3 +29,30 @@ class PlannerAgent:
             revise_on = self.start_date + datetime.timedelta(days=(i+1))
             plan.append({"topic": topic, "score": score, "revise_on": str(revise_on)})
         return plan
+
+    def schedule_cards(self, card_ids, prune=False):
+        """
+        Start tracking review state for new flashcards; returns how many were added.
+        prune=True means `card_ids` is the whole deck: state for other cards is dropped.
+        """
+        card_ids = list(card_ids)
+        removed = self.scheduler.retain(card_ids) if prune else 0
+        added = self.scheduler.add(card_ids)
+        if added or removed:
+            self.scheduler.save()
+        return added
+
+    def record_reviews(self, reviews):
+        # reviews: [(card_id, grade 0-5), ...] applied as one batch
+        states = self.scheduler.review([r[0] for r in reviews], [r[1] for r in reviews])
+        self.scheduler.save()
+        return [self._with_date(s) for s in states]
+
+    def due_reviews(self, limit=50, days_ahead=0):
+        now = datetime.datetime.now().timestamp() + days_ahead * 86400
+        return [self._with_date(s) for s in self.scheduler.due_cards(now=now, limit=limit)]
+
+    @staticmethod
+    def _with_date(state):
+        state["revise_on"] = str(datetime.datetime.fromtimestamp(state["due"]).date())
+        return state
@@ -1,11 +1,6 @@
 # quiz.py
-import json
-import re
-try:
-    from langchain import LLMChain, PromptTemplate
-except Exception:
-    LLMChain = None
-    PromptTemplate = None
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 # Do not import langchain_openai at module import time to avoid pulling heavy optional
 # dependencies when running the lightweight demo. The agent will use the provided
 # `llm` object or the google_llm factory if available.
@@ -13,8 +8,15 @@ except Exception:
 # Use absolute import for the utils module
 import sys
 import os
+import logging
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from utils.google_llm import create_google_llm
+from utils import metrics
+from utils.log import get_logger, log_sampled
+from utils.llm_providers import create_llm, acomplete, output_token_limit
+from utils.batching import count_tokens, pack_chunks, format_batch, split_batch_response
+from utils.parsing import response_to_text, parse_quiz, validate_quiz_item
+
+logger = get_logger("quiz")
 
 QUIZ_PROMPT = """
 You are a quiz (MCQ) generator.
@@ -35,96 +37,214 @@ Text:
 Return strictly a JSON array (only JSON, no extra text).
 """
 
+# Multi-chunk variant for batching mode; filled with str.replace only.
+QUIZ_BATCH_PROMPT = """
+You are a quiz (MCQ) generator.
+Below are several text chunks, each introduced by a header such as "### Chunk 3".
+For EACH chunk, create up to 5 multiple-choice questions based only on that chunk.
+Each question must have 4 options and one correct answer.
+
+Return a single JSON object whose keys are the chunk numbers as strings and whose
+values are JSON arrays of objects with keys: question, options, and answer.
+Use an empty array for a chunk with no suitable questions. Example:
+
+{"3": [{"question": "What is X?", "options": ["...", "...", "...", "..."], "answer": "..."}], "4": []}
+
+Chunks:
+
+{chunks}
+
+Return strictly a JSON object (only JSON, no extra text).
+"""
+
+# Response tokens reserved per chunk in a batch (up to 5 questions with options)
+BATCH_OUTPUT_TOKENS_PER_CHUNK = 400
+
 class QuizAgent:
-    def __init__(self, llm=None):
+    def __init__(self, llm=None, max_concurrency=1, batch_tokens=0, max_batch_chunks=8):
+        # max_concurrency bounds how many chunks are in flight at once
+        self.max_concurrency = max(1, int(max_concurrency or 1))
+        # batch_tokens > 0 packs several chunks into one prompt (see utils/batching.py)
+        self.batch_tokens = int(batch_tokens or 0)
+        self.max_batch_chunks = max(1, int(max_batch_chunks or 1))
         if llm is None:
             try:
-                self.llm = create_google_llm()
+                self.llm = create_llm("google")
             except Exception:
                 self.llm = None
             self.chain = None
         else:
             self.llm = llm
+            try:
+                # langchain is slow to import, so it is only loaded once an agent is built
+                from langchain import LLMChain, PromptTemplate
+            except Exception:
+                LLMChain = PromptTemplate = None
             if LLMChain is not None and PromptTemplate is not None:
                 self.chain = LLMChain(llm=self.llm, prompt=PromptTemplate.from_template(QUIZ_PROMPT))
             else:
                 self.chain = None
 
     def _response_to_text(self, resp):
-        if resp is None:
-            return ""
-        if isinstance(resp, str):
-            return resp
-        if isinstance(resp, dict):
-            for k in ("text", "output_text", "response", "result"):
-                if k in resp and isinstance(resp[k], str):
-                    return resp[k]
-            for v in resp.values():
-                if isinstance(v, str):
-                    return v
-            try:
-                return json.dumps(resp)
-            except Exception:
-                return str(resp)
-        return str(resp)
+        return response_to_text(resp)
+
+    def _groups(self, chunks):
+        """Chunk indices per request: one chunk each, or packed batches when batching is on."""
+        if self.batch_tokens > 0:
+            overhead = count_tokens(QUIZ_BATCH_PROMPT)
+            return pack_chunks(
+                chunks, self.batch_tokens, overhead, self.max_batch_chunks,
+                max_output_tokens=output_token_limit(self.llm) or 0,
+                output_tokens_per_chunk=BATCH_OUTPUT_TOKENS_PER_CHUNK,
+            )
+        return [[i] for i in range(len(chunks))]
+
+    def generate_from_chunks(self, chunks, on_progress=None):
+        chunks = list(chunks)
+        logger.info("QuizAgent generating from %d chunks", len(chunks))
+        metrics.CHUNKS.inc(len(chunks), stage="quiz")
+        groups = self._groups(chunks)
+
+        def run(indices):
+            if len(indices) == 1:
+                return [self._generate_for_chunk(chunks[indices[0]])]
+            return self._generate_for_batch(chunks, indices)
 
-    def generate_from_chunks(self, chunks):
         out = []
-        for c in chunks:
-            # Prefer .predict to avoid deprecated Chain.__call__/run usage
-            try:
-                if self.chain is None:
-                    text = self.llm.predict(QUIZ_PROMPT.replace("{chunk}", c))
+        if self.max_concurrency > 1 and len(groups) > 1:
+            # Results come back in input order regardless of completion order
+            workers = min(self.max_concurrency, len(groups))
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                for per_chunk in pool.map(run, groups):
+                    for items in per_chunk:
+                        out.extend(items)
+                    if on_progress:
+                        on_progress(len(per_chunk))
+        else:
+            for indices in groups:
+                per_chunk = run(indices)
+                for items in per_chunk:
+                    out.extend(items)
+                if on_progress:
+                    on_progress(len(per_chunk))
+        return out
+
+    async def agenerate_from_chunks(self, chunks, on_progress=None):
+        """
+        Async counterpart of generate_from_chunks: at most max_concurrency
+        requests in flight on the running event loop, questions in chunk order.
+        """
+        chunks = list(chunks)
+        logger.info("QuizAgent generating from %d chunks (async)", len(chunks))
+        metrics.CHUNKS.inc(len(chunks), stage="quiz")
+        limit = asyncio.Semaphore(self.max_concurrency)
+
+        async def run(indices):
+            async with limit:
+                if len(indices) == 1:
+                    per_chunk = [await self._agenerate_for_chunk(chunks[indices[0]])]
                 else:
-                    resp = self.chain.predict(chunk=c)
-                    text = self._response_to_text(resp)
-            except Exception as e:
-                print("***QuizAgent exception during predict/invoke:", e)
-                text = ""
+                    per_chunk = await self._agenerate_for_batch(chunks, indices)
+            if on_progress:
+                on_progress(len(per_chunk))
+            return per_chunk
 
-            # try strict JSON parse first
-            try:
-                parsed = json.loads(text)
-                if isinstance(parsed, list):
-                    # ensure each parsed item has a difficulty tag
-                    for item in parsed:
-                        if isinstance(item, dict) and "difficulty" not in item:
-                            item["difficulty"] = "Medium"
-                    out.extend(parsed)
-                    continue
-            except Exception:
-                pass
-
-            # salvage JSON array from text
-            m = re.search(r'(\[.*\])', text, re.S)
-            if m:
-                try:
-                    parsed = json.loads(m.group(1))
-                    if isinstance(parsed, list):
-                        for item in parsed:
-                            if isinstance(item, dict) and "difficulty" not in item:
-                                item["difficulty"] = "Medium"
-                        out.extend(parsed)
-                        continue
-                except Exception:
-                    pass
-
-            # last-resort parsing: attempt to split into questions (very naive)
-            lines = [ln.strip() for ln in text.splitlines() if ln.strip()]
-            current = {}
-            for ln in lines:
-                if ln.lower().startswith("q:") or ln.endswith("?"):
-                    if current:
-                        out.append(current)
-                        current = {}
-                    current["question"] = ln[2:].strip() if ln.lower().startswith("q:") else ln
-                elif ln.lower().startswith("a)") or ln.startswith("-") or ln.lower().startswith("option"):
-                    current.setdefault("options", []).append(ln.split(")",1)[-1].strip() if ")" in ln else ln)
-                elif ln.lower().startswith("answer:") and current:
-                    current["answer"] = ln.split(":",1)[1].strip()
-            if current:
-                # ensure difficulty is present
-                if "difficulty" not in current:
-                    current["difficulty"] = "Medium"
-                out.append(current)
+        out = []
+        for per_chunk in await asyncio.gather(*(run(indices) for indices in self._groups(chunks))):
+            for items in per_chunk:
+                out.extend(items)
         return out
+
+    def _generate_for_batch(self, chunks, indices):
+        """One request for several chunks; returns one question list per chunk."""
+        prompt = QUIZ_BATCH_PROMPT.replace("{chunks}", format_batch(chunks, indices))
+        try:
+            text = self._response_to_text(self.llm.predict(prompt))
+        except Exception as e:
+            self._batch_failed(e)
+            text = ""
+        by_chunk = self._split_batch(text, indices)
+        missing = [i for i in indices if i not in by_chunk]
+        if by_chunk and len(missing) > 1:
+            # partly answered (e.g. truncated): re-request only the missing chunks
+            retried = dict(zip(missing, self._generate_for_batch(chunks, missing)))
+        else:
+            # skipped or unparseable: retry each chunk on its own
+            retried = {i: self._generate_for_chunk(chunks[i]) for i in missing}
+        res = []
+        for i in indices:
+            if i not in by_chunk:
+                res.append(retried[i])
+                continue
+            res.append([q for q in map(validate_quiz_item, by_chunk[i]) if q])
+        return res
+
+    async def _agenerate_for_batch(self, chunks, indices):
+        prompt = QUIZ_BATCH_PROMPT.replace("{chunks}", format_batch(chunks, indices))
+        try:
+            text = await acomplete(self.llm, prompt)
+        except Exception as e:
+            self._batch_failed(e)
+            text = ""
+        by_chunk = self._split_batch(text, indices)
+        missing = [i for i in indices if i not in by_chunk]
+        if by_chunk and len(missing) > 1:
+            retried = dict(zip(missing, await self._agenerate_for_batch(chunks, missing)))
+        else:
+            retried = {i: await self._agenerate_for_chunk(chunks[i]) for i in missing}
+        res = []
+        for i in indices:
+            if i not in by_chunk:
+                res.append(retried[i])
+                continue
+            res.append([q for q in map(validate_quiz_item, by_chunk[i]) if q])
+        return res
+
+    @staticmethod
+    def _batch_failed(e):
+        metrics.ERRORS.inc(component="quiz")
+        log_sampled(logger, logging.WARNING, "quiz.batch_error", "QuizAgent batch prediction failed: %s", e)
+
+    @staticmethod
+    def _split_batch(text, indices):
+        by_chunk = split_batch_response(text, indices) or {}
+        metrics.PARSE_PATHS.inc(len(by_chunk), kind="quiz", path="batch")
+        metrics.PARSE_PATHS.inc(len(indices) - len(by_chunk), kind="quiz", path="batch_fallback")
+        return by_chunk
+
+    def _generate_for_chunk(self, c):
+        # Prefer .predict to avoid deprecated Chain.__call__/run usage
+        try:
+            if self.chain is None:
+                text = self._response_to_text(self.llm.predict(QUIZ_PROMPT.replace("{chunk}", c)))
+            else:
+                resp = self.chain.predict(chunk=c)
+                text = self._response_to_text(resp)
+        except Exception as e:
+            self._chunk_failed(e)
+            text = ""
+        return self._parse_items(text)
+
+    async def _agenerate_for_chunk(self, c):
+        try:
+            if self.chain is None:
+                text = await acomplete(self.llm, QUIZ_PROMPT.replace("{chunk}", c))
+            else:
+                text = self._response_to_text(await self.chain.apredict(chunk=c))
+        except Exception as e:
+            self._chunk_failed(e)
+            text = ""
+        return self._parse_items(text)
+
+    @staticmethod
+    def _chunk_failed(e):
+        metrics.ERRORS.inc(component="quiz")
+        log_sampled(logger, logging.WARNING, "quiz.error", "QuizAgent prediction failed: %s", e)
+
+    @staticmethod
+    def _parse_items(text):
+        # single-pass JSON extraction with line fallback; every item is
+        # schema-checked and gets a default difficulty tag
+        items, path = parse_quiz(text)
+        metrics.PARSE_PATHS.inc(kind="quiz", path=path)
+        return items
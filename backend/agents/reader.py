@@ -1,10 +1,19 @@
 # reader.py
-from utils.pdf_utils import extract_text_from_pdf
+import time
 
-try:
-    from langchain.text_splitter import RecursiveCharacterTextSplitter
-except Exception:
-    RecursiveCharacterTextSplitter = None
+from utils import metrics
+from utils.pdf_utils import iter_pdf_pages, iter_pdf_pages_parallel
+from utils.token_splitter import TokenTextSplitter
+
+
+def load_recursive_splitter():
+    """langchain's RecursiveCharacterTextSplitter class, or None when not installed."""
+    # Imported on demand: langchain is slow to load and token splitting (the default) doesn't need it
+    try:
+        from langchain.text_splitter import RecursiveCharacterTextSplitter
+    except Exception:
+        return None
+    return RecursiveCharacterTextSplitter
 
 
 class SimpleSplitter:
@@ -25,20 +34,105 @@ class SimpleSplitter:
 
 
 class ReaderAgent:
-    def __init__(self, chunk_size=1000, chunk_overlap=200):
-        if RecursiveCharacterTextSplitter is not None:
-            self.splitter = RecursiveCharacterTextSplitter(
-                chunk_size=chunk_size, chunk_overlap=chunk_overlap
-            )
+    def __init__(self, chunk_size=1000, chunk_overlap=200, extract_workers=1, window_chunks=32,
+                 chunk_tokens=0, overlap_tokens=0, record_metrics=True):
+        # extract_workers > 1 extracts page ranges in a process pool.
+        # window_chunks bounds how much text is buffered before it is split.
+        # chunk_tokens > 0 switches to the token-aware splitter (sizes in tokens,
+        # chunk_size/chunk_overlap are then unused).
+        # record_metrics=False leaves timings in last_timings only (worker
+        # processes hand them back to the parent, which owns /metrics).
+        self.chunk_size = chunk_size
+        self.record_metrics = record_metrics
+        self.last_timings = {}
+        self.extract_workers = extract_workers
+        self.window_chars = chunk_size * window_chunks
+        if chunk_tokens > 0:
+            self.splitter = TokenTextSplitter(chunk_tokens=chunk_tokens, overlap_tokens=overlap_tokens)
         else:
-            self.splitter = SimpleSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+            recursive = load_recursive_splitter()
+            if recursive is not None:
+                self.splitter = recursive(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+            else:
+                self.splitter = SimpleSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
 
     def read_pdf(self, path: str):
-        raw = extract_text_from_pdf(path)
-        cleaned = self.clean_text(raw)
-        chunks = self.splitter.split_text(cleaned)
         # produce small topic-ish chunks
-        return chunks
+        return list(self.iter_pdf_chunks(path))
+
+    def iter_pdf_chunks(self, path: str):
+        """
+        Yield chunks while the PDF is still being extracted.
+
+        Pages are appended to a bounded text window; once the window is full it
+        is split, every chunk but the last is emitted, and the last one is
+        carried over so chunks spanning a window boundary are not cut short.
+
+        Extraction and splitting are interleaved, so they are timed apart:
+        time spent pulling pages counts as extraction, the rest of the time
+        spent producing chunks as splitting. Totals land in `last_timings`.
+        """
+        timings = {"extract": 0.0, "produce": 0.0, "chunks": 0}
+
+        def timed_pages(pages):
+            it = iter(pages)
+            while True:
+                t0 = time.perf_counter()
+                try:
+                    page = next(it)
+                except StopIteration:
+                    timings["extract"] += time.perf_counter() - t0
+                    return
+                timings["extract"] += time.perf_counter() - t0
+                yield page
+
+        chunks = self._iter_chunks(path, timed_pages)
+        try:
+            while True:
+                t0 = time.perf_counter()
+                try:
+                    chunk = next(chunks)
+                except StopIteration:
+                    timings["produce"] += time.perf_counter() - t0
+                    break
+                timings["produce"] += time.perf_counter() - t0
+                timings["chunks"] += 1
+                yield chunk
+        finally:
+            self.last_timings = {
+                "extract": timings["extract"],
+                "split": max(0.0, timings["produce"] - timings["extract"]),
+                "chunks": timings["chunks"],
+            }
+            if self.record_metrics:
+                metrics.observe_read(self.last_timings)
+
+    def _iter_chunks(self, path: str, timed_pages):
+        if self.extract_workers > 1:
+            pages = iter_pdf_pages_parallel(path, workers=self.extract_workers)
+        else:
+            pages = iter_pdf_pages(path)
+        pages = timed_pages(pages)
+        if isinstance(self.splitter, TokenTextSplitter):
+            # single pass over the page stream; no re-split window needed
+            yield from self.splitter.split_stream(self.clean_text(p) for p in pages)
+            return
+        parts = []
+        buffered = 0
+        for page_text in pages:
+            page_text = self.clean_text(page_text)
+            parts.append(page_text)
+            buffered += len(page_text)
+            if buffered < self.window_chars:
+                continue
+            chunks = self.splitter.split_text("".join(parts))
+            if len(chunks) <= 1:
+                continue
+            yield from chunks[:-1]
+            parts = [chunks[-1]]
+            buffered = len(chunks[-1])
+        if parts:
+            yield from self.splitter.split_text("".join(parts))
 
     def clean_text(self, text: str) -> str:
         # simple cleaning, can be extended
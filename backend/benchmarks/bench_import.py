@@ -0,0 +1,104 @@
+"""
+Cold-start report: how long `import main` takes and where the time goes.
+
+Runs `python -X importtime -c "import <module>"` in fresh interpreters and
+reports the median total, the slowest direct imports of the module and the
+packages with the most self time. Fails (exit 1) when the median exceeds
+--max-ms or when a module that must stay lazy (a provider SDK) was imported,
+so cold-start regressions show up in CI.
+
+Usage (from backend/):
+    python benchmarks/bench_import.py [--module main] [--repeat 5] [--top 15]
+        [--max-ms 1500] [--forbid google.generativeai,langchain_openai] [--json]
+"""
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_FORBID = "google.generativeai,langchain_openai,langchain_core,langchain"
+
+
+def import_profile(module):
+    """One fresh interpreter; returns [(name, self_us, cumulative_us, depth)] in import order."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr[-2000:]}")
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cum_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((name.strip(), int(self_us), int(cum_us), depth))
+    return rows
+
+
+def summarize(rows, module, top):
+    total = next((cum for name, _, cum, _ in rows if name == module), 0)
+    # importtime lists children before their parent; direct imports sit one level below the root
+    direct = sorted(((name, cum) for name, _, cum, depth in rows if depth == 1), key=lambda r: -r[1])
+    by_package = {}
+    for name, self_us, _, _ in rows:
+        pkg = name.split(".")[0]
+        by_package[pkg] = by_package.get(pkg, 0) + self_us
+    packages = sorted(by_package.items(), key=lambda r: -r[1])
+    return {
+        "total_ms": round(total / 1000, 1),
+        "modules": len(rows),
+        "direct": [{"module": n, "ms": round(us / 1000, 1)} for n, us in direct[:top]],
+        "packages": [{"package": p, "self_ms": round(us / 1000, 1)} for p, us in packages[:top]],
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--module", default="main", help="module to import (from backend/)")
+    ap.add_argument("--repeat", type=int, default=5, help="fresh interpreters to run; the median is reported")
+    ap.add_argument("--top", type=int, default=15)
+    ap.add_argument("--max-ms", type=float, default=0, help="fail if the median import exceeds this (0 = no budget)")
+    ap.add_argument("--forbid", default=DEFAULT_FORBID,
+                    help="comma-separated modules that must not be imported (empty to disable)")
+    ap.add_argument("--json", action="store_true", help="emit machine-readable JSON")
+    args = ap.parse_args()
+
+    runs = [import_profile(args.module) for _ in range(max(1, args.repeat))]
+    summaries = [summarize(rows, args.module, args.top) for rows in runs]
+    median = statistics.median(s["total_ms"] for s in summaries)
+    # detail from the run closest to the median
+    report = min(summaries, key=lambda s: abs(s["total_ms"] - median))
+    report = {"module": args.module, "median_ms": median,
+              "runs_ms": [s["total_ms"] for s in summaries], **report}
+
+    imported = {name for name, *_ in runs[0]}
+    forbid = [m for m in args.forbid.split(",") if m]
+    report["forbidden_imported"] = sorted(m for m in forbid if m in imported)
+    report["over_budget"] = bool(args.max_ms and median > args.max_ms)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"import {args.module}: median {median} ms over {len(summaries)} runs "
+              f"({report['modules']} modules) runs={report['runs_ms']}")
+        print(f"\n{'slowest direct imports':<48}{'ms':>8}")
+        for r in report["direct"]:
+            print(f"{r['module']:<48}{r['ms']:>8}")
+        print(f"\n{'packages by self time':<48}{'ms':>8}")
+        for r in report["packages"]:
+            print(f"{r['package']:<48}{r['self_ms']:>8}")
+        if report["forbidden_imported"]:
+            print(f"\nFAIL: imported at startup: {', '.join(report['forbidden_imported'])}")
+        if report["over_budget"]:
+            print(f"\nFAIL: median {median} ms exceeds budget {args.max_ms} ms")
+    if report["forbidden_imported"] or report["over_budget"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Micro-benchmark: legacy agent parsing vs utils.parsing.
+
+The legacy path is the chain both agents used before the shared parser:
+json.loads on the whole text, then a greedy `\\[.*\\]` DOTALL regex salvage,
+then a line-by-line fallback. "extract" times the shared extraction alone;
+"shared" adds schema validation of every item.
+
+Usage (from backend/):
+    python benchmarks/bench_parser.py [--repeat 5] [--json]
+"""
+import os
+import re
+import sys
+import json
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.parsing import parse_flashcards, parse_flashcard_lines, extract_json_records
+
+
+def legacy_parse(text):
+    try:
+        parsed = json.loads(text)
+        if isinstance(parsed, list):
+            return parsed
+    except Exception:
+        pass
+    m = re.search(r'(\[.*\])', text, re.S)
+    if m:
+        try:
+            parsed = json.loads(m.group(1))
+            if isinstance(parsed, list):
+                return parsed
+        except Exception:
+            pass
+    return parse_flashcard_lines(text)
+
+
+def _cards(n):
+    return [{"question": f"What is concept {i}?", "answer": f"Concept {i} is explained in detail. " * 4}
+            for i in range(n)]
+
+
+def cases():
+    big = json.dumps(_cards(2000))
+    return {
+        "clean_small": json.dumps(_cards(6)),
+        "clean_large": big,
+        "prose_wrapped_large": "Sure! Here are your flashcards:\n```json\n" + big + "\n```\nLet me know [if] you need more.",
+        "truncated_large": big[: len(big) * 3 // 4],
+        "many_open_brackets": "[" * 2000 + " reasoning " * 2000,
+        "lines_fallback": "\n".join(f"Q: question {i}?\nA: answer {i}" for i in range(2000)),
+    }
+
+
+def bench(fn, text, repeat):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn(text)
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--json", action="store_true", help="emit machine-readable JSON")
+    args = ap.parse_args()
+
+    rows = []
+    for name, text in cases().items():
+        legacy_s, legacy_res = bench(legacy_parse, text, args.repeat)
+        extract_s, _ = bench(extract_json_records, text, args.repeat)
+        new_s, (new_res, path) = bench(parse_flashcards, text, args.repeat)
+        rows.append({
+            "case": name,
+            "bytes": len(text),
+            "legacy_ms": round(legacy_s * 1000, 3),
+            "extract_ms": round(extract_s * 1000, 3),
+            "shared_ms": round(new_s * 1000, 3),
+            "speedup": round(legacy_s / new_s, 2) if new_s else None,
+            "legacy_items": len(legacy_res),
+            "shared_items": len(new_res),
+            "shared_path": path,
+        })
+
+    if args.json:
+        print(json.dumps(rows, indent=2))
+        return
+    print(f"{'case':<22}{'bytes':>10}{'legacy ms':>12}{'extract ms':>12}{'shared ms':>12}{'speedup':>9}{'items L/S':>12}")
+    for r in rows:
+        print(f"{r['case']:<22}{r['bytes']:>10}{r['legacy_ms']:>12}{r['extract_ms']:>12}{r['shared_ms']:>12}"
+              f"{r['speedup']:>9}{str(r['legacy_items']) + '/' + str(r['shared_items']):>12}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,280 @@
+"""
+Pipeline benchmark: synthetic PDFs through every stage, offline.
+
+For each PDF size, runs ReaderAgent (extract + split), FlashcardAgent and
+QuizAgent against demo_runner.DummyLLM with configurable latency, jitter and
+failure rate, PlannerAgent with the spaced-repetition scheduler, and the
+FastAPI endpoints (/generate_all job, /flashcards with and without ETag,
+/planner/due) through TestClient. Each stage reports wall time, throughput,
+latency percentiles and peak Python memory (tracemalloc), so regressions in
+concurrency, caching or parsing show up as numbers. The router stages compare
+calling a degraded provider directly with RouterLLM over it and a healthy one.
+
+Usage (from backend/):
+    python benchmarks/bench_pipeline.py [--sizes 10,50,200] [--latency 0.02] [--jitter 0.01]
+        [--failure-rate 0.05] [--concurrency 4] [--batch-tokens 0] [--router-calls 100] [--no-api]
+        [--json] [--out results.json]
+"""
+import os
+import sys
+import gc
+import json
+import time
+import random
+import argparse
+import platform
+import tempfile
+import tracemalloc
+
+import numpy as np
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+from agents.reader import ReaderAgent
+from agents.flashcard import FlashcardAgent
+from agents.quiz import QuizAgent
+from agents.planner import PlannerAgent
+from demo_runner import DummyLLM
+from utils.srs import ReviewScheduler, card_id
+from bench_splitter import make_pdf
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def percentiles(samples):
+    if not samples:
+        return {}
+    p = np.percentile(np.asarray(samples) * 1000, [50, 95, 99])
+    return {"p50_ms": round(p[0], 3), "p95_ms": round(p[1], 3), "p99_ms": round(p[2], 3)}
+
+
+def measure(stage, size, fn, track_memory=True):
+    """Run fn() -> (result, items, latencies); return (result, row)."""
+    gc.collect()
+    if track_memory:
+        tracemalloc.start()
+    t0 = time.perf_counter()
+    result, items, latencies = fn()
+    elapsed = time.perf_counter() - t0
+    peak = None
+    if track_memory:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    row = {
+        "stage": stage,
+        "pages": size,
+        "seconds": round(elapsed, 4),
+        "items": items,
+        "items_per_s": round(items / elapsed, 2) if elapsed and items else None,
+        **percentiles(latencies),
+        "peak_mb": round(peak / (1 << 20), 2) if peak is not None else None,
+    }
+    return result, row
+
+
+def make_llm(args, seed):
+    return DummyLLM(latency=args.latency, jitter=args.jitter, failure_rate=args.failure_rate, seed=seed)
+
+
+def agent_stage(agent_cls, args, chunks, seed):
+    def run():
+        llm = make_llm(args, seed)
+        agent = agent_cls(llm=llm, max_concurrency=args.concurrency, batch_tokens=args.batch_tokens)
+        out = agent.generate_from_chunks(chunks)
+        return (out, llm), len(chunks), llm.latencies
+    return run
+
+
+def planner_stage(args, flashcards, topics):
+    def run():
+        planner = PlannerAgent(scheduler=ReviewScheduler())
+        plan = planner.plan_topics(topics)
+        # scale the deck up so scheduler costs are visible
+        ids = [f"{card_id(c)}-{i}" for i in range(max(1, args.cards // max(1, len(flashcards))))
+               for c in flashcards][: args.cards]
+        planner.scheduler.add(ids, now=0.0)
+        rng = random.Random(0)
+        planner.scheduler.review(ids, [rng.randint(0, 5) for _ in ids], now=0.0)
+        latencies = []
+        for _ in range(100):
+            t0 = time.perf_counter()
+            planner.scheduler.due_cards(now=86400.0, limit=50)
+            latencies.append(time.perf_counter() - t0)
+        return plan, len(ids), latencies
+    return run
+
+
+def router_stages(args, rows):
+    """Tail latency of one degraded provider (10x slower, 20% errors) alone vs behind RouterLLM."""
+    from utils.llm_router import RouterLLM
+
+    base = max(args.latency, 0.005)
+
+    def degraded():
+        return DummyLLM(latency=10 * base, jitter=9 * base, failure_rate=0.2, seed=21)
+
+    def calls(llm):
+        def run():
+            latencies, failures = [], 0
+            for i in range(args.router_calls):
+                t0 = time.perf_counter()
+                try:
+                    llm.predict(f"Generate flashcards for router benchmark call {i}")
+                except RuntimeError:
+                    failures += 1
+                latencies.append(time.perf_counter() - t0)
+            return failures, args.router_calls, latencies
+        return run
+
+    for stage, llm in (
+        ("llm_degraded_direct", degraded()),
+        ("llm_router_hedged", RouterLLM(
+            providers=[degraded(), make_llm(args, 22)], names=["degraded", "healthy"],
+            hedge=True, hedge_min_delay=2 * base, hedge_default_delay=2 * base, use_response_cache=False,
+        )),
+    ):
+        failures, row = measure(stage, 0, calls(llm), args.memory)
+        row["failures"] = failures
+        rows.append(row)
+
+
+def api_stages(args, chunks, size, rows):
+    """Drive the FastAPI app in a scratch directory with DummyLLM-backed agents."""
+    from fastapi.testclient import TestClient
+
+    import main
+
+    # Heavy LangChain/FAISS setup is not needed: the agents are injected here
+    main.initialize_full_agents = lambda: None
+    main.flash_agent = FlashcardAgent(llm=make_llm(args, 11), max_concurrency=args.concurrency,
+                                      batch_tokens=args.batch_tokens)
+    main.quiz_agent = QuizAgent(llm=make_llm(args, 12), max_concurrency=args.concurrency,
+                                batch_tokens=args.batch_tokens)
+    scheduler = ReviewScheduler()
+    main.review_scheduler = scheduler
+    main.planner_agent = PlannerAgent(scheduler=scheduler)
+    registry = main.index_registry
+    doc_id = f"bench{size}"
+    registry.chunk_store(doc_id).write(chunks)
+    os.makedirs(registry.store(doc_id).index_path, exist_ok=True)
+    registry.register(doc_id, chunks=len(chunks))
+    client = TestClient(main.app)
+
+    def generate():
+        t0 = time.perf_counter()
+        res = client.post("/generate_all", params={"doc_id": doc_id})
+        accepted = time.perf_counter() - t0
+        status_url = res.json()["status_url"]
+        while True:
+            job = client.get(status_url).json()
+            if job["status"] in ("done", "failed"):
+                break
+            time.sleep(0.005)
+        if job["status"] != "done":
+            raise RuntimeError(f"generation job failed: {job.get('error')}")
+        return job, len(chunks), [accepted]
+
+    _, row = measure("api_generate_all", size, generate, args.memory)
+    row["p50_ms_accept"] = row.pop("p50_ms", None)
+    for k in ("p95_ms", "p99_ms"):
+        row.pop(k, None)
+    rows.append(row)
+
+    def read_endpoint(path, conditional):
+        def run():
+            latencies, etag = [], None
+            for _ in range(args.requests):
+                headers = {"If-None-Match": etag} if conditional and etag else {}
+                t0 = time.perf_counter()
+                res = client.get(path, headers=headers)
+                latencies.append(time.perf_counter() - t0)
+                etag = res.headers.get("etag", etag)
+            return None, args.requests, latencies
+        return run
+
+    for stage, path, conditional in (
+        ("api_flashcards", "/flashcards", False),
+        ("api_flashcards_etag", "/flashcards", True),
+        ("api_planner_due", "/planner/due", False),
+    ):
+        _, row = measure(stage, size, read_endpoint(path, conditional), args.memory)
+        rows.append(row)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--sizes", default="10,50,200", help="comma-separated PDF page counts")
+    ap.add_argument("--latency", type=float, default=0.02, help="DummyLLM seconds per call")
+    ap.add_argument("--jitter", type=float, default=0.01, help="+/- uniform jitter in seconds")
+    ap.add_argument("--failure-rate", type=float, default=0.0, help="probability a call raises")
+    ap.add_argument("--concurrency", type=int, default=4, help="agent max_concurrency")
+    ap.add_argument("--batch-tokens", type=int, default=0, help="agent batch_tokens (0 = one call per chunk)")
+    ap.add_argument("--chunk-tokens", type=int, default=256)
+    ap.add_argument("--cards", type=int, default=50000, help="cards in the scheduler stage")
+    ap.add_argument("--requests", type=int, default=50, help="GETs per read endpoint")
+    ap.add_argument("--router-calls", type=int, default=100, help="calls per router stage (0 = skip)")
+    ap.add_argument("--no-api", dest="api", action="store_false", help="skip the FastAPI stages")
+    ap.add_argument("--no-memory", dest="memory", action="store_false",
+                    help="skip tracemalloc (it slows allocation-heavy stages)")
+    ap.add_argument("--json", action="store_true", help="emit machine-readable JSON")
+    ap.add_argument("--out", help="also write the JSON report to this file")
+    args = ap.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_pipeline_")
+    out_path = os.path.abspath(args.out) if args.out else None
+    # main.py and the agents write to ./outputs; keep that out of the repo
+    os.chdir(workdir)
+
+    rows = []
+    for size in [int(s) for s in args.sizes.split(",") if s]:
+        pdf = os.path.join(workdir, f"synthetic_{size}.pdf")
+        make_pdf(pdf, size, seed=size)
+        reader = ReaderAgent(chunk_tokens=args.chunk_tokens)
+
+        chunks, row = measure("read", size, lambda: (lambda c: (c, len(c), []))(reader.read_pdf(pdf)), args.memory)
+        rows.append(row)
+
+        (flashcards, llm), row = measure("flashcards", size, agent_stage(FlashcardAgent, args, chunks, 1), args.memory)
+        row.update(llm_calls=llm.calls, llm_failures=llm.failures, outputs=len(flashcards))
+        rows.append(row)
+
+        (quizzes, llm), row = measure("quizzes", size, agent_stage(QuizAgent, args, chunks, 2), args.memory)
+        row.update(llm_calls=llm.calls, llm_failures=llm.failures, outputs=len(quizzes))
+        rows.append(row)
+
+        topics = [c.split("\n")[0][:80] for c in chunks]
+        _, row = measure("planner", size, planner_stage(args, flashcards, topics), args.memory)
+        rows.append(row)
+
+        if args.api:
+            api_stages(args, chunks, size, rows)
+
+    if args.router_calls:
+        router_stages(args, rows)
+
+    report = {
+        "config": {k: v for k, v in vars(args).items() if k not in ("json", "out")},
+        "python": platform.python_version(),
+        "cpus": os.cpu_count(),
+        "max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1) if resource else None,
+        "stages": rows,
+    }
+    if out_path:
+        with open(out_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    print(f"{'stage':<22}{'pages':>6}{'seconds':>10}{'items/s':>10}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'peak MB':>9}")
+    for r in rows:
+        print(f"{r['stage']:<22}{r['pages']:>6}{r['seconds']:>10}{str(r['items_per_s']):>10}"
+              f"{str(r.get('p50_ms', r.get('p50_ms_accept', ''))):>9}{str(r.get('p95_ms', '')):>9}"
+              f"{str(r.get('p99_ms', '')):>9}{str(r['peak_mb']):>9}")
+    print(f"max RSS: {report['max_rss_mb']} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Benchmark: ReaderAgent text splitters on a large PDF.
+
+Compares the character-based SimpleSplitter, LangChain's
+RecursiveCharacterTextSplitter (when installed) and the token-aware
+TokenTextSplitter on the same extracted text: throughput, chunk count and
+chunk sizes in tokens. Character splitters get chunk_size = 4 * tokens so
+all three target roughly the same chunk length.
+
+Usage (from backend/):
+    python benchmarks/bench_splitter.py [--pdf file.pdf] [--pages 400] [--tokens 256] [--json]
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from agents.reader import SimpleSplitter, load_recursive_splitter
+from utils.batching import count_tokens_batch
+from utils.pdf_utils import iter_pdf_pages
+from utils.token_splitter import TokenTextSplitter
+
+WORDS = ("cell membrane protein energy enzyme gradient transport reaction equilibrium "
+         "pressure volume theorem proof matrix vector derivative integral function").split()
+
+
+def make_pdf(path, pages, seed=0):
+    import fitz
+
+    rng = random.Random(seed)
+    doc = fitz.open()
+    for _ in range(pages):
+        page = doc.new_page()
+        paragraphs = []
+        for _ in range(4):
+            sentences = [
+                " ".join(rng.choice(WORDS) for _ in range(rng.randint(6, 24))).capitalize() + "."
+                for _ in range(rng.randint(3, 7))
+            ]
+            paragraphs.append(" ".join(sentences))
+        page.insert_textbox(page.rect + (36, 36, -36, -36), "\n\n".join(paragraphs), fontsize=8)
+    doc.save(path)
+    doc.close()
+
+
+def run(name, split_pages, pages, repeat):
+    best = float("inf")
+    chunks = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        chunks = list(split_pages(pages))
+        best = min(best, time.perf_counter() - t0)
+    sizes = count_tokens_batch(chunks) if chunks else [0]
+    chars = sum(len(p) for p in pages)
+    return {
+        "splitter": name,
+        "ms": round(best * 1000, 2),
+        "mb_per_s": round(chars / best / 1e6, 2) if best else None,
+        "chunks": len(chunks),
+        "mean_tokens": round(sum(sizes) / len(sizes), 1),
+        "max_tokens": max(sizes),
+        "mid_sentence_ends": sum(1 for c in chunks if not c.rstrip().endswith((".", "!", "?"))),
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--pdf", help="PDF to split (default: a generated one)")
+    ap.add_argument("--pages", type=int, default=400, help="pages of the generated PDF")
+    ap.add_argument("--tokens", type=int, default=256, help="target chunk size in tokens")
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--json", action="store_true", help="emit machine-readable JSON")
+    args = ap.parse_args()
+
+    path = args.pdf
+    if path is None:
+        path = os.path.join(tempfile.mkdtemp(), "bench.pdf")
+        make_pdf(path, args.pages)
+    pages = [p.replace("\r", "\n") for p in iter_pdf_pages(path)]
+    chars = args.tokens * 4
+
+    splitters = {"simple": SimpleSplitter(chunk_size=chars, chunk_overlap=0)}
+    RecursiveCharacterTextSplitter = load_recursive_splitter()
+    if RecursiveCharacterTextSplitter is not None:
+        splitters["recursive"] = RecursiveCharacterTextSplitter(chunk_size=chars, chunk_overlap=0)
+    rows = [run(name, lambda ps, s=s: s.split_text("".join(ps)), pages, args.repeat)
+            for name, s in splitters.items()]
+    token = TokenTextSplitter(chunk_tokens=args.tokens)
+    rows.append(run("token", token.split_stream, pages, args.repeat))
+
+    if args.json:
+        print(json.dumps(rows, indent=2))
+        return
+    print(f"{len(pages)} pages, {sum(len(p) for p in pages)} chars, target {args.tokens} tokens/chunk")
+    print(f"{'splitter':<12}{'ms':>10}{'MB/s':>8}{'chunks':>8}{'mean tok':>10}{'max tok':>9}{'mid-sentence':>14}")
+    for r in rows:
+        print(f"{r['splitter']:<12}{r['ms']:>10}{r['mb_per_s']:>8}{r['chunks']:>8}{r['mean_tokens']:>10}"
+              f"{r['max_tokens']:>9}{r['mid_sentence_ends']:>14}")
+
+
+if __name__ == "__main__":
+    main()
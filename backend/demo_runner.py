@@ -1,5 +1,9 @@
 import os
+import re
 import json
+import time
+import random
+import threading
 from agents.reader import ReaderAgent
 from agents.flashcard import FlashcardAgent
 from agents.quiz import QuizAgent
@@ -9,10 +13,51 @@ from agents.planner import PlannerAgent
 class DummyLLM:
     """A tiny deterministic LLM-like object with a predict(prompt) method.
     It returns simple heuristic outputs suitable for demo/testing without real API calls.
+
+    For benchmarks it can imitate a remote provider: each call sleeps `latency`
+    seconds (+/- uniform `jitter`) and raises RuntimeError with probability
+    `failure_rate`. Per-call latencies are recorded in `latencies`.
     """
+    def __init__(self, latency=0.0, jitter=0.0, failure_rate=0.0, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.latencies = []
+        self.calls = 0
+        self.failures = 0
+
     def predict(self, prompt: str) -> str:
+        start = time.perf_counter()
+        with self._lock:
+            self.calls += 1
+            delay = max(0.0, self.latency + self._rng.uniform(-self.jitter, self.jitter)) if self.latency else 0.0
+            fail = self.failure_rate and self._rng.random() < self.failure_rate
+        if delay:
+            time.sleep(delay)
+        try:
+            if fail:
+                with self._lock:
+                    self.failures += 1
+                raise RuntimeError("DummyLLM simulated provider failure")
+            return self._respond(prompt)
+        finally:
+            with self._lock:
+                self.latencies.append(time.perf_counter() - start)
+
+    def _respond(self, prompt: str) -> str:
         # Very small heuristics to produce Q/A or MCQs depending on prompt keywords
         text = prompt.lower()
+        batch = re.findall(r"^### chunk (\d+)$", text, re.M)
+        if batch:
+            # batched prompt: answer every chunk, keyed by its number; the
+            # instructions before the first chunk decide the kind of answer
+            single = self._respond(text.split("### chunk", 1)[0])
+            try:
+                return json.dumps({i: json.loads(single) for i in batch})
+            except ValueError:
+                return single
         if "flashcard" in text or "flashcard generator" in text or "produce" in text:
             # return a small JSON array
             return json.dumps([
@@ -0,0 +1,90 @@
+"""
+Index many PDFs from the command line, without running the API server.
+
+Uses the same settings as the backend (.env / environment: INDEX_ROOT,
+EMBEDDINGS_PROVIDER, CHUNK_TOKENS, ...), so documents indexed here are
+immediately searchable through /chat and listed by /documents.
+
+Usage (from backend/):
+    python ingest_runner.py readings/*.pdf [--dir course/] [--collection bio101] [--workers 8] [--json]
+"""
+import os
+import sys
+import glob
+import json
+import time
+import argparse
+
+from dotenv import load_dotenv
+
+from utils.embedding_cache import CachedEmbeddings
+from utils.index_registry import IndexRegistry
+from utils.ingest import BatchIngestor
+from utils.local_embeddings import create_embeddings
+
+
+def _faiss():
+    try:
+        from langchain.vectorstores import FAISS
+    except Exception:
+        from langchain_community.vectorstores import FAISS
+    return FAISS
+
+
+def collect(paths, dirs):
+    files = []
+    for p in paths:
+        files.extend(sorted(glob.glob(p)) or [p])
+    for d in dirs:
+        files.extend(sorted(glob.glob(os.path.join(d, "**", "*.pdf"), recursive=True)))
+    return [f for f in files if f.lower().endswith(".pdf")]
+
+
+def main():
+    load_dotenv(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".env"))
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("pdfs", nargs="*", help="PDF files or glob patterns")
+    ap.add_argument("--dir", action="append", default=[], help="directory to scan recursively for PDFs")
+    ap.add_argument("--collection", default="default")
+    ap.add_argument("--workers", type=int, default=int(os.environ.get("INGEST_WORKERS", str(os.cpu_count() or 1))))
+    ap.add_argument("--batch-size", type=int, default=int(os.environ.get("EMBED_BATCH_SIZE", "256")),
+                    help="chunks per embedding request")
+    ap.add_argument("--json", action="store_true", help="emit machine-readable JSON")
+    args = ap.parse_args()
+
+    files = collect(args.pdfs, args.dir)
+    if not files:
+        ap.error("no PDF files given")
+
+    registry = IndexRegistry(os.environ.get("INDEX_ROOT", "./outputs/indexes"), loader=None)
+    embeddings = CachedEmbeddings(
+        create_embeddings(),
+        path=os.environ.get("EMBEDDING_CACHE_PATH", "./outputs/embedding_cache.sqlite3"),
+    )
+    ingestor = BatchIngestor(
+        registry, embeddings, _faiss(),
+        reader_kwargs={
+            "chunk_tokens": int(os.environ.get("CHUNK_TOKENS", "256")),
+            "overlap_tokens": int(os.environ.get("CHUNK_OVERLAP_TOKENS", "32")),
+        },
+        workers=args.workers, embed_batch_size=args.batch_size,
+    )
+
+    def report(status):
+        if not args.json:
+            detail = status.get("error") or f"{status.get('chunks', 0)} chunks"
+            print(f"[{status['status']:>9}] {status['filename']} ({detail}, {status['seconds']}s)")
+
+    t0 = time.perf_counter()
+    results = ingestor.ingest([(f, os.path.basename(f)) for f in files], collection=args.collection,
+                              on_result=report)
+    elapsed = time.perf_counter() - t0
+    if args.json:
+        print(json.dumps({"seconds": round(elapsed, 3), "files": results}, indent=2))
+    else:
+        print(f"{len(files)} files in {elapsed:.1f}s, embedding cache: {embeddings.stats()}")
+    sys.exit(1 if any(r["status"] == "error" for r in results) else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,26 +1,42 @@
 # main.py
 import os
+import asyncio
 import json
-from fastapi import FastAPI, File, UploadFile, HTTPException
-from fastapi.responses import JSONResponse
+import time
+import threading
+from contextlib import asynccontextmanager
+from typing import List, Optional
+from fastapi import FastAPI, File, Form, UploadFile, HTTPException, Request, Query
+from fastapi.responses import JSONResponse, StreamingResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from starlette.concurrency import run_in_threadpool
 from agents.reader import ReaderAgent
 from agents.flashcard import FlashcardAgent
 from agents.quiz import QuizAgent
 from agents.planner import PlannerAgent
-from agents.chat_agent import ChatAgent
 
 # Defer importing heavy LLM/vectorstore libraries until they are actually needed.
 OpenAIEmbeddings = None
 FAISS = None
 Document = None
-ChatOpenAI = None
 
 from dotenv import load_dotenv
 import sys
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
-from utils.google_llm import create_google_llm
-from utils.ollama_llm import create_ollama_llm
+# Provider SDKs (google.generativeai, langchain_openai, ...) load on first selection
+from utils.llm_providers import aclose_loop_clients, configured_providers, create_all, create_first
+from utils.llm_cache import get_llm_cache
+from utils.index_registry import IndexRegistry, RETRIEVAL_MODES
+from utils.uploads import UploadError, save_upload
+from utils.jobs import JobManager
+from utils.json_cache import JsonFileCache
+from utils.semantic_cache import SemanticCache
+from utils.srs import ReviewScheduler, card_id
+from utils import metrics
+from utils.log import get_logger
+
+logger = get_logger("main")
 
 # Load environment variables from .env file explicitly
 env_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.env')
@@ -31,31 +47,135 @@ GOOGLE_API_KEY = os.environ.get("GOOGLE_API_KEY")
 OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY")
 USE_OLLAMA = os.environ.get("USE_OLLAMA", "false").lower() == "true"
 OLLAMA_MODEL = os.environ.get("OLLAMA_MODEL", "mistral")
-
-# Determine which LLM to use: priority order is Ollama > Google Gemini > OpenAI
-USE_GOOGLE = bool(GOOGLE_API_KEY) and not USE_OLLAMA
-USE_OPENAI = bool(OPENAI_API_KEY) and not USE_GOOGLE and not USE_OLLAMA
+# Max number of chunks each agent (flashcards, quizzes) has in flight at once during generation
+GENERATION_CONCURRENCY = int(os.environ.get("GENERATION_CONCURRENCY", "4"))
+# Token budget for packing several chunks into one generation prompt (0 = one chunk per call)
+GENERATION_BATCH_TOKENS = int(os.environ.get("GENERATION_BATCH_TOKENS", "0"))
+GENERATION_BATCH_MAX_CHUNKS = int(os.environ.get("GENERATION_BATCH_MAX_CHUNKS", "8"))
+# Max number of /generate_all jobs running at once; further jobs wait in a queue
+MAX_CONCURRENT_JOBS = int(os.environ.get("MAX_CONCURRENT_JOBS", "1"))
+# Worker processes used to extract PDF pages in parallel (1 = in-process)
+PDF_EXTRACT_WORKERS = int(os.environ.get("PDF_EXTRACT_WORKERS", "1"))
+# Chunk size in tokens (token-aware splitter); 0 keeps the character-based splitter
+CHUNK_TOKENS = int(os.environ.get("CHUNK_TOKENS", "256"))
+CHUNK_OVERLAP_TOKENS = int(os.environ.get("CHUNK_OVERLAP_TOKENS", "32"))
+# Batch ingestion: extraction processes and chunks per cross-document embedding call
+INGEST_WORKERS = int(os.environ.get("INGEST_WORKERS", str(os.cpu_count() or 1)))
+EMBED_BATCH_SIZE = int(os.environ.get("EMBED_BATCH_SIZE", "256"))
+# Uploads are streamed to disk; anything larger than this is rejected with 413
+MAX_UPLOAD_MB = int(os.environ.get("MAX_UPLOAD_MB", "100"))
+MAX_UPLOAD_BYTES = MAX_UPLOAD_MB * (1 << 20)
+# Total size of all files in one /ingest_pdfs request
+MAX_BATCH_MB = int(os.environ.get("MAX_BATCH_MB", "1000"))
+MAX_BATCH_BYTES = MAX_BATCH_MB * (1 << 20)
+UPLOAD_DIR = os.environ.get("UPLOAD_DIR", "./outputs/uploads")
+
+# Which LLM to use: priority order is Ollama > Google Gemini > OpenAI (see utils/llm_providers.py)
+# LLM_ROUTER=auto wraps every configured provider that comes up in a latency-aware
+# router (utils/llm_router.py) when there is more than one; false keeps the first only
+LLM_ROUTER = os.environ.get("LLM_ROUTER", "auto").lower()
+# Hedging sends a duplicate request to the next provider once the chosen one
+# exceeds its own p95 latency; it trades extra provider calls for bounded tail latency
+ROUTER_HEDGE = os.environ.get("ROUTER_HEDGE", "false").lower() == "true"
+ROUTER_HEDGE_MIN_DELAY = float(os.environ.get("ROUTER_HEDGE_MIN_DELAY", "0.25"))
+ROUTER_FAILURE_THRESHOLD = int(os.environ.get("ROUTER_FAILURE_THRESHOLD", "5"))
+ROUTER_COOLDOWN = float(os.environ.get("ROUTER_COOLDOWN", "30"))
+ROUTER_WINDOW = int(os.environ.get("ROUTER_WINDOW", "100"))
 
 # Do not raise at import time. Allow tests and the demo to import main even if
 # API keys are not configured. When running the full server you'll want to set
 # one of the API keys or USE_OLLAMA=true.
 
-FAISS_INDEX_PATH = os.environ.get("FAISS_INDEX_PATH", "./outputs/faiss_index")
+# Root of the per-document index shards (FAISS index + chunk store per PDF)
+INDEX_ROOT = os.environ.get("INDEX_ROOT", "./outputs/indexes")
+# Chunks read per page by /generate_all
+GENERATION_PAGE_SIZE = int(os.environ.get("GENERATION_PAGE_SIZE", "64"))
+# Chat retrieval: "vector" (FAISS), "bm25" (local keyword index, no embedding call) or "hybrid" (RRF of both)
+RETRIEVAL_MODE = os.environ.get("RETRIEVAL_MODE", "hybrid").lower()
+# Per-card spaced-repetition state (SM-2), saved after every review batch
+REVIEW_STATE_PATH = os.environ.get("REVIEW_STATE_PATH", "./outputs/review_state.npz")
+# Semantic cache of /chat answers (first-turn questions only)
+ANSWER_CACHE_ENABLED = os.environ.get("ANSWER_CACHE_ENABLED", "true").lower() == "true"
+ANSWER_CACHE_THRESHOLD = float(os.environ.get("ANSWER_CACHE_THRESHOLD", "0.92"))
+ANSWER_CACHE_MAX_ITEMS = int(os.environ.get("ANSWER_CACHE_MAX_ITEMS", "1024"))
+ANSWER_CACHE_TTL = float(os.environ.get("ANSWER_CACHE_TTL", "86400"))
+# Persistent chunk-hash -> embedding cache so unchanged chunks are never re-embedded
+EMBEDDING_CACHE_PATH = os.environ.get("EMBEDDING_CACHE_PATH", "./outputs/embedding_cache.sqlite3")
+# Preload the LLM provider and the most recent FAISS shards at startup; /health
+# answers 503 until that finishes so a load balancer only routes to warm pods
+WARMUP = os.environ.get("WARMUP", "false").lower() == "true"
+WARMUP_SHARDS = int(os.environ.get("WARMUP_SHARDS", "4"))
+
+warmup_state = {"status": "disabled"}
+
+@asynccontextmanager
+async def lifespan(app):
+    if WARMUP:
+        warmup_state["status"] = "warming"
+        # Off the event loop so /health can answer while the work runs
+        threading.Thread(target=warm_up, name="warmup", daemon=True).start()
+    yield
+    # /chat's clients live on the server's loop
+    await aclose_loop_clients()
+
+app = FastAPI(lifespan=lifespan)
+
+# Registered first so CORS (added below) still wraps its 413 responses
+@app.middleware("http")
+async def reject_oversized_uploads(request: Request, call_next):
+    # Refuse an upload before its body is read when the declared size is already too big
+    if request.url.path == "/upload_pdf":
+        limit, detail = MAX_UPLOAD_BYTES, f"Upload exceeds the {MAX_UPLOAD_MB} MB limit"
+    elif request.url.path == "/ingest_pdfs":
+        limit, detail = MAX_BATCH_BYTES, f"Batch exceeds the {MAX_BATCH_MB} MB limit"
+    else:
+        limit = 0
+    if limit:
+        length = request.headers.get("content-length")
+        # small allowance for the multipart envelope and form fields
+        if length and length.isdigit() and int(length) > limit + (64 << 10):
+            return JSONResponse(status_code=413, content={"detail": detail})
+    return await call_next(request)
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    # Labelled by route template (/jobs/{job_id}), not raw path, to keep series bounded.
+    # Streaming responses are timed to their first byte.
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        metrics.HTTP_SECONDS.observe(
+            time.perf_counter() - started,
+            method=request.method, route=getattr(route, "path", "unmatched"), status=status,
+        )
 
-app = FastAPI()
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Total-Count"],
 )
+# Large decks compress well; skip tiny responses where gzip costs more than it saves
+app.add_middleware(GZipMiddleware, minimum_size=1024)
 
+# Splitter settings, shared with the batch-ingestion worker processes
+READER_KWARGS = {"chunk_tokens": CHUNK_TOKENS, "overlap_tokens": CHUNK_OVERLAP_TOKENS}
 # instantiate lightweight agents that don't require LLMs for import-time tasks
-reader = ReaderAgent()
+reader = ReaderAgent(extract_workers=PDF_EXTRACT_WORKERS, **READER_KWARGS)
 flash_agent = None
 quiz_agent = None
-planner_agent = PlannerAgent()
+llm_provider = None
+review_scheduler = ReviewScheduler(REVIEW_STATE_PATH)
+planner_agent = PlannerAgent(scheduler=review_scheduler)
 chat_agent = None
+# Background workers for long-running generation so the event loop stays responsive
+job_manager = JobManager(max_concurrent_jobs=MAX_CONCURRENT_JOBS)
 
 
 def initialize_full_agents():
@@ -65,7 +185,7 @@ def initialize_full_agents():
     It allows test suites and the demo runner to import `main` without
     having LLM keys or heavy optional dependencies installed.
     """
-    global OpenAIEmbeddings, FAISS, Document, ChatOpenAI
+    global OpenAIEmbeddings, FAISS, Document, llm_provider
     global reader, flash_agent, quiz_agent, planner_agent, chat_agent
 
     # Import heavy dependencies here; if they are missing, raise a clear error
@@ -73,7 +193,6 @@ def initialize_full_agents():
         from langchain_openai import OpenAIEmbeddings
         from langchain.vectorstores import FAISS
         from langchain.docstore.document import Document
-        from langchain_openai import ChatOpenAI
     except Exception as e:
         raise RuntimeError(f"Missing heavy LLM/vectorstore dependencies: {e}")
 
@@ -81,33 +200,56 @@ def initialize_full_agents():
     globals()['OpenAIEmbeddings'] = OpenAIEmbeddings
     globals()['FAISS'] = FAISS
     globals()['Document'] = Document
-    globals()['ChatOpenAI'] = ChatOpenAI
 
-    # Choose LLM provider
-    if USE_OLLAMA:
-        try:
-            llm = create_ollama_llm(model=OLLAMA_MODEL)
-        except RuntimeError as e:
-            if USE_GOOGLE:
-                llm = create_google_llm()
-            elif USE_OPENAI:
-                llm = ChatOpenAI(model_name=os.environ.get("LLM_MODEL", "gpt-4o-mini"), temperature=0.1)
-            else:
-                raise
-    elif USE_GOOGLE:
-        llm = create_google_llm()
-    elif USE_OPENAI:
-        llm = ChatOpenAI(model_name=os.environ.get("LLM_MODEL", "gpt-4o-mini"), temperature=0.1)
+    # Choose LLM provider: first of Ollama > Gemini > OpenAI that comes up;
+    # only the chosen provider's SDK gets imported
+    providers = configured_providers(USE_OLLAMA, GOOGLE_API_KEY, OPENAI_API_KEY)
+    options = {"ollama": {"model": OLLAMA_MODEL}}
+    if LLM_ROUTER != "false" and len(providers) > 1:
+        created = create_all(providers, options)
+        llm_provider, llm = created[0]
+        if len(created) > 1:
+            from utils.llm_router import RouterLLM
+
+            llm = RouterLLM(
+                providers=[p for _, p in created],
+                names=[name for name, _ in created],
+                hedge=ROUTER_HEDGE,
+                hedge_min_delay=ROUTER_HEDGE_MIN_DELAY,
+                failure_threshold=ROUTER_FAILURE_THRESHOLD,
+                cooldown=ROUTER_COOLDOWN,
+                window=ROUTER_WINDOW,
+            )
+            llm_provider = "router:" + ",".join(name for name, _ in created)
     else:
-        raise RuntimeError("No LLM configured. Set GOOGLE_API_KEY, OPENAI_API_KEY, or USE_OLLAMA=true")
+        llm_provider, llm = create_first(providers, options)
+    globals()['llm_provider'] = llm_provider
+    globals()['llm'] = llm
+
+    # Imported here, not at startup: these load langchain_core
+    from agents.chat_agent import ChatAgent
+    from utils.embedding_cache import CachedEmbeddings
+    from utils.local_embeddings import create_embeddings
 
-    embeddings = OpenAIEmbeddings()
+    # EMBEDDINGS_PROVIDER selects openai / ollama / hashing (see utils/local_embeddings.py)
+    embeddings = CachedEmbeddings(create_embeddings(), path=EMBEDDING_CACHE_PATH)
+    globals()['embeddings'] = embeddings
 
     # Instantiate LLM-backed agents
-    flash_agent = FlashcardAgent(llm=llm)
-    quiz_agent = QuizAgent(llm=llm)
-    planner_agent = PlannerAgent()
-    chat_agent = ChatAgent(faiss_index_path=FAISS_INDEX_PATH, llm=llm, embeddings=embeddings)
+    flash_agent = FlashcardAgent(
+        llm=llm,
+        max_concurrency=GENERATION_CONCURRENCY,
+        batch_tokens=GENERATION_BATCH_TOKENS,
+        max_batch_chunks=GENERATION_BATCH_MAX_CHUNKS,
+    )
+    quiz_agent = QuizAgent(
+        llm=llm,
+        max_concurrency=GENERATION_CONCURRENCY,
+        batch_tokens=GENERATION_BATCH_TOKENS,
+        max_batch_chunks=GENERATION_BATCH_MAX_CHUNKS,
+    )
+    planner_agent = PlannerAgent(scheduler=review_scheduler)
+    chat_agent = ChatAgent(faiss_index_path=INDEX_ROOT, llm=llm, embeddings=embeddings)
 
     # attach to globals
     globals()['flash_agent'] = flash_agent
@@ -117,82 +259,169 @@ def initialize_full_agents():
 
 # helper: persist outputs
 os.makedirs("./outputs", exist_ok=True)
+# Parsed outputs/*.json kept in memory until the file changes on disk
+json_cache = JsonFileCache()
 
 def store_json(obj, path):
     with open(path, "w", encoding="utf-8") as f:
         json.dump(obj, f, ensure_ascii=False, indent=2)
 
-def create_faiss_from_chunks(chunks):
+def _load_faiss_index(path):
+    # We create the index ourselves, so allow deserialization of the pickled
+    # docstore/index mapping when loading. Only enable this if you trust the
+    # local `outputs` files (they were created by this app).
+    if FAISS is None:
+        initialize_full_agents()
+    db = FAISS.load_local(path, globals().get('embeddings'), allow_dangerous_deserialization=True)
+    logger.info("FAISS index loaded into memory from %s", path)
+    return db
+
+# Per-document shards, each kept resident in memory once loaded
+index_registry = IndexRegistry(INDEX_ROOT, loader=_load_faiss_index)
+# The single index from before per-document shards is not migrated (it has no
+# doc_id or source PDF to key a shard by); re-upload the PDFs instead
+_LEGACY_INDEX = os.environ.get("FAISS_INDEX_PATH", "./outputs/faiss_index")
+if os.path.isdir(_LEGACY_INDEX):
+    logger.warning("%s is no longer used; re-upload its PDFs to index them under %s", _LEGACY_INDEX, INDEX_ROOT)
+
+answer_cache = SemanticCache(
+    threshold=ANSWER_CACHE_THRESHOLD, max_items=ANSWER_CACHE_MAX_ITEMS, ttl_seconds=ANSWER_CACHE_TTL
+) if ANSWER_CACHE_ENABLED else None
+
+def _ingestor():
     # ensure heavy deps are initialized
     if FAISS is None or Document is None:
         initialize_full_agents()
-    docs = [Document(page_content=c) for c in chunks]
-    # Create vectorstore
-    db = FAISS.from_documents(docs, globals().get('embeddings'))
-    db.save_local(FAISS_INDEX_PATH)
-    return db
+    from utils.ingest import BatchIngestor
 
-@app.post("/upload_pdf")
-async def upload_pdf(file: UploadFile = File(...)):
-    if not file.filename.lower().endswith(".pdf"):
-        raise HTTPException(status_code=400, detail="Only PDFs allowed")
-    tmp_path = f"./outputs/{file.filename}"
-    with open(tmp_path, "wb") as f:
-        content = await file.read()
-        f.write(content)
-
-    chunks = reader.read_pdf(tmp_path)
-    print("reader agent is successfully read and chunked the PDF, total chunks:", len(chunks))
-    # Build vector store
-    db = create_faiss_from_chunks(chunks)
-    print("FAISS index created at", FAISS_INDEX_PATH)
+    return BatchIngestor(
+        index_registry, globals().get('embeddings'), FAISS, reader_kwargs=READER_KWARGS,
+        workers=INGEST_WORKERS, embed_batch_size=EMBED_BATCH_SIZE,
+    )
+
+async def _save_upload(file: UploadFile):
+    if not (file.filename or "").lower().endswith(".pdf"):
+        raise HTTPException(status_code=400, detail=f"Only PDFs allowed: {file.filename}")
+    try:
+        # streamed in 1 MB pieces with non-blocking writes; sha256 computed in the same pass
+        return await save_upload(file, UPLOAD_DIR, MAX_UPLOAD_BYTES)
+    except UploadError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+
+def _ingest_upload(saved, collection):
+    """Blocking part of /upload_pdf, run on the threadpool so other requests keep being served."""
+    # Documents are content-addressed: an identical PDF maps to the same shard
+    doc_id = saved.sha256[:16]
+    if index_registry.has_index(doc_id):
+        logger.info("PDF %s already indexed as %s, skipping re-ingestion", saved.filename, doc_id)
+        entry = index_registry.register(doc_id, filename=saved.filename, collection=collection)
+        return {"status": "ok", "doc_id": doc_id, "chunks": entry.get("chunks", 0), "unchanged": True}
+
+    chunks = reader.read_pdf(saved.path)
+    logger.info("Read %s: %d chunks", saved.filename, len(chunks))
+    # Build this document's shard (FAISS + chunk store for /generate_all + BM25);
+    # other documents are untouched
+    ingestor = _ingestor()
+    vectors = ingestor.embeddings.embed_documents(chunks)
+    ingestor.publish(doc_id, chunks, vectors, filename=saved.filename, collection=collection, sha256=saved.sha256)
+    logger.info("FAISS index created at %s", index_registry.shard_dir(doc_id))
+    if answer_cache is not None:
+        answer_cache.invalidate(doc_id)
     # Save a simple summary (first 3 chunks)
-    summary = {"chunks_count": len(chunks), "sample": chunks[:3]}
+    summary = {"doc_id": doc_id, "chunks_count": len(chunks), "sample": chunks[:3], "sha256": saved.sha256}
     store_json(summary, "./outputs/reader_summary.json")
-    print("Reader summary saved.")
-    return {"status": "ok", "chunks": len(chunks)}
+    return {"status": "ok", "doc_id": doc_id, "chunks": len(chunks)}
 
-@app.post("/generate_all")
-async def generate_all():
-    # expects FAISS index to be present
-    if not os.path.exists(FAISS_INDEX_PATH):
-        raise HTTPException(status_code=400, detail="No uploaded materials found. Upload a PDF first.")
-    # load index
-    # We create the index ourselves, so allow deserialization of the pickled
-    # docstore/index mapping when loading. Only enable this if you trust the
-    # local `outputs` files (they were created by this app).
-    # Ensure full LLM/vectorstore stack is available
-    if FAISS is None:
-        initialize_full_agents()
-    db = FAISS.load_local(FAISS_INDEX_PATH, globals().get('embeddings'), allow_dangerous_deserialization=True)
-    print("***FAISS index loaded.")
-    # retrieve raw chunks
-    docs = db._get_docs(list(range(db.index.ntotal))) if hasattr(db, "_get_docs") else None
-    # fallback: we saved reader_summary.json
-    print("***Retrieving chunks for generation...")
+@app.post("/upload_pdf")
+async def upload_pdf(file: UploadFile = File(...), collection: str = Form("default")):
+    saved = await _save_upload(file)
+    return await run_in_threadpool(_ingest_upload, saved, collection)
+
+def _run_ingest(job, files, collection):
+    """Blocking batch ingestion on a JobManager worker thread; advances once per file."""
+    def on_result(status):
+        if status.get("doc_id") and answer_cache is not None:
+            answer_cache.invalidate(status["doc_id"])
+        job.advance()
+
+    results = _ingestor().ingest(files, collection=collection, on_result=on_result)
+    counts = {}
+    for r in results:
+        counts[r["status"]] = counts.get(r["status"], 0) + 1
+    logger.info("Batch ingestion finished: %s", counts)
+    return {"files": results, "counts": counts}
+
+@app.post("/ingest_pdfs", status_code=202)
+async def ingest_pdfs(files: List[UploadFile] = File(...), collection: str = Form("default")):
+    """Queue indexing of many PDFs at once; poll the returned job for per-file status."""
+    bad = [f.filename for f in files if not (f.filename or "").lower().endswith(".pdf")]
+    if bad:
+        raise HTTPException(status_code=400, detail=f"Only PDFs allowed: {', '.join(bad)}")
+    # the middleware only sees a declared Content-Length; this also covers chunked bodies
+    if MAX_BATCH_BYTES and sum(f.size or 0 for f in files) > MAX_BATCH_BYTES:
+        raise HTTPException(status_code=413, detail=f"Batch exceeds the {MAX_BATCH_MB} MB limit")
+    saved = []
     try:
-        with open("./outputs/reader_summary.json") as f:
-            r = json.load(f)
-            chunks = r.get("sample", [])
-    except Exception:
-        chunks = []
-
-    # If chunks empty, retrieve a handful by doing a query-less scan (FAISS wrapper doesn't expose docs easily)
-    # For MVP we'll ask user to re-upload if we can't access chunks
-    if not chunks:
-        raise HTTPException(status_code=500, detail="Could not load chunks from index. Re-upload PDF.")
-    print(f"***Generating flashcards and quizzes from {len(chunks)} chunks...")
-    flashcards = flash_agent.generate_from_chunks(chunks)
-    print(f"***Generated {len(flashcards)} flashcards.")
-    quizzes = quiz_agent.generate_from_chunks(chunks)
-    print(f"***Generated {len(quizzes)} quizzes.")
-    # simple topic list: get first lines of chunks as topics (naive)
-    topics = []
-    for c in chunks:
-        first_line = c.split("\n")[0][:80]
-        topics.append(first_line or "Topic")
+        for f in files:
+            saved.append(await _save_upload(f))
+    except HTTPException:
+        # One bad file rejects the whole batch: don't leave the files saved
+        # before it in UPLOAD_DIR with no job to ingest them
+        for s in saved:
+            if s.created:
+                try:
+                    os.remove(s.path)
+                except OSError:
+                    pass
+        raise
+    job = job_manager.submit(
+        "ingest_pdfs", _run_ingest, [(s.path, s.filename, s.sha256) for s in saved], collection, total=len(saved)
+    )
+    return {"job_id": job.id, "status": job.status, "status_url": f"/jobs/{job.id}"}
+
+@app.get("/documents")
+async def list_documents(collection: Optional[str] = None):
+    """Registered documents (optionally one collection), oldest first."""
+    return index_registry.documents(collection)
+
+async def _generate_pages(job, pages):
+    # The job thread's own event loop: both agents send their requests
+    # concurrently through the LLM's async path (apredict), each bounded by
+    # GENERATION_CONCURRENCY, instead of holding a thread per request
+    flashcards, quizzes, topics = [], [], []
+    try:
+        for page in pages:
+            logger.debug("Generating flashcards and quizzes from %d chunks", len(page))
+            cards, items = await asyncio.gather(
+                flash_agent.agenerate_from_chunks(page, on_progress=job.advance),
+                quiz_agent.agenerate_from_chunks(page, on_progress=job.advance),
+            )
+            flashcards.extend(cards)
+            quizzes.extend(items)
+            # simple topic list: get first lines of chunks as topics (naive)
+            for c in page:
+                first_line = c.split("\n")[0][:80]
+                topics.append(first_line or "Topic")
+    finally:
+        # this loop ends with the job; don't leak its pooled connections
+        await aclose_loop_clients()
+    return flashcards, quizzes, topics
+
+def _run_generation(job, pages):
+    """Blocking generation work executed on a JobManager worker thread.
+
+    `pages` is an iterable of chunk lists, consumed lazily so only one page of
+    source text is held in memory at a time.
+    """
+    flashcards, quizzes, topics = asyncio.run(_generate_pages(job, pages))
+    logger.info("Generated %d flashcards and %d quizzes", len(flashcards), len(quizzes))
 
     planner = planner_agent.plan_topics(topics)
+    # Every flashcard gets a stable id and enters the review schedule; the new
+    # deck replaces flashcards.json, so cards no longer in it leave the schedule
+    for card in flashcards:
+        card["id"] = card_id(card)
+    planner_agent.schedule_cards([card["id"] for card in flashcards], prune=True)
 
     store_json(flashcards, "./outputs/flashcards.json")
     store_json(quizzes, "./outputs/quizzes.json")
@@ -200,6 +429,34 @@ async def generate_all():
 
     return {"flashcards": len(flashcards), "quizzes": len(quizzes), "plan_items": len(planner)}
 
+@app.post("/generate_all", status_code=202)
+async def generate_all(doc_id: Optional[str] = None):
+    # defaults to the most recently uploaded document
+    doc_id = doc_id or index_registry.latest()
+    if not doc_id or not index_registry.has_index(doc_id):
+        raise HTTPException(status_code=400, detail="No uploaded materials found. Upload a PDF first.")
+    # Ensure full LLM/vectorstore stack is available
+    if FAISS is None:
+        initialize_full_agents()
+    store = index_registry.chunk_store(doc_id)
+    total = len(store)
+    # For MVP we'll ask user to re-upload if we can't access chunks
+    if not total:
+        raise HTTPException(status_code=500, detail="Could not load chunks from index. Re-upload PDF.")
+    pages = store.iter_pages(GENERATION_PAGE_SIZE)
+
+    # Each chunk is processed once by the flashcard agent and once by the quiz agent
+    job = job_manager.submit("generate_all", _run_generation, pages, total=2 * total)
+    return {"job_id": job.id, "status": job.status, "status_url": f"/jobs/{job.id}"}
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
+
 
 @app.post("/run_demo")
 async def run_demo():
@@ -218,6 +475,8 @@ async def run_demo():
         spec.loader.exec_module(demo)
         # demo.main() will save outputs in ./outputs
         demo.main()
+        # the demo deck replaced flashcards.json and its cards are not scheduled
+        planner_agent.schedule_cards([], prune=True)
         # Read outputs summary
         out_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "outputs")
         res = {}
@@ -236,76 +495,171 @@ async def run_demo():
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Demo failed: {e}")
 
-@app.get("/flashcards")
-async def get_flashcards():
-    p = "./outputs/flashcards.json"
-    if not os.path.exists(p):
-        return JSONResponse(content=[])
+def _serve_json_list(request: Request, path: str, label: str, offset: int, limit):
+    """Serve an outputs/*.json list from memory with pagination and ETag support."""
     try:
-        with open(p) as f:
-            data = json.load(f)
+        entry = json_cache.get(path)
     except (json.JSONDecodeError, ValueError):
-        # empty or invalid JSON -> treat as no flashcards
+        # empty or invalid JSON -> treat as no items
         return JSONResponse(content=[])
     except Exception as e:
         # unexpected error reading the file
-        raise HTTPException(status_code=500, detail=f"Error reading flashcards: {e}")
-    return JSONResponse(content=data)
+        raise HTTPException(status_code=500, detail=f"Error reading {label}: {e}")
+    if entry is None:
+        return JSONResponse(content=[])
+
+    paged = isinstance(entry.data, list) and (offset or limit is not None)
+    etag = f'"{entry.etag}-{offset}-{limit}"' if paged else f'"{entry.etag}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if isinstance(entry.data, list):
+        headers["X-Total-Count"] = str(len(entry.data))
+    if etag in [t.strip() for t in request.headers.get("if-none-match", "").split(",")]:
+        return Response(status_code=304, headers=headers)
+
+    if paged:
+        end = None if limit is None else offset + limit
+        body = json.dumps(entry.data[offset:end], ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    else:
+        body = entry.body
+    return Response(content=body, media_type="application/json", headers=headers)
+
+@app.get("/flashcards")
+async def get_flashcards(request: Request, offset: int = Query(0, ge=0), limit: Optional[int] = Query(None, ge=1)):
+    return _serve_json_list(request, "./outputs/flashcards.json", "flashcards", offset, limit)
 
 @app.get("/quizzes")
-async def get_quizzes():
-    p = "./outputs/quizzes.json"
-    if not os.path.exists(p):
-        return JSONResponse(content=[])
-    try:
-        with open(p) as f:
-            data = json.load(f)
-    except (json.JSONDecodeError, ValueError):
-        # empty or invalid JSON -> treat as no quizzes
-        return JSONResponse(content=[])
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error reading quizzes: {e}")
-    return JSONResponse(content=data)
+async def get_quizzes(request: Request, offset: int = Query(0, ge=0), limit: Optional[int] = Query(None, ge=1)):
+    return _serve_json_list(request, "./outputs/quizzes.json", "quizzes", offset, limit)
 
 @app.get("/planner")
-async def get_planner():
-    p = "./outputs/planner.json"
-    if not os.path.exists(p):
-        return JSONResponse(content=[])
-    try:
-        with open(p) as f:
-            data = json.load(f)
-    except (json.JSONDecodeError, ValueError):
-        # empty or invalid JSON -> treat as no planner items
-        return JSONResponse(content=[])
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error reading planner: {e}")
-    return JSONResponse(content=data)
+async def get_planner(request: Request, offset: int = Query(0, ge=0), limit: Optional[int] = Query(None, ge=1)):
+    return _serve_json_list(request, "./outputs/planner.json", "planner", offset, limit)
 
 from pydantic import BaseModel, Field
 
 
+class Review(BaseModel):
+    card_id: str
+    grade: int = Field(ge=0, le=5)
+
+
+class ReviewRequest(BaseModel):
+    reviews: list[Review]
+
+@app.post("/planner/review")
+def record_reviews(req: ReviewRequest):
+    """Record a batch of flashcard reviews (SM-2 grades 0-5) and return the new schedule."""
+    # Plain def: FastAPI runs it on the threadpool, since saving the review state writes to disk
+    unknown = [r.card_id for r in req.reviews if r.card_id not in review_scheduler]
+    if unknown:
+        raise HTTPException(status_code=404, detail=f"Unknown card ids: {', '.join(unknown[:20])}")
+    return planner_agent.record_reviews([(r.card_id, r.grade) for r in req.reviews])
+
+_card_index = (None, {})
+
+def _cards_by_id(entry):
+    # id -> flashcard, rebuilt only when flashcards.json changes
+    global _card_index
+    if entry is None:
+        return {}
+    if _card_index[0] != entry.etag:
+        _card_index = (entry.etag, {c.get("id"): c for c in entry.data if isinstance(c, dict)})
+    return _card_index[1]
+
+@app.get("/planner/due")
+async def due_reviews(limit: int = Query(50, ge=1, le=1000), days_ahead: float = Query(0, ge=0)):
+    """Flashcards due for review (most overdue first), with the card content when available."""
+    due = planner_agent.due_reviews(limit=limit, days_ahead=days_ahead)
+    try:
+        entry = json_cache.get("./outputs/flashcards.json")
+    except (OSError, ValueError):
+        entry = None
+    cards = _cards_by_id(entry)
+    for item in due:
+        item["card"] = cards.get(item["card_id"])
+    return {"due": due, "total_due": review_scheduler.count_due()}
+
+
 class ChatRequest(BaseModel):
     question: str
     # Use a factory for the default to avoid sharing a mutable default between requests
     chat_history: list = Field(default_factory=list)
-
-@app.post("/chat")
-async def chat(req: ChatRequest):
-    if not os.path.exists(FAISS_INDEX_PATH):
+    # Documents to search; by id and/or collection. Neither -> every document.
+    doc_ids: Optional[list] = None
+    collections: Optional[list] = None
+    # "vector", "bm25" or "hybrid"; defaults to RETRIEVAL_MODE
+    retrieval: Optional[str] = None
+
+def _retriever_for(req: ChatRequest):
+    mode = (req.retrieval or RETRIEVAL_MODE).lower()
+    if mode not in RETRIEVAL_MODES:
+        raise HTTPException(status_code=400, detail=f"retrieval must be one of {', '.join(RETRIEVAL_MODES)}")
+    doc_ids = index_registry.resolve(req.doc_ids, req.collections)
+    if not doc_ids:
         raise HTTPException(status_code=400, detail="No index found. Upload PDF first.")
-    # Allow dangerous deserialization for the same reason as above: the index
-    # was created locally by this service. Do NOT enable this if loading files
-    # from untrusted sources.
     if FAISS is None:
         initialize_full_agents()
-    db = FAISS.load_local(FAISS_INDEX_PATH, globals().get('embeddings'), allow_dangerous_deserialization=True)
-    retriever = db.as_retriever(search_kwargs={"k": 3})
+    # Imported here: langchain_core's retriever base is slow to load at startup
+    from utils.fanout_retriever import FanOutRetriever
+
+    # Shards are served from memory and searched in parallel; top-k merged
+    return FanOutRetriever(
+        registry=index_registry, embeddings=globals().get('embeddings'), doc_ids=doc_ids, k=3, mode=mode
+    )
+
+def _cached_answer(req: ChatRequest, retriever):
+    """
+    Look the question up in the answer cache. Returns (hit, store) where
+    `store(answer, sources)` records a fresh answer; both are None when the
+    cache does not apply (disabled, or a follow-up turn with history).
+    Blocking (it may embed the question): call it off the event loop.
+    """
+    if answer_cache is None or req.chat_history:
+        return None, None
+    versions = []
+    for doc_id in retriever.doc_ids:
+        entry = index_registry.get(doc_id) or {}
+        versions.append((doc_id, str(entry.get("version") or entry.get("updated"))))
+    scope = SemanticCache.make_scope(retriever.mode, versions)
+    if retriever.mode == "bm25":
+        # BM25 chats never embed; match (and store) on the normalised question only
+        hit = answer_cache.lookup_exact(scope, req.question, count_miss=True)
+        if hit is not None:
+            return hit, None
+        return None, lambda answer, sources: answer_cache.store(scope, req.question, None, answer, sources)
+    hit = answer_cache.lookup_exact(scope, req.question)
+    if hit is not None:
+        return hit, None
+    emb = globals().get('embeddings')
+    if emb is None:
+        return None, None
+    try:
+        vector = emb.embed_query(req.question)
+    except Exception as e:
+        # the chain can still answer; it just won't be cached
+        metrics.ERRORS.inc(component="answer_cache")
+        logger.warning("answer cache: embedding the question failed, answering uncached: %s", e)
+        return None, None
+    # reuse the vector for retrieval instead of embedding the question twice
+    retriever.query_vectors[req.question] = vector
+    hit = answer_cache.lookup(scope, vector)
+    if hit is not None:
+        return hit, None
+    return None, lambda answer, sources: answer_cache.store(scope, req.question, vector, answer, sources)
+
+@app.post("/chat")
+async def chat(req: ChatRequest):
+    retriever = _retriever_for(req)
+    hit, remember = await run_in_threadpool(_cached_answer, req, retriever)
+    if hit is not None:
+        return {"answer": hit["answer"], "sources": hit["sources"], "cached": True}
     chain = chat_agent.build_chain(retriever)
     inputs = {"question": req.question, "chat_history": req.chat_history}
-    # Validate and run the chain; provide a clearer error if inputs are wrong
+    # Validate and run the chain; provide a clearer error if inputs are wrong.
+    # ainvoke keeps the event loop free while the LLM answers (the providers'
+    # async paths), so many chats can be in flight without a thread each
     try:
-        res = chain(inputs)
+        res = await chain.ainvoke(inputs)
     except ValueError as e:
         # Include expected vs provided keys to help debugging
         expected = getattr(chain, "input_keys", None)
@@ -316,9 +670,104 @@ async def chat(req: ChatRequest):
     answer = res.get("answer")
     docs = res.get("source_documents", [])
     sources = [d.page_content[:400] for d in docs]
+    if remember is not None and answer:
+        remember(answer, sources)
     return {"answer": answer, "sources": sources}
 
+def _sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@app.post("/chat/stream")
+async def chat_stream(req: ChatRequest):
+    """Server-Sent Events variant of /chat: a `sources` event, then `token` events, then `done`."""
+    retriever = _retriever_for(req)
+
+    def events():
+        # Sync generator: Starlette iterates it in a worker thread, so blocking
+        # retrieval and provider streaming do not stall the event loop.
+        try:
+            hit, remember = _cached_answer(req, retriever)
+            if hit is not None:
+                yield _sse("sources", hit["sources"])
+                yield _sse("token", hit["answer"])
+                yield _sse("done", {"cached": True})
+                return
+            docs = retriever.invoke(req.question)
+            sources = [d.page_content[:400] for d in docs]
+            yield _sse("sources", sources)
+            parts = []
+            for token in chat_agent.stream_answer(req.question, docs, req.chat_history):
+                parts.append(token)
+                yield _sse("token", token)
+            if remember is not None and parts:
+                remember("".join(parts), sources)
+            yield _sse("done", {})
+        except Exception as e:
+            metrics.ERRORS.inc(component="chat_stream")
+            logger.warning("chat stream failed: %s", e)
+            yield _sse("error", {"detail": str(e)})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.get("/llm_cache/stats")
+def llm_cache_stats():
+    """Hit/miss counters for the LLM response cache (see utils/llm_cache.py)."""
+    cache = get_llm_cache()
+    if cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **cache.stats()}
+
+@app.get("/llm_router/stats")
+def llm_router_stats():
+    """Per-provider breaker state and rolling latency/error rate (see utils/llm_router.py)."""
+    llm = globals().get('llm')
+    if llm is None or not hasattr(llm, "stats"):
+        return {"enabled": False, "provider": llm_provider}
+    return {"enabled": True, "hedge": llm.hedge, "providers": llm.stats()}
+
+@app.get("/answer_cache/stats")
+def answer_cache_stats():
+    """Hit/miss counters for the semantic /chat answer cache (see utils/semantic_cache.py)."""
+    if answer_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **answer_cache.stats()}
+
+@app.get("/metrics")
+def metrics_endpoint():
+    """Latency histograms and counters in the Prometheus text format (see utils/metrics.py)."""
+    return Response(content=metrics.REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+def warm_up():
+    """Load the LLM stack and the most recently updated index shards before serving traffic."""
+    started = time.perf_counter()
+    try:
+        if FAISS is None:
+            initialize_full_agents()
+        # /chat's retriever class, deferred at import time
+        import utils.fanout_retriever  # noqa: F401
+        # documents() is oldest first
+        docs = index_registry.documents()[::-1]
+        shards = [d["doc_id"] for d in docs if index_registry.has_index(d["doc_id"])][:WARMUP_SHARDS]
+        for doc_id in shards:
+            index_registry.store(doc_id).get()
+        warmup_state.update(status="done", provider=globals().get("llm_provider"), shards=len(shards))
+    except Exception as e:
+        # Not fatal: everything still initializes lazily on first use
+        metrics.ERRORS.inc(component="warmup")
+        logger.exception("warm-up failed")
+        warmup_state.update(status="failed", error=str(e))
+    warmup_state["seconds"] = round(time.perf_counter() - started, 3)
+    logger.info("warm-up %s in %.2fs", warmup_state["status"], warmup_state["seconds"])
+
 # simple health
 @app.get("/health")
 def health():
-    return {"status": "ok"}
+    if warmup_state["status"] == "warming":
+        return JSONResponse(status_code=503, content={"status": "warming"})
+    if warmup_state["status"] == "disabled":
+        return {"status": "ok"}
+    return {"status": "ok", "warmup": warmup_state}
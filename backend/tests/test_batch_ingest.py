@@ -0,0 +1,97 @@
+import os
+import sys
+import json
+import shutil
+
+import fitz
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.index_registry import IndexRegistry
+from utils.ingest import BatchIngestor
+
+
+class FakeVectorStore:
+    def __init__(self, rows):
+        self.rows = rows
+
+    @classmethod
+    def from_embeddings(cls, text_embeddings, embedding, metadatas=None):
+        return cls([(t, list(v), m) for (t, v), m in zip(text_embeddings, metadatas)])
+
+    def save_local(self, path):
+        os.makedirs(path, exist_ok=True)
+        with open(os.path.join(path, "index.faiss"), "w") as f:
+            json.dump(self.rows, f)
+
+
+class RecordingEmbeddings:
+    def __init__(self):
+        self.calls = []
+
+    def embed_documents(self, texts):
+        self.calls.append(len(texts))
+        return [[float(len(t))] for t in texts]
+
+
+def _make_pdf(path, label, pages=3):
+    doc = fitz.open()
+    for i in range(pages):
+        page = doc.new_page()
+        page.insert_text((72, 72), f"{label} page {i}. " + "Some sentence about the topic. " * 3)
+    doc.save(path)
+    doc.close()
+
+
+def test_batch_ingest_reports_per_file_and_batches_embeddings(tmp_path):
+    paths = []
+    for name in ("a", "b", "c"):
+        p = str(tmp_path / f"{name}.pdf")
+        _make_pdf(p, name)
+        paths.append(p)
+    dup = str(tmp_path / "a_copy.pdf")
+    shutil.copy(paths[0], dup)
+    broken = str(tmp_path / "broken.pdf")
+    with open(broken, "wb") as f:
+        f.write(b"not a pdf")
+
+    registry = IndexRegistry(str(tmp_path / "indexes"), loader=None)
+    emb = RecordingEmbeddings()
+    ingestor = BatchIngestor(
+        registry, emb, FakeVectorStore, reader_kwargs={"chunk_tokens": 20}, workers=2, embed_batch_size=1000
+    )
+    seen = []
+    files = [(p, os.path.basename(p)) for p in paths + [dup, broken]]
+    results = ingestor.ingest(files, collection="bio", on_result=seen.append)
+
+    assert [r["filename"] for r in results] == ["a.pdf", "b.pdf", "c.pdf", "a_copy.pdf", "broken.pdf"]
+    assert [r["status"] for r in results] == ["indexed", "indexed", "indexed", "duplicate", "error"]
+    assert len(seen) == 5
+    # all three documents went out in one cross-document embedding call
+    assert emb.calls == [sum(r["chunks"] for r in results[:3])]
+
+    for r in results[:3]:
+        doc_id = r["doc_id"]
+        assert registry.has_index(doc_id)
+        assert registry.get(doc_id)["collections"] == ["bio"]
+        assert len(registry.chunk_store(doc_id)) == r["chunks"]
+        assert registry.bm25(doc_id) is not None
+
+    # a second run finds everything already indexed
+    again = ingestor.ingest(files[:3], collection="bio")
+    assert [r["status"] for r in again] == ["unchanged"] * 3
+    assert len(emb.calls) == 1
+
+
+def test_small_embedding_batches_split_by_document(tmp_path):
+    paths = []
+    for name in ("x", "y"):
+        p = str(tmp_path / f"{name}.pdf")
+        _make_pdf(p, name)
+        paths.append(p)
+    registry = IndexRegistry(str(tmp_path / "indexes"), loader=None)
+    emb = RecordingEmbeddings()
+    ingestor = BatchIngestor(registry, emb, FakeVectorStore, reader_kwargs={"chunk_tokens": 20}, workers=1,
+                             embed_batch_size=1)
+    results = ingestor.ingest([(p, os.path.basename(p)) for p in paths])
+    assert [r["status"] for r in results] == ["indexed", "indexed"]
+    assert emb.calls == [r["chunks"] for r in results]
@@ -0,0 +1,106 @@
+import os
+import sys
+import json
+import re
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from agents.flashcard import FlashcardAgent
+from agents.quiz import QuizAgent
+from utils.batching import pack_chunks, split_batch_response
+from utils.llm_providers import output_token_limit
+
+
+class BatchEchoLLM:
+    """Answers batched prompts keyed by chunk number, skipping chunk 'skip'."""
+    def __init__(self):
+        self.calls = 0
+
+    def predict(self, prompt):
+        self.calls += 1
+        found = re.findall(r"### Chunk (\d+)\n(\S+)", prompt)
+        if found:
+            return json.dumps({i: [{"question": w, "answer": w}] for i, w in found if w != "skip"})
+        return json.dumps([{"question": "single", "answer": "single"}])
+
+
+class TruncatingLLM:
+    """Batch answers run out of output after `fits` chunks, mid-entry."""
+    def __init__(self, fits, num_predict=2048):
+        self.fits = fits
+        self.num_predict = num_predict
+        self.prompts = []
+
+    def predict(self, prompt):
+        self.prompts.append(re.findall(r"### Chunk (\d+)\n", prompt))
+        found = re.findall(r"### Chunk (\d+)\n(\S+)", prompt)
+        if not found:
+            return json.dumps([{"question": "single", "answer": "single"}])
+        text = json.dumps({i: [{"question": w, "answer": w}] for i, w in found})
+        if len(found) <= self.fits:
+            return text
+        cut = text.index(f'"{found[self.fits][0]}"')
+        return text[:cut + 12]
+
+
+def test_pack_chunks_respects_budget_and_order():
+    chunks = ["word " * 50] * 10
+    groups = pack_chunks(chunks, max_tokens=160, max_chunks=8)
+    assert [i for g in groups for i in g] == list(range(10))
+    assert all(len(g) <= 3 for g in groups)
+    assert pack_chunks(["word " * 500], max_tokens=10) == [[0]]
+
+
+def test_pack_chunks_leaves_room_for_every_answer():
+    groups = pack_chunks(["word"] * 8, max_tokens=10_000, max_output_tokens=2048, output_tokens_per_chunk=400)
+    assert [len(g) for g in groups] == [5, 3]
+    assert pack_chunks(["word"] * 2, 10_000, max_output_tokens=100, output_tokens_per_chunk=400) == [[0], [1]]
+
+
+def test_output_token_limit_uses_the_smallest_provider_cap():
+    class Router:
+        providers = [TruncatingLLM(1, num_predict=2048), TruncatingLLM(1, num_predict=-1), BatchEchoLLM()]
+
+    assert output_token_limit(TruncatingLLM(1)) == 2048
+    assert output_token_limit(Router()) == 2048
+    assert output_token_limit(BatchEchoLLM()) is None
+
+
+def test_split_batch_response_keeps_complete_entries_of_truncated_output():
+    text = '{"0": [{"question": "a", "answer": "a"}], "1": [{"question": "b", "answer": "b"}], "2": [{"quest'
+    assert split_batch_response(text, [0, 1, 2]) == {
+        0: [{"question": "a", "answer": "a"}], 1: [{"question": "b", "answer": "b"}],
+    }
+
+
+def test_split_batch_response_salvages_object():
+    text = 'Sure! {"0": [{"question": "q"}], "2": "bad"} thanks'
+    assert split_batch_response(text, [0, 1, 2]) == {0: [{"question": "q"}]}
+    assert split_batch_response("[]", [0]) is None
+
+
+def test_batched_generation_cuts_calls_and_keeps_order():
+    llm = BatchEchoLLM()
+    chunks = [f"c{i} body" for i in range(6)]
+    agent = FlashcardAgent(llm=llm, batch_tokens=10_000, max_batch_chunks=3, max_concurrency=2)
+    out = agent.generate_from_chunks(chunks)
+    assert [c["question"] for c in out] == [f"c{i}" for i in range(6)]
+    assert llm.calls == 2
+
+
+def test_chunk_missing_from_batch_falls_back_to_single_request():
+    llm = BatchEchoLLM()
+    agent = QuizAgent(llm=llm, batch_tokens=10_000)
+    out = agent.generate_from_chunks(["a x", "skip y", "b z"])
+    assert [q["question"] for q in out] == ["a", "single", "b"]
+    assert all(q["difficulty"] == "Medium" for q in out)
+    assert llm.calls == 2
+
+
+def test_truncated_batch_re_requests_only_missing_chunks():
+    llm = TruncatingLLM(fits=2)
+    chunks = [f"c{i} body" for i in range(5)]
+    agent = FlashcardAgent(llm=llm, batch_tokens=10_000, max_batch_chunks=8)
+    out = agent.generate_from_chunks(chunks)
+    assert [c["question"] for c in out] == ["c0", "c1", "c2", "c3", "single"]
+    # the last straggler goes out on its own with the single-chunk prompt
+    assert llm.prompts == [["0", "1", "2", "3", "4"], ["2", "3", "4"], []]
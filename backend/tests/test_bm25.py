@@ -0,0 +1,100 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from langchain_core.documents import Document
+
+from utils.bm25 import BM25Index, reciprocal_rank_fusion, tokenize
+from utils.index_registry import IndexRegistry, FanOutRetriever
+
+CHUNKS = [
+    "Photosynthesis converts light energy into chemical energy in chloroplasts.",
+    "Mitochondria are the site of cellular respiration and ATP production.",
+    "The Krebs cycle runs in the mitochondrial matrix.",
+    "Chloroplasts contain chlorophyll, which absorbs light.",
+]
+
+
+def test_tokenize_drops_stopwords_and_punctuation():
+    assert tokenize("What is the Krebs-cycle?") == ["krebs", "cycle"]
+
+
+def test_search_ranks_keyword_matches():
+    index = BM25Index.build(CHUNKS)
+    hits = index.search("where is ATP produced in mitochondria", k=3)
+    assert hits[0][0] == 1
+    assert {i for i, _ in hits} <= {1, 2}
+    assert all(score > 0 for _, score in hits)
+    assert [i for i, _ in index.search("chloroplasts light", k=2)] in ([0, 3], [3, 0])
+    assert index.search("quantum chromodynamics") == []
+
+
+def test_save_load_roundtrip(tmp_path):
+    index = BM25Index.build(CHUNKS)
+    path = str(tmp_path / "bm25.npz")
+    index.save(path)
+    loaded = BM25Index.load(path)
+    assert len(loaded) == len(CHUNKS)
+    assert loaded.search("krebs cycle", k=2) == index.search("krebs cycle", k=2)
+
+
+def test_reciprocal_rank_fusion_rewards_agreement():
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["b", "d"]], k=60)
+    assert fused[0] == "b"
+    assert set(fused) == {"a", "b", "c", "d"}
+    assert reciprocal_rank_fusion([["a", "b"], ["b"]], limit=1) == ["b"]
+
+
+class FakeVectorStore:
+    def __init__(self, doc_id, order):
+        self.doc_id, self.order = doc_id, order
+
+    def exists(self):
+        return True
+
+    def get(self):
+        return self
+
+    def similarity_search_with_score_by_vector(self, embedding, k=4):
+        return [
+            (Document(page_content=CHUNKS[i], metadata={"doc_id": self.doc_id, "chunk": i}), float(r))
+            for r, i in enumerate(self.order[:k])
+        ]
+
+
+class CountingEmbeddings:
+    def __init__(self):
+        self.calls = 0
+
+    def embed_query(self, text):
+        self.calls += 1
+        return [0.0]
+
+
+def _registry(tmp_path, vector_order):
+    reg = IndexRegistry(str(tmp_path), loader=None)
+    reg.chunk_store("d").write(CHUNKS)
+    BM25Index.build(CHUNKS).save(reg.bm25_path("d"))
+    reg.register("d", chunks=len(CHUNKS))
+    reg._stores["d"] = FakeVectorStore("d", vector_order)
+    return reg
+
+
+def test_bm25_mode_needs_no_embeddings(tmp_path):
+    reg = _registry(tmp_path, [0, 1, 2, 3])
+    emb = CountingEmbeddings()
+    retriever = FanOutRetriever(registry=reg, embeddings=emb, doc_ids=["d"], k=1, mode="bm25")
+    docs = retriever.invoke("Krebs cycle")
+    assert [d.metadata["chunk"] for d in docs] == [2]
+    assert emb.calls == 0
+
+
+def test_hybrid_mode_fuses_both_rankings(tmp_path):
+    # vector search puts chunk 2 second; BM25 puts it first -> fused first
+    reg = _registry(tmp_path, [1, 2, 0, 3])
+    emb = CountingEmbeddings()
+    retriever = FanOutRetriever(registry=reg, embeddings=emb, doc_ids=["d"], k=2, mode="hybrid")
+    docs = retriever.invoke("Krebs cycle mitochondrial matrix")
+    assert docs[0].metadata["chunk"] == 2
+    assert len({d.metadata["chunk"] for d in docs}) == 2
+    assert emb.calls == 1
@@ -0,0 +1,34 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from agents.chat_agent import ChatAgent
+
+
+class Doc:
+    def __init__(self, text):
+        self.page_content = text
+
+
+class StreamingLLM:
+    def __init__(self):
+        self.prompts = []
+
+    def stream(self, prompt):
+        self.prompts.append(prompt)
+        yield from ["Chloro", "phyll", ""]
+
+
+def test_stream_answer_yields_tokens_with_context_in_prompt():
+    llm = StreamingLLM()
+    agent = ChatAgent(llm=llm, embeddings=object())
+    tokens = list(agent.stream_answer(
+        "What captures light?",
+        [Doc("Chlorophyll captures light.")],
+        [["What is photosynthesis?", "Turning light into energy."]],
+    ))
+    assert tokens == ["Chloro", "phyll"]
+    prompt = llm.prompts[0]
+    assert "Chlorophyll captures light." in prompt
+    assert "Student: What is photosynthesis?" in prompt
+    assert prompt.rstrip().endswith("Helpful answer:")
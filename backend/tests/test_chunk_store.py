@@ -0,0 +1,57 @@
+import os
+import sys
+import json
+from array import array
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils import chunk_store
+from utils.chunk_store import ChunkStore
+
+
+def test_pages_stream_every_chunk_in_order(tmp_path):
+    store = ChunkStore(str(tmp_path / "chunks.jsonl"))
+    assert len(store) == 0
+    chunks = [f"chunk {i}\nwith ünïcode and \"quotes\"" for i in range(130)]
+    assert store.write(iter(chunks)) == 130
+    pages = list(store.iter_pages(64))
+    assert [len(p) for p in pages] == [64, 64, 2]
+    assert [c for p in pages for c in p] == chunks
+    assert store.get(77) == chunks[77]
+
+
+def test_rewrite_is_picked_up_by_other_readers(tmp_path):
+    path = str(tmp_path / "chunks.jsonl")
+    writer, reader = ChunkStore(path), ChunkStore(path)
+    writer.write(["a", "b", "c"])
+    assert len(reader) == 3
+    writer.write(["only"])
+    assert reader.read_range(0, 10) == ["only"]
+
+
+def test_reader_never_pairs_offsets_with_another_writes_data(tmp_path, monkeypatch):
+    monkeypatch.setattr(chunk_store, "_PAIR_RETRIES", 2)
+    path = str(tmp_path / "chunks.jsonl")
+    writer, reader = ChunkStore(path), ChunkStore(path)
+    writer.write(["old"] * 3)
+    assert reader.read_range(0, 3) == ["old"] * 3
+    # a rewrite caught between its two swaps: new data, old index
+    old_index = open(writer.index_path, "rb").read()
+    writer.write(["a much longer new chunk"] * 5)
+    new_index = open(writer.index_path, "rb").read()
+    with open(writer.index_path, "wb") as f:
+        f.write(old_index)
+    with pytest.raises(RuntimeError):
+        reader.read_range(0, 5)
+    with open(writer.index_path, "wb") as f:
+        f.write(new_index)
+    assert reader.read_range(0, 5) == ["a much longer new chunk"] * 5
+
+
+def test_stores_without_a_generation_header_still_read(tmp_path):
+    path = tmp_path / "chunks.jsonl"
+    lines = [json.dumps({"id": i, "text": t}).encode() + b"\n" for i, t in enumerate(["x", "y"])]
+    path.write_bytes(b"".join(lines))
+    (tmp_path / "chunks.jsonl.idx").write_bytes(array("Q", [0, len(lines[0])]).tobytes())
+    assert ChunkStore(str(path)).read_range(0, 2) == ["x", "y"]
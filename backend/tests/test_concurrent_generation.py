@@ -0,0 +1,69 @@
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from agents.flashcard import FlashcardAgent
+from agents.quiz import QuizAgent
+
+
+class SlowEchoLLM:
+    """Echoes the chunk back after a random delay so completion order differs."""
+    def predict(self, prompt: str) -> str:
+        time.sleep(random.uniform(0, 0.02))
+        return self.echo(prompt)
+
+    @staticmethod
+    def echo(prompt: str) -> str:
+        marker = prompt.split("CHUNK-", 1)[1].split()[0]
+        if marker == "boom":
+            raise RuntimeError("provider failure")
+        return json.dumps([{"question": f"Q{marker}", "answer": f"A{marker}",
+                            "options": ["A", "B", "C", "D"]}])
+
+
+def test_flashcards_keep_chunk_order_with_concurrency():
+    chunks = [f"CHUNK-{i} text" for i in range(20)]
+    agent = FlashcardAgent(llm=SlowEchoLLM(), max_concurrency=8)
+    out = agent.generate_from_chunks(chunks)
+    assert [c["question"] for c in out] == [f"Q{i}" for i in range(20)]
+
+
+def test_quiz_failure_is_isolated_to_its_chunk():
+    chunks = ["CHUNK-0 a", "CHUNK-boom b", "CHUNK-2 c"]
+    agent = QuizAgent(llm=SlowEchoLLM(), max_concurrency=3)
+    out = agent.generate_from_chunks(chunks)
+    assert [q["question"] for q in out] == ["Q0", "Q2"]
+    assert all(q["difficulty"] == "Medium" for q in out)
+
+
+class AsyncEchoLLM(SlowEchoLLM):
+    """Native async path that records how many requests are in flight."""
+    def __init__(self):
+        self.in_flight = self.peak = 0
+
+    async def apredict(self, prompt: str) -> str:
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        try:
+            await asyncio.sleep(random.uniform(0, 0.02))
+            return self.echo(prompt)
+        finally:
+            self.in_flight -= 1
+
+
+def test_async_generation_is_bounded_and_ordered():
+    llm = AsyncEchoLLM()
+    chunks = [f"CHUNK-{i} text" for i in range(30)]
+    progress = []
+    out = asyncio.run(FlashcardAgent(llm=llm, max_concurrency=5).agenerate_from_chunks(chunks, progress.append))
+    assert [c["question"] for c in out] == [f"Q{i}" for i in range(30)]
+    assert llm.peak == 5 and sum(progress) == 30
+
+    # predict-only LLMs run on worker threads; failures stay isolated
+    quiz = QuizAgent(llm=SlowEchoLLM(), max_concurrency=3)
+    out = asyncio.run(quiz.agenerate_from_chunks(["CHUNK-0 a", "CHUNK-boom b", "CHUNK-2 c"]))
+    assert [q["question"] for q in out] == ["Q0", "Q2"]
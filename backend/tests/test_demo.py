@@ -38,3 +38,22 @@ def test_run_demo_endpoint():
     assert body.get("status") == "ok"
     summary = body.get("summary")
     assert isinstance(summary, dict)
+
+
+def test_dummy_llm_latency_failures_and_batches():
+    from demo_runner import DummyLLM
+
+    llm = DummyLLM(latency=0.01, failure_rate=0.5, seed=1)
+    outcomes = []
+    for _ in range(20):
+        try:
+            json.loads(llm.predict("You are a flashcard generator."))
+            outcomes.append(True)
+        except RuntimeError:
+            outcomes.append(False)
+    assert llm.calls == 20 and llm.failures == outcomes.count(False)
+    assert 0 < llm.failures < 20
+    assert min(llm.latencies) >= 0.01
+
+    batched = json.loads(DummyLLM().predict("Flashcard generator.\nChunks:\n\n### Chunk 3\nx\n\n### Chunk 4\ny"))
+    assert set(batched) == {"3", "4"} and batched["3"][0]["question"]
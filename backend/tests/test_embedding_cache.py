@@ -0,0 +1,35 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.embedding_cache import CachedEmbeddings
+
+
+class CountingEmbeddings:
+    model = "counting"
+
+    def __init__(self):
+        self.embedded = []
+
+    def embed_documents(self, texts):
+        self.embedded.extend(texts)
+        return [[float(len(t)), 1.0] for t in texts]
+
+    def embed_query(self, text):
+        return [float(len(text)), 1.0]
+
+
+def test_only_new_chunks_reach_the_provider(tmp_path):
+    path = str(tmp_path / "emb.sqlite3")
+    inner = CountingEmbeddings()
+    emb = CachedEmbeddings(inner, path=path)
+    first = emb.embed_documents(["alpha", "beta", "alpha"])
+    assert inner.embedded == ["alpha", "beta"]
+    assert first[0] == first[2] == [5.0, 1.0]
+
+    # Edited document: one chunk changed, persisted cache survives a restart
+    inner2 = CountingEmbeddings()
+    emb2 = CachedEmbeddings(inner2, path=path)
+    assert emb2.embed_documents(["alpha", "gamma!"]) == [[5.0, 1.0], [6.0, 1.0]]
+    assert inner2.embedded == ["gamma!"]
+    assert emb2.stats() == {"hits": 1, "misses": 1}
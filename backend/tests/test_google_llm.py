@@ -0,0 +1,73 @@
+import os
+import sys
+import asyncio
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils import google_llm
+from utils.google_llm import GoogleLLM
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeModel:
+    instances = 0
+    async_loop = None  # like genai's shared grpc.aio client: bound to one loop
+
+    def __init__(self, model_name, generation_config):
+        FakeModel.instances += 1
+        self.config = generation_config
+
+    def generate_content(self, prompt, stream=False):
+        return FakeResponse(f"sync:{prompt}")
+
+    async def generate_content_async(self, prompt):
+        loop = asyncio.get_running_loop()
+        if FakeModel.async_loop is None:
+            FakeModel.async_loop = loop
+        elif FakeModel.async_loop is not loop:
+            raise RuntimeError("attached to a different loop")
+        return FakeResponse(f"async:{prompt}")
+
+
+def _llm(monkeypatch, **kwargs):
+    monkeypatch.setenv("GOOGLE_API_KEY", "test-key")
+    monkeypatch.setenv("LLM_CACHE_ENABLED", "false")
+    monkeypatch.setattr(google_llm.genai, "configure", lambda **kw: None)
+    monkeypatch.setattr(google_llm.genai, "GenerativeModel", FakeModel)
+    google_llm.get_gemini_model.cache_clear()
+    FakeModel.instances = 0
+    FakeModel.async_loop = None
+    return GoogleLLM(**kwargs)
+
+
+def test_model_handle_is_reused_per_configuration(monkeypatch):
+    llm = _llm(monkeypatch)
+    assert llm.predict("a") == "sync:a"
+    assert llm.predict("b") == "sync:b"
+    assert FakeModel.instances == 1
+    GoogleLLM(temperature=0.7).predict("c")
+    assert FakeModel.instances == 2
+
+
+def test_async_path_runs_concurrently(monkeypatch):
+    llm = _llm(monkeypatch)
+
+    async def run():
+        return await asyncio.gather(*(llm.apredict(str(i)) for i in range(10)))
+
+    assert asyncio.run(run()) == [f"sync:{i}" for i in range(10)]
+    assert FakeModel.instances == 1
+
+
+def test_async_calls_work_on_every_event_loop(monkeypatch):
+    # each generation job runs on its own asyncio.run loop
+    llm = _llm(monkeypatch)
+
+    async def job(tag):
+        return await asyncio.gather(*(llm.apredict(f"{tag}{i}") for i in range(3)))
+
+    assert asyncio.run(job("a")) == ["sync:a0", "sync:a1", "sync:a2"]
+    assert asyncio.run(job("b")) == ["sync:b0", "sync:b1", "sync:b2"]
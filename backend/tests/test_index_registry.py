@@ -0,0 +1,104 @@
+import os
+import sys
+import json
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from langchain_core.documents import Document
+
+from utils.index_registry import IndexRegistry, FanOutRetriever
+
+
+class FakeStore:
+    """Stores (text, distance) pairs; 'search' returns them sorted by distance."""
+
+    def __init__(self, hits):
+        self.hits = hits
+
+    def save_local(self, path):
+        os.makedirs(path, exist_ok=True)
+        with open(os.path.join(path, "index.faiss"), "w") as f:
+            json.dump(self.hits, f)
+
+    def similarity_search_with_score_by_vector(self, embedding, k=4):
+        hits = sorted(self.hits, key=lambda h: h[1])[:k]
+        return [(Document(page_content=t), d) for t, d in hits]
+
+
+def _load(path):
+    with open(os.path.join(path, "index.faiss")) as f:
+        return FakeStore(json.load(f))
+
+
+class FakeEmbeddings:
+    def __init__(self):
+        self.calls = 0
+
+    def embed_query(self, text):
+        self.calls += 1
+        return [0.0]
+
+
+def _add(reg, doc_id, hits, collection="default"):
+    reg.store(doc_id).publish(FakeStore(hits))
+    reg.register(doc_id, collection=collection, chunks=len(hits))
+
+
+def test_register_resolve_and_latest(tmp_path):
+    reg = IndexRegistry(str(tmp_path), loader=_load)
+    _add(reg, "a", [["a1", 0.1]], collection="bio")
+    _add(reg, "b", [["b1", 0.2]], collection="chem")
+    _add(reg, "c", [["c1", 0.3]], collection="bio")
+
+    assert reg.latest() == "c"
+    assert reg.resolve() == ["a", "b", "c"]
+    assert reg.resolve(collections=["bio"]) == ["a", "c"]
+    assert reg.resolve(doc_ids=["b"], collections=["bio"]) == ["a", "b", "c"]
+    assert [d["doc_id"] for d in reg.documents("chem")] == ["b"]
+
+    # re-registering bumps a document to latest; a fresh registry sees the file
+    reg.register("a")
+    other = IndexRegistry(str(tmp_path), loader=_load)
+    assert other.latest() == "a"
+    assert other.has_index("b") and not other.has_index("zzz")
+
+
+def test_document_keeps_every_collection_it_was_added_to(tmp_path):
+    reg = IndexRegistry(str(tmp_path), loader=_load)
+    _add(reg, "a", [["a1", 0.1]], collection="bio")
+    # same PDF uploaded again under another collection
+    reg.register("a", collection="exam")
+    reg.register("a", collection="bio")
+    assert reg.get("a")["collections"] == ["bio", "exam"]
+    assert [d["doc_id"] for d in reg.documents("bio")] == ["a"]
+    assert reg.resolve(collections=["exam"]) == ["a"]
+
+    # entries written with a single "collection" field are still matched
+    reg._docs["old"] = {"doc_id": "old", "collection": "chem", "updated": 0}
+    reg._save()
+    assert reg.resolve(collections=["chem"]) == ["old"]
+    assert reg.register("old", collection="bio")["collections"] == ["chem", "bio"]
+
+
+def test_search_merges_shards_by_distance(tmp_path):
+    reg = IndexRegistry(str(tmp_path), loader=_load)
+    _add(reg, "a", [["a1", 0.5], ["a2", 0.9]])
+    _add(reg, "b", [["b1", 0.1], ["b2", 0.7]])
+
+    hits = reg.search([0.0], ["a", "b"], k=3)
+    assert [(d.page_content, s) for d, s in hits] == [("b1", 0.1), ("a1", 0.5), ("b2", 0.7)]
+    assert [d.metadata["doc_id"] for d, _ in hits] == ["b", "a", "b"]
+
+    # restricted to one shard
+    assert [d.page_content for d, _ in reg.search([0.0], ["a"], k=3)] == ["a1", "a2"]
+
+
+def test_fan_out_retriever_embeds_once(tmp_path):
+    reg = IndexRegistry(str(tmp_path), loader=_load)
+    for i in range(4):
+        _add(reg, f"d{i}", [[f"t{i}", float(i)]])
+    emb = FakeEmbeddings()
+    retriever = FanOutRetriever(registry=reg, embeddings=emb, doc_ids=reg.resolve(), k=2)
+
+    docs = retriever.invoke("question")
+    assert [d.page_content for d in docs] == ["t0", "t1"]
+    assert emb.calls == 1
@@ -0,0 +1,51 @@
+import os
+import sys
+import time
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.jobs import JobManager
+
+
+def _wait(job, timeout=5):
+    deadline = time.time() + timeout
+    while job.status in ("queued", "running") and time.time() < deadline:
+        time.sleep(0.01)
+
+
+def test_job_reports_progress_and_result():
+    release = threading.Event()
+
+    def work(job, n):
+        for _ in range(n):
+            job.advance()
+        release.wait(5)
+        return {"count": n}
+
+    mgr = JobManager(max_concurrent_jobs=1)
+    job = mgr.submit("demo", work, 3, total=3)
+    while job.done < 3:
+        time.sleep(0.01)
+    assert job.to_dict()["progress"] == {"done": 3, "total": 3}
+    release.set()
+    _wait(job)
+    assert job.to_dict()["status"] == "done"
+    assert job.result == {"count": 3}
+
+
+def test_jobs_beyond_cap_wait_and_failures_are_recorded():
+    release = threading.Event()
+    mgr = JobManager(max_concurrent_jobs=1)
+    first = mgr.submit("slow", lambda job: release.wait(5))
+
+    def boom(job):
+        raise RuntimeError("bad chunk")
+
+    second = mgr.submit("boom", boom)
+    time.sleep(0.05)
+    assert second.status == "queued"
+    release.set()
+    _wait(first)
+    _wait(second)
+    assert second.status == "failed" and second.error == "bad chunk"
+    assert mgr.get(second.id) is second
@@ -0,0 +1,55 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.llm_cache import LLMCache
+
+
+def test_cache_hits_memory_then_disk(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    cache = LLMCache(path=path, max_memory_items=2)
+    key = LLMCache.make_key("ollama", "mistral", {"temperature": 0.1}, "prompt")
+    assert cache.get(key) is None
+    cache.set(key, "answer", latency=1.5)
+    assert cache.get(key) == "answer"
+
+    # A fresh instance only has the on-disk tier
+    reopened = LLMCache(path=path)
+    assert reopened.get(key) == "answer"
+    stats = reopened.stats()
+    assert stats["disk_hits"] == 1
+    assert stats["seconds_saved"] == 1.5
+
+
+def test_key_depends_on_sampling_parameters():
+    a = LLMCache.make_key("google_generative_ai", "gemini", {"temperature": 0.1}, "p")
+    b = LLMCache.make_key("google_generative_ai", "gemini", {"temperature": 0.7}, "p")
+    assert a != b
+
+
+def test_disk_tier_is_size_bounded(tmp_path):
+    cache = LLMCache(path=str(tmp_path / "c.sqlite3"), max_memory_items=1, max_disk_items=3)
+    for i in range(5):
+        cache.set(f"k{i}", f"v{i}")
+    cache._evict()
+    assert cache.stats()["disk_items"] == 3
+    assert cache.get("k0") is None
+    assert cache.get("k4") == "v4"
+
+
+def test_hits_do_not_write_to_disk_until_the_next_set(tmp_path):
+    path = str(tmp_path / "c.sqlite3")
+    writer = LLMCache(path=path, max_memory_items=1, max_disk_items=3)
+    for i in range(3):
+        writer.set(f"k{i}", f"v{i}")
+
+    cache = LLMCache(path=path, max_memory_items=1, max_disk_items=3)
+    changes = cache._conn.total_changes
+    assert cache.get("k0") == "v0"  # disk hit: k0 is now the most recently used
+    assert cache._conn.total_changes == changes and not cache._conn.in_transaction
+
+    # the bump is written with the next set, so eviction drops k1 (not k0)
+    cache.set("k3", "v3")
+    cache._evict()
+    assert cache.get("k1") is None
+    assert cache.get("k0") == "v0"
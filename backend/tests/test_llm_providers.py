@@ -0,0 +1,64 @@
+import os
+import sys
+import subprocess
+
+import pytest
+from fastapi.testclient import TestClient
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+from utils import llm_providers
+
+
+class FakeLLM:
+    def __init__(self, **kwargs):
+        self.kwargs = kwargs
+
+
+def working(**kwargs):
+    return FakeLLM(**kwargs)
+
+
+def broken(**kwargs):
+    raise RuntimeError("not running")
+
+
+def test_importing_main_does_not_load_provider_sdks():
+    code = (
+        "import sys, main; "
+        "print('loaded=' + ','.join(m for m in ('google.generativeai', 'langchain_openai', 'utils.google_llm', "
+        "'utils.ollama_llm', 'langchain_core', 'langchain') if m in sys.modules))"
+    )
+    out = subprocess.run([sys.executable, "-c", code], cwd=BACKEND, capture_output=True, text=True, check=True)
+    # PyMuPDF may print its own notice first; only the last line is ours
+    assert out.stdout.strip().splitlines()[-1] == "loaded="
+
+
+def test_registry_imports_lazily_and_falls_back(monkeypatch):
+    monkeypatch.setitem(llm_providers.PROVIDERS, "t_broken", f"{__name__}:broken")
+    monkeypatch.setitem(llm_providers.PROVIDERS, "t_ok", f"{__name__}:working")
+    name, llm = llm_providers.create_first(["t_broken", "t_ok"], {"t_ok": {"model": "m"}})
+    assert name == "t_ok" and llm.kwargs == {"model": "m"}
+    assert "t_ok" in llm_providers.import_seconds
+
+    with pytest.raises(RuntimeError):
+        llm_providers.create_first(["t_broken"])
+    with pytest.raises(ValueError):
+        llm_providers.create_llm("nope")
+    assert llm_providers.configured_providers(True, None, "sk") == ["ollama", "openai"]
+
+
+def test_health_waits_for_warm_up(monkeypatch):
+    import main
+
+    client = TestClient(main.app)
+    monkeypatch.setitem(main.warmup_state, "status", "warming")
+    assert client.get("/health").status_code == 503
+
+    # warm-up failures are reported but don't keep the pod out of rotation
+    monkeypatch.setattr(main, "initialize_full_agents", lambda: (_ for _ in ()).throw(RuntimeError("no key")))
+    monkeypatch.setattr(main, "FAISS", None)
+    main.warm_up()
+    res = client.get("/health")
+    assert res.status_code == 200
+    assert res.json()["warmup"]["status"] == "failed"
@@ -0,0 +1,153 @@
+import os
+import sys
+import time
+import asyncio
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils import metrics
+from utils.llm_router import ProviderHealth, RouterLLM, OPEN, HALF_OPEN, CLOSED
+
+
+class FakeProvider:
+    def __init__(self, name, delay=0.0, fail=False):
+        self.name = name
+        self.delay = delay
+        self.fail = fail
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def predict(self, prompt):
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError(f"{self.name} down")
+        return f"{self.name}:{prompt}"
+
+    async def apredict(self, prompt):
+        with self._lock:
+            self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError(f"{self.name} down")
+        return f"{self.name}:{prompt}"
+
+    def stream(self, prompt):
+        if self.fail:
+            raise RuntimeError(f"{self.name} down")
+        yield from (self.name, ":", prompt)
+
+
+def router(*providers, **kwargs):
+    kwargs.setdefault("use_response_cache", False)
+    return RouterLLM(providers=list(providers), names=[p.name for p in providers], **kwargs)
+
+
+def test_breaker_opens_then_probes_after_cooldown():
+    now = [0.0]
+    h = ProviderHealth("p", 0, failure_threshold=3, cooldown=10, clock=lambda: now[0])
+    for _ in range(3):
+        assert h.acquire()
+        h.record(False)
+    assert h.state == OPEN and not h.available()
+
+    now[0] = 11
+    assert h.acquire() and h.state == HALF_OPEN
+    assert not h.acquire()  # one probe at a time
+    h.record(True, 0.1)
+    assert h.state == CLOSED and h.acquire()
+
+
+def test_failover_and_breaker_skip_failing_provider():
+    bad, good = FakeProvider("bad", fail=True), FakeProvider("good")
+    r = router(bad, good, failure_threshold=2, cooldown=60)
+    assert r.predict("q") == "good:q"
+    assert r.predict("q") == "good:q"
+    assert r.stats()[0]["state"] == OPEN
+    # once open, the failing provider is no longer called
+    for _ in range(5):
+        assert r.predict("q") == "good:q"
+    assert bad.calls == 2
+
+
+def test_routes_to_the_faster_provider():
+    slow, fast = FakeProvider("slow", delay=0.03), FakeProvider("fast")
+    r = router(slow, fast, min_samples=3)
+    for _ in range(10):
+        r.predict("q")
+    # each provider is tried until it has enough samples, then the faster one wins
+    assert slow.calls == 3
+    assert fast.calls == 7
+
+
+def test_hedged_request_bounds_tail_latency():
+    slow, fast = FakeProvider("slow", delay=1.0), FakeProvider("fast")
+    r = router(slow, fast, hedge=True, hedge_default_delay=0.05)
+    wins = metrics.ROUTER_EVENTS.value(provider="fast", event="hedge_win")
+    started = time.perf_counter()
+    assert r.predict("q") == "fast:q"
+    assert time.perf_counter() - started < 0.5
+    assert metrics.ROUTER_EVENTS.value(provider="fast", event="hedge_win") == wins + 1
+
+    async def run():
+        return await r.apredict("q")
+
+    slow.delay = 0.3
+    started = time.perf_counter()
+    assert asyncio.run(run()) == "fast:q"
+    assert time.perf_counter() - started < 0.25
+
+
+def test_stream_fails_over_before_first_token():
+    bad, good = FakeProvider("bad", fail=True), FakeProvider("good")
+    r = router(bad, good)
+    assert "".join(r.stream("q")) == "good:q"
+    assert r.stats()[0]["error_rate"] == 1.0
+
+
+def test_all_providers_failing_raises_last_error():
+    r = router(FakeProvider("a", fail=True), FakeProvider("b", fail=True), failure_threshold=1)
+    with pytest.raises(RuntimeError, match="b down"):
+        r.predict("q")
+    # every breaker is open: the router still probes one provider instead of failing without a call
+    with pytest.raises(RuntimeError):
+        r.predict("q")
+
+
+def test_cache_hits_are_served_in_front_of_routing(monkeypatch):
+    from utils import llm_router
+    from utils.llm_cache import LLMCache
+
+    cache = LLMCache(path=None)
+    monkeypatch.setattr(llm_router, "get_llm_cache", lambda: cache)
+    a, b = FakeProvider("a"), FakeProvider("b")
+    a.use_response_cache = b.use_response_cache = True
+    r = router(a, b, use_response_cache=True)
+    # the router owns caching, so providers never answer from their own cache
+    assert not a.use_response_cache and not b.use_response_cache
+    for _ in range(5):
+        assert r.predict("q") == "a:q"
+    assert asyncio.run(r.apredict("q")) == "a:q"
+    assert a.calls + b.calls == 1
+    # hits are not latency samples
+    assert r.stats()[0]["calls"] == 1
+
+
+def test_router_stats_endpoint(monkeypatch):
+    from fastapi.testclient import TestClient
+    import main
+
+    client = TestClient(main.app)
+    monkeypatch.setattr(main, "llm", FakeProvider("solo"), raising=False)
+    assert client.get("/llm_router/stats").json()["enabled"] is False
+
+    r = router(FakeProvider("a"), FakeProvider("b"))
+    r.predict("q")
+    monkeypatch.setattr(main, "llm", r, raising=False)
+    body = client.get("/llm_router/stats").json()
+    assert body["enabled"] is True
+    assert [p["provider"] for p in body["providers"]] == ["a", "b"]
+    assert body["providers"][0]["calls"] == 1
@@ -0,0 +1,31 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.local_embeddings import HashingEmbeddings, create_embeddings
+
+
+def test_hashing_embeddings_are_normalised_and_stable():
+    emb = HashingEmbeddings(dim=256)
+    docs = emb.embed_documents(["Photosynthesis converts light", "", "Mitochondria produce ATP"])
+    assert len(docs) == 3 and all(len(v) == 256 for v in docs)
+    assert np.isclose(np.linalg.norm(docs[0]), 1.0)
+    assert not any(docs[1])
+    assert np.allclose(emb.embed_query("Photosynthesis converts light"), docs[0])
+
+
+def test_similar_text_scores_higher():
+    emb = HashingEmbeddings(dim=512)
+    q = np.array(emb.embed_query("how does photosynthesis use light"))
+    near, far = np.array(emb.embed_documents([
+        "Photosynthesis uses light energy in plants",
+        "The French revolution began in 1789",
+    ]))
+    assert q @ near > q @ far
+
+
+def test_factory_selects_local_backend(monkeypatch):
+    monkeypatch.setenv("EMBEDDINGS_PROVIDER", "hashing")
+    assert isinstance(create_embeddings(), HashingEmbeddings)
@@ -0,0 +1,99 @@
+import os
+import sys
+import logging
+
+import pytest
+from fastapi.testclient import TestClient
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils import metrics
+from utils.log import log_sampled
+from agents.flashcard import FlashcardAgent
+
+
+def test_histogram_and_counter_render_prometheus_text():
+    registry = metrics.Registry()
+    hist = registry.histogram("t_seconds", "test latency", ("provider",), buckets=(0.1, 1.0))
+    for v in (0.05, 0.5, 0.7, 5.0):
+        hist.observe(v, provider="a")
+    counter = registry.counter("t_items", "test items", ("kind",))
+    counter.inc(3, kind='say "hi"')
+
+    text = registry.render()
+    assert "# TYPE t_seconds histogram" in text
+    assert 't_seconds_bucket{provider="a",le="0.1"} 1' in text
+    assert 't_seconds_bucket{provider="a",le="1.0"} 3' in text
+    assert 't_seconds_bucket{provider="a",le="+Inf"} 4' in text
+    assert 't_seconds_count{provider="a"} 4' in text
+    assert 't_items_total{kind="say \\"hi\\""} 3' in text
+
+    with pytest.raises(ValueError):
+        hist.observe(1.0)
+    # same name, same shape: the existing metric is returned
+    assert registry.histogram("t_seconds", "test latency", ("provider",)) is hist
+
+
+def test_llm_call_records_outcome():
+    before = metrics.LLM_SECONDS.count(provider="t", outcome="error")
+    with pytest.raises(RuntimeError):
+        with metrics.llm_call("t"):
+            raise RuntimeError("boom")
+    with metrics.llm_call("t"):
+        pass
+    assert metrics.LLM_SECONDS.count(provider="t", outcome="error") == before + 1
+    assert metrics.LLM_SECONDS.count(provider="t", outcome="ok") >= 1
+    assert metrics.ERRORS.value(component="llm_t") >= 1
+
+
+def test_log_sampled_emits_first_and_every_nth(caplog):
+    logger = logging.getLogger("study.test_sampled")
+    logger.setLevel(logging.DEBUG)
+    logger.propagate = True
+    with caplog.at_level(logging.DEBUG, logger="study.test_sampled"):
+        for _ in range(25):
+            log_sampled(logger, logging.DEBUG, "test.key", "tick", every=10)
+    assert len(caplog.records) == 3  # 1st, 10th, 20th
+
+
+class FailingLLM:
+    def predict(self, prompt):
+        raise RuntimeError("provider down")
+
+
+def test_agent_errors_and_metrics_endpoint():
+    import main
+
+    errors = metrics.ERRORS.value(component="flashcard")
+    FlashcardAgent(llm=FailingLLM(), max_concurrency=1).generate_from_chunks(["a", "b"])
+    assert metrics.ERRORS.value(component="flashcard") == errors + 2
+
+    client = TestClient(main.app)
+    client.get("/health")
+    res = client.get("/metrics")
+    assert res.status_code == 200
+    assert res.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert 'study_http_request_seconds_count{method="GET",route="/health",status="200"}' in res.text
+    assert 'study_errors_total{component="flashcard"}' in res.text
+
+
+def test_reader_records_extract_and_split(tmp_path):
+    import fitz
+    from agents.reader import ReaderAgent
+
+    path = str(tmp_path / "doc.pdf")
+    doc = fitz.open()
+    for i in range(3):
+        doc.new_page().insert_text((72, 72), f"Page {i}. " + "A sentence about cells. " * 10)
+    doc.save(path)
+    doc.close()
+
+    before = metrics.PDF_EXTRACT_SECONDS.count()
+    reader = ReaderAgent(chunk_tokens=20)
+    chunks = reader.read_pdf(path)
+    assert metrics.PDF_EXTRACT_SECONDS.count() == before + 1
+    assert reader.last_timings["chunks"] == len(chunks)
+    assert reader.last_timings["extract"] > 0
+
+    quiet = ReaderAgent(chunk_tokens=20, record_metrics=False)
+    quiet.read_pdf(path)
+    assert metrics.PDF_EXTRACT_SECONDS.count() == before + 1
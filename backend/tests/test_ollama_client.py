@@ -0,0 +1,77 @@
+import os
+import sys
+import json
+import asyncio
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils import llm_providers, ollama_llm
+from utils.ollama_llm import OllamaLLM
+
+BASE = "http://ollama.test:11434"
+
+
+class FakeTagsSession:
+    def __init__(self):
+        self.calls = 0
+
+    def get(self, url, timeout=None):
+        self.calls += 1
+
+        class Resp:
+            status_code = 200
+
+            def json(self):
+                return {"models": [{"name": "mistral:latest"}]}
+        return Resp()
+
+
+def test_model_probe_is_cached_across_instances(monkeypatch):
+    session = FakeTagsSession()
+    monkeypatch.delenv("OLLAMA_BASE_URL", raising=False)
+    monkeypatch.setattr(ollama_llm, "get_ollama_session", lambda: session)
+    monkeypatch.setattr(ollama_llm, "_models_cache", {})
+    OllamaLLM(base_url=BASE)
+    OllamaLLM(base_url=BASE)
+    assert session.calls == 1
+
+
+def test_acall_uses_shared_async_client(monkeypatch):
+    seen = []
+
+    def handler(request):
+        seen.append(json.loads(request.content))
+        return httpx.Response(200, json={"response": "async answer"})
+
+    monkeypatch.delenv("OLLAMA_BASE_URL", raising=False)
+    monkeypatch.setenv("LLM_CACHE_ENABLED", "false")
+    monkeypatch.setattr(ollama_llm, "_models_cache", {BASE: (float("inf"), ["mistral"])})
+    llm = OllamaLLM(base_url=BASE)
+
+    async def run():
+        client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        monkeypatch.setattr(ollama_llm, "get_ollama_async_client", lambda: client)
+        results = await asyncio.gather(*(llm.apredict(f"p{i}") for i in range(5)))
+        await client.aclose()
+        return results
+
+    assert asyncio.run(run()) == ["async answer"] * 5
+    assert sorted(p["prompt"] for p in seen) == [f"p{i}" for i in range(5)]
+    assert all(p["stream"] is False for p in seen)
+
+
+def test_each_loop_client_is_closed_when_its_loop_is_done():
+    clients = []
+
+    async def job():
+        client = ollama_llm.get_ollama_async_client()
+        assert ollama_llm.get_ollama_async_client() is client
+        clients.append(client)
+        await llm_providers.aclose_loop_clients()
+
+    asyncio.run(job())
+    asyncio.run(job())
+    assert clients[0] is not clients[1]
+    assert all(c.is_closed for c in clients)
+    assert len(ollama_llm._async_clients) == 0
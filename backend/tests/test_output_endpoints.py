@@ -0,0 +1,48 @@
+import os
+import sys
+import json
+
+from fastapi.testclient import TestClient
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from main import app
+
+
+def _write_cards(tmp_path, n):
+    os.makedirs(tmp_path / "outputs", exist_ok=True)
+    cards = [{"question": f"Q{i}?", "answer": f"A{i} " * 20} for i in range(n)]
+    with open(tmp_path / "outputs" / "flashcards.json", "w", encoding="utf-8") as f:
+        json.dump(cards, f)
+    return cards
+
+
+def test_pagination_and_conditional_get(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    cards = _write_cards(tmp_path, 50)
+    client = TestClient(app)
+
+    full = client.get("/flashcards")
+    assert full.json() == cards
+    assert full.headers["x-total-count"] == "50"
+    assert full.headers.get("content-encoding") == "gzip"
+
+    page = client.get("/flashcards", params={"offset": 10, "limit": 5})
+    assert page.json() == cards[10:15]
+    assert page.headers["etag"] != full.headers["etag"]
+
+    again = client.get("/flashcards", headers={"If-None-Match": full.headers["etag"]})
+    assert again.status_code == 304
+
+    # Rewriting the file invalidates the cached copy and the ETag
+    _write_cards(tmp_path, 3)
+    fresh = client.get("/flashcards", headers={"If-None-Match": full.headers["etag"]})
+    assert fresh.status_code == 200 and len(fresh.json()) == 3
+
+
+def test_missing_or_invalid_files_return_empty_list(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    client = TestClient(app)
+    assert client.get("/quizzes").json() == []
+    os.makedirs(tmp_path / "outputs", exist_ok=True)
+    (tmp_path / "outputs" / "planner.json").write_text("")
+    assert client.get("/planner").json() == []
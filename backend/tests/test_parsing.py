@@ -0,0 +1,62 @@
+import os
+import sys
+import json
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.parsing import (
+    StreamingArrayParser,
+    extract_json_array,
+    parse_flashcards,
+    parse_partial_array,
+    parse_quiz,
+)
+
+CARDS = [
+    {"question": "What is [X]?", "answer": 'X is "quoted" }'},
+    {"question": "Why?", "answer": "Because."},
+]
+
+
+def test_array_is_found_after_bracketed_prose():
+    text = "Note [see below]:\n```json\n" + json.dumps(CARDS) + "\n```\n[end]"
+    assert extract_json_array(text) == CARDS
+
+
+def test_pathological_brackets_do_not_blow_up():
+    assert extract_json_array("[" * 5000 + " thinking") is None
+
+
+def test_streaming_parser_emits_items_as_they_complete():
+    text = "Sure:\n" + json.dumps(CARDS)
+    parser = StreamingArrayParser()
+    seen = []
+    for i in range(0, len(text), 5):
+        seen.extend(parser.feed(text[i:i + 5]))
+    assert seen == CARDS and parser.done
+
+
+def test_truncated_output_keeps_complete_items():
+    text = json.dumps(CARDS + [{"question": "cut"}])[:-10]
+    assert parse_partial_array(text) == CARDS
+    cards, path = parse_flashcards(text)
+    assert (cards, path) == (CARDS, "partial")
+
+
+def test_schema_validation_drops_bad_items_and_tags_difficulty():
+    cards, _ = parse_flashcards(json.dumps([{"question": " Q ", "answer": 4}, {"question": ""}, "x"]))
+    assert cards == [{"question": "Q", "answer": "4"}]
+    quiz, path = parse_quiz("Q: What is X?\n- one\n- two\nAnswer: one")
+    assert path == "lines"
+    assert quiz == [{"question": "What is X?", "options": ["- one", "- two"], "answer": "one",
+                     "difficulty": "Medium"}]
+
+
+def test_arrays_of_the_wrong_shape_are_skipped():
+    truncated = ('[{"question": "Q1?", "options": ["a","b","c","d"], "answer": "a"}, '
+                 '{"question": "Q2?", "options": ["a","b"')
+    quiz, path = parse_quiz(truncated)
+    assert path == "partial"
+    assert [q["question"] for q in quiz] == ["Q1?"]
+
+    cards, path = parse_flashcards('Note: [1] ref.\n[{"question":"q","answer":"a"}]')
+    assert (cards, path) == ([{"question": "q", "answer": "a"}], "json")
@@ -0,0 +1,35 @@
+import os
+import sys
+
+import fitz
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from agents.reader import ReaderAgent
+from utils.pdf_utils import iter_pdf_pages, iter_pdf_pages_parallel, extract_text_from_pdf
+
+
+def _make_pdf(path, pages):
+    doc = fitz.open()
+    for i in range(pages):
+        page = doc.new_page()
+        page.insert_text((72, 72), f"Page {i} " + "lorem ipsum dolor sit amet " * 3)
+    doc.save(path)
+    doc.close()
+
+
+def test_parallel_extraction_matches_sequential(tmp_path):
+    path = str(tmp_path / "doc.pdf")
+    _make_pdf(path, 40)
+    sequential = list(iter_pdf_pages(path))
+    parallel = list(iter_pdf_pages_parallel(path, workers=2, pages_per_task=4))
+    assert parallel == sequential
+    assert extract_text_from_pdf(path) == "".join(sequential)
+
+
+def test_streamed_chunks_cover_the_whole_document(tmp_path):
+    path = str(tmp_path / "doc.pdf")
+    _make_pdf(path, 60)
+    reader = ReaderAgent(chunk_size=200, chunk_overlap=0, window_chunks=2)
+    chunks = reader.read_pdf(path)
+    assert "".join(chunks) == extract_text_from_pdf(path)
+    assert all(len(c) <= 200 for c in chunks)
@@ -0,0 +1,84 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.semantic_cache import SemanticCache
+
+SCOPE = SemanticCache.make_scope("hybrid", [("doc-a", "v1")])
+
+
+def test_exact_and_semantic_hits():
+    cache = SemanticCache(threshold=0.9)
+    cache.store(SCOPE, "What is ATP?", [1.0, 0.0, 0.0], "Energy currency.", ["chunk"])
+
+    hit = cache.lookup_exact(SCOPE, "  what is ATP ")
+    assert hit["answer"] == "Energy currency." and hit["sources"] == ["chunk"]
+
+    # close paraphrase vs unrelated question
+    assert cache.lookup(SCOPE, [0.95, 0.1, 0.0])["answer"] == "Energy currency."
+    assert cache.lookup(SCOPE, [0.0, 1.0, 0.0]) is None
+    stats = cache.stats()
+    assert (stats["exact_hits"], stats["semantic_hits"], stats["misses"]) == (1, 1, 1)
+
+
+def test_new_index_version_does_not_match_and_invalidate_drops():
+    cache = SemanticCache()
+    cache.store(SCOPE, "q", [1.0, 0.0], "old answer", [])
+    new_scope = SemanticCache.make_scope("hybrid", [("doc-a", "v2")])
+    assert cache.lookup(new_scope, [1.0, 0.0]) is None
+    assert cache.lookup_exact(new_scope, "q") is None
+
+    other = SemanticCache.make_scope("hybrid", [("doc-b", "v1")])
+    cache.store(other, "q", [1.0, 0.0], "b answer", [])
+    cache.invalidate("doc-a")
+    assert cache.lookup(SCOPE, [1.0, 0.0]) is None
+    assert cache.lookup(other, [1.0, 0.0])["answer"] == "b answer"
+
+
+def test_lru_and_ttl_eviction(monkeypatch):
+    cache = SemanticCache(max_items=2, ttl_seconds=60)
+    cache.store(SCOPE, "one", [1.0, 0.0, 0.0], "1", [])
+    cache.store(SCOPE, "two", [0.0, 1.0, 0.0], "2", [])
+    assert cache.lookup_exact(SCOPE, "one") is not None  # "two" is now least recent
+    cache.store(SCOPE, "three", [0.0, 0.0, 1.0], "3", [])
+    assert cache.lookup_exact(SCOPE, "two") is None
+    assert cache.lookup(SCOPE, [0.0, 0.0, 1.0])["answer"] == "3"
+
+    import utils.semantic_cache as sc
+    real_time = sc.time.time
+    monkeypatch.setattr(sc.time, "time", lambda: real_time() + 120)
+    assert cache.lookup_exact(SCOPE, "one") is None
+    assert cache.stats()["entries"] == 1
+
+
+def test_chat_cache_skips_embedding_for_bm25_and_survives_embed_errors(monkeypatch):
+    import main
+
+    class FailingEmbeddings:
+        calls = 0
+
+        def embed_query(self, text):
+            FailingEmbeddings.calls += 1
+            raise RuntimeError("embedding service down")
+
+    class Retriever:
+        doc_ids = []
+        query_vectors = {}
+
+        def __init__(self, mode):
+            self.mode = mode
+
+    monkeypatch.setattr(main, "answer_cache", SemanticCache())
+    monkeypatch.setattr(main, "embeddings", FailingEmbeddings(), raising=False)
+    req = main.ChatRequest(question="What is ATP?")
+
+    hit, remember = main._cached_answer(req, Retriever("bm25"))
+    assert hit is None
+    remember("Energy currency.", ["chunk"])
+    hit, _ = main._cached_answer(main.ChatRequest(question="what is atp"), Retriever("bm25"))
+    assert hit["answer"] == "Energy currency."
+    assert FailingEmbeddings.calls == 0
+
+    # vector mode: the embedding fails, so the chat is answered uncached instead of erroring
+    assert main._cached_answer(req, Retriever("vector")) == (None, None)
+    assert FailingEmbeddings.calls == 1
@@ -0,0 +1,118 @@
+import os
+import sys
+import json
+
+from fastapi.testclient import TestClient
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.srs import ReviewScheduler, card_id, DAY
+from agents.planner import PlannerAgent
+
+T0 = 1_700_000_000.0
+
+
+def test_sm2_intervals_and_lapses():
+    s = ReviewScheduler()
+    s.add(["a", "b"], now=T0)
+    s.review(["a", "b"], [5, 1], now=T0)
+    a, b = s.state("a"), s.state("b")
+    assert (a["interval_days"], a["reps"]) == (1.0, 1)
+    assert (b["interval_days"], b["reps"], b["lapses"]) == (1.0, 0, 1)
+    # a lapse restarts repetitions but leaves ease alone (SM-2)
+    assert a["ease"] > 2.5 == b["ease"]
+
+    s.review(["a"], [4], now=T0 + DAY)
+    assert s.state("a")["interval_days"] == 6.0
+    s.review(["a"], [4], now=T0 + 7 * DAY)
+    third = s.state("a")
+    assert third["interval_days"] == round(6 * third["ease"])
+    assert third["due"] == T0 + 7 * DAY + third["interval_days"] * DAY
+
+    # hard recalls lower ease, never below the SM-2 floor
+    for _ in range(10):
+        s.review(["b"], [3], now=T0)
+    assert s.state("b")["ease"] == 1.3
+    s.review(["b"], [0], now=T0)
+    assert (s.state("b")["ease"], s.state("b")["lapses"]) == (1.3, 2)
+
+
+def test_retain_drops_cards_no_longer_in_the_deck():
+    s = ReviewScheduler()
+    s.add(["a", "b", "c", "d"], now=T0)
+    s.review(["c"], [5], now=T0)
+    c = s.state("c")
+    assert s.retain(["c", "d", "new"]) == 2
+    assert "a" not in s and len(s) == 2 and s.state("c") == c
+    assert [d["card_id"] for d in s.due_cards(now=T0)] == ["d"]
+    # freed rows start fresh when reused
+    s.add(["e"], now=T0)
+    assert (s.state("e")["ease"], s.state("e")["reps"], s.state("e")["interval_days"]) == (2.5, 0, 0.0)
+
+
+def test_card_id_depends_on_the_answer():
+    q = {"question": "What is  it?", "answer": "A"}
+    assert card_id(q) == card_id({"question": "what is it?", "answer": "a"})
+    assert card_id(q) != card_id({"question": "What is it?", "answer": "B"})
+    assert card_id(q) != card_id(dict(q, doc_id="d1"))
+
+
+def test_due_cards_ordered_and_not_consumed():
+    s = ReviewScheduler()
+    s.add([f"c{i}" for i in range(2000)], now=T0)
+    # push everything but c5 and c7 into the future
+    s.review([f"c{i}" for i in range(2000) if i not in (5, 7)], [5] * 1998, now=T0 + 10)
+    due = s.due_cards(now=T0 + 100, limit=10)
+    assert [d["card_id"] for d in due] == ["c5", "c7"]
+    assert [d["card_id"] for d in s.due_cards(now=T0 + 100)] == ["c5", "c7"]
+    assert s.count_due(now=T0 + 100) == 2
+    assert len(s.due_cards(now=T0 + 2 * DAY, limit=50)) == 50
+    assert s.count_due(now=T0 + 2 * DAY) == 2000
+
+
+def test_planner_defaults_to_in_memory_scheduler():
+    planner = PlannerAgent()
+    assert planner.due_reviews() == []
+    assert planner.schedule_cards(["a", "b"]) == 2
+    assert [s["card_id"] for s in planner.record_reviews([("a", 4)])] == ["a"]
+
+
+def test_state_persists(tmp_path):
+    path = str(tmp_path / "reviews.npz")
+    s = ReviewScheduler(path)
+    s.add(["x", "y"], now=T0)
+    s.review(["x"], [3], now=T0)
+    s.save()
+    loaded = ReviewScheduler(path)
+    assert len(loaded) == 2 and loaded.state("x") == s.state("x")
+    assert [d["card_id"] for d in loaded.due_cards(now=T0)] == ["y"]
+
+
+def test_planner_review_endpoints(tmp_path, monkeypatch):
+    import main
+
+    monkeypatch.chdir(tmp_path)
+    os.makedirs(tmp_path / "outputs")
+    cards = [{"question": f"Q{i}?", "answer": f"A{i}"} for i in range(3)]
+    for c in cards:
+        c["id"] = card_id(c)
+    with open(tmp_path / "outputs" / "flashcards.json", "w", encoding="utf-8") as f:
+        json.dump(cards, f)
+    scheduler = ReviewScheduler(str(tmp_path / "reviews.npz"))
+    monkeypatch.setattr(main, "review_scheduler", scheduler)
+    monkeypatch.setattr(main, "planner_agent", PlannerAgent(scheduler=scheduler))
+    main.planner_agent.schedule_cards(["stale"] + [c["id"] for c in cards])
+    # a regenerated deck replaces the old one: its cards leave the schedule
+    main.planner_agent.schedule_cards([c["id"] for c in cards], prune=True)
+    client = TestClient(main.app)
+
+    due = client.get("/planner/due").json()
+    assert due["total_due"] == 3
+    assert all(d["card"]["question"].startswith("Q") for d in due["due"])
+
+    res = client.post("/planner/review", json={"reviews": [{"card_id": cards[0]["id"], "grade": 5}]})
+    assert res.status_code == 200 and res.json()[0]["interval_days"] == 1.0
+    assert client.get("/planner/due").json()["total_due"] == 2
+    assert os.path.exists(tmp_path / "reviews.npz")
+
+    assert client.post("/planner/review", json={"reviews": [{"card_id": "nope", "grade": 3}]}).status_code == 404
+    assert client.post("/planner/review", json={"reviews": [{"card_id": cards[1]["id"], "grade": 9}]}).status_code == 422
@@ -0,0 +1,49 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.batching import count_tokens
+from utils.token_splitter import TokenTextSplitter, split_segments
+
+TEXT = "\n\n".join(
+    " ".join(f"Sentence {p}.{s} talks about topic number {s} in some detail." for s in range(8))
+    for p in range(30)
+)
+
+
+def test_segments_rejoin_to_the_original_text():
+    segments, rest = split_segments(TEXT + " trailing fragment")
+    assert "".join(segments) + rest == TEXT + " trailing fragment"
+    assert rest == "trailing fragment"
+
+
+def test_chunks_respect_budget_and_sentence_boundaries():
+    splitter = TokenTextSplitter(chunk_tokens=60)
+    chunks = splitter.split_text(TEXT)
+    assert "".join(chunks) == TEXT
+    assert len(chunks) > 5
+    # small slack for per-segment rounding of token counts
+    assert all(count_tokens(c) <= 60 + 5 for c in chunks)
+    assert all(c.rstrip().endswith(".") for c in chunks)
+
+
+def test_streaming_matches_whole_text():
+    splitter = TokenTextSplitter(chunk_tokens=60)
+    pieces = [TEXT[i:i + 97] for i in range(0, len(TEXT), 97)]
+    assert list(splitter.split_stream(pieces)) == splitter.split_text(TEXT)
+
+
+def test_overlap_repeats_trailing_sentences():
+    chunks = TokenTextSplitter(chunk_tokens=60, overlap_tokens=20).split_text(TEXT)
+    for prev, nxt in zip(chunks, chunks[1:]):
+        # each sentence is ~15 tokens, so exactly one is carried over
+        assert nxt.startswith("Sentence")
+        assert nxt[:40] in prev[-80:]
+
+
+def test_long_sentence_is_split_between_words():
+    text = "word " * 2000
+    chunks = TokenTextSplitter(chunk_tokens=50).split_text(text)
+    assert "".join(chunks) == text
+    assert len(chunks) > 10
+    assert all(c.startswith("word") for c in chunks)
@@ -0,0 +1,113 @@
+import os
+import sys
+import asyncio
+import hashlib
+
+import pytest
+from fastapi.testclient import TestClient
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.uploads import UploadError, save_upload
+
+
+class FakeUpload:
+    def __init__(self, data, filename="doc.pdf"):
+        self.data = data
+        self.filename = filename
+        self.size = None
+        self.reads = []
+
+    async def read(self, n=-1):
+        chunk, self.data = self.data[:n], self.data[n:]
+        self.reads.append(len(chunk))
+        return chunk
+
+
+def test_streams_in_chunks_and_hashes(tmp_path):
+    data = b"%PDF-1.4\n" + os.urandom(50_000)
+    upload = FakeUpload(data)
+    saved = asyncio.run(save_upload(upload, str(tmp_path), max_bytes=1 << 20, chunk_size=8192))
+    assert saved.sha256 == hashlib.sha256(data).hexdigest()
+    assert saved.size == len(data)
+    assert os.path.basename(saved.path) == saved.sha256[:16] + ".pdf"
+    with open(saved.path, "rb") as f:
+        assert f.read() == data
+    assert max(upload.reads) == 8192
+
+
+def test_rejects_oversized_and_non_pdf_without_leftovers(tmp_path):
+    big = FakeUpload(b"%PDF-" + b"x" * 100_000)
+    with pytest.raises(UploadError) as e:
+        asyncio.run(save_upload(big, str(tmp_path), max_bytes=30_000, chunk_size=8192))
+    assert e.value.status_code == 413
+    # stopped reading soon after crossing the limit
+    assert sum(big.reads) <= 30_000 + 8192
+
+    with pytest.raises(UploadError) as e:
+        asyncio.run(save_upload(FakeUpload(b"<html>not a pdf"), str(tmp_path), max_bytes=1 << 20))
+    assert e.value.status_code == 400
+
+    declared = FakeUpload(b"%PDF-")
+    declared.size = 10 << 20
+    with pytest.raises(UploadError):
+        asyncio.run(save_upload(declared, str(tmp_path), max_bytes=1 << 20))
+    assert declared.reads == []
+    assert os.listdir(tmp_path) == []
+
+
+def test_upload_endpoint_limits(tmp_path, monkeypatch):
+    import main
+
+    monkeypatch.setattr(main, "MAX_UPLOAD_BYTES", 1000)
+    monkeypatch.setattr(main, "UPLOAD_DIR", str(tmp_path))
+    client = TestClient(main.app)
+
+    res = client.post("/upload_pdf", files={"file": ("big.pdf", b"%PDF-" + b"x" * 200_000, "application/pdf")})
+    assert res.status_code == 413
+
+    res = client.post("/upload_pdf", files={"file": ("fake.pdf", b"hello", "application/pdf")})
+    assert res.status_code == 400
+
+    res = client.post("/ingest_pdfs", files=[("files", ("a.pdf", b"%PDF-" + b"x" * 5000, "application/pdf"))])
+    assert res.status_code == 413
+    assert os.listdir(tmp_path) == []
+
+
+def test_batch_with_a_bad_file_leaves_nothing_behind(tmp_path, monkeypatch):
+    import main
+
+    monkeypatch.setattr(main, "MAX_UPLOAD_BYTES", 10_000)
+    monkeypatch.setattr(main, "UPLOAD_DIR", str(tmp_path))
+    client = TestClient(main.app)
+    # stored earlier (e.g. for a job still running): must survive the rejected batch
+    kept = asyncio.run(save_upload(FakeUpload(b"%PDF-kept"), str(tmp_path), max_bytes=10_000))
+
+    res = client.post("/ingest_pdfs", files=[
+        ("files", ("ok.pdf", b"%PDF-" + b"x" * 500, "application/pdf")),
+        ("files", ("kept.pdf", b"%PDF-kept", "application/pdf")),
+        ("files", ("big.pdf", b"%PDF-" + b"x" * 50_000, "application/pdf")),
+    ])
+    assert res.status_code == 413
+    assert os.listdir(tmp_path) == [os.path.basename(kept.path)]
+
+
+def test_batch_total_is_capped(tmp_path, monkeypatch):
+    import main
+
+    monkeypatch.setattr(main, "MAX_UPLOAD_BYTES", 1 << 20)
+    monkeypatch.setattr(main, "MAX_BATCH_MB", 1)
+    monkeypatch.setattr(main, "UPLOAD_DIR", str(tmp_path))
+    client = TestClient(main.app)
+    part = b"%PDF-" + b"x" * 400_000
+
+    # each file is under the per-file limit, but the request is not
+    monkeypatch.setattr(main, "MAX_BATCH_BYTES", 1 << 20)
+    res = client.post("/ingest_pdfs", files=[("files", (f"{i}.pdf", part, "application/pdf")) for i in range(4)])
+    assert res.status_code == 413
+    assert "Batch" in res.json()["detail"]
+
+    # past the middleware's envelope allowance, the endpoint still checks the total
+    monkeypatch.setattr(main, "MAX_BATCH_BYTES", 1_180_000)
+    res = client.post("/ingest_pdfs", files=[("files", (f"{i}.pdf", part, "application/pdf")) for i in range(3)])
+    assert res.status_code == 413
+    assert os.listdir(tmp_path) == []
@@ -0,0 +1,48 @@
+import os
+import sys
+import json
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.vectorstore_manager import VectorStoreManager
+
+
+class FakeStore:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def save_local(self, path):
+        os.makedirs(path, exist_ok=True)
+        with open(os.path.join(path, "index.faiss"), "w") as f:
+            json.dump(self.docs, f)
+
+
+def _loader(calls):
+    def load(path):
+        calls.append(path)
+        with open(os.path.join(path, "index.faiss")) as f:
+            return FakeStore(json.load(f))
+    return load
+
+
+def test_index_is_loaded_once_and_reused(tmp_path):
+    calls = []
+    path = str(tmp_path / "faiss_index")
+    FakeStore(["a"]).save_local(path)
+    mgr = VectorStoreManager(path, loader=_loader(calls))
+    first = mgr.get()
+    assert mgr.get() is first
+    assert len(calls) == 1
+
+
+def test_publish_from_another_manager_triggers_reload(tmp_path):
+    calls = []
+    path = str(tmp_path / "faiss_index")
+    reader = VectorStoreManager(path, loader=_loader(calls))
+    writer = VectorStoreManager(path, loader=_loader([]))
+    writer.publish(FakeStore(["v1"]))
+    assert reader.get().docs == ["v1"]
+    writer.publish(FakeStore(["v2"]))
+    assert reader.get().docs == ["v2"]
+    assert reader.get().docs == ["v2"]
+    assert len(calls) == 2
+    assert not [p for p in os.listdir(tmp_path) if ".tmp-" in p]
@@ -0,0 +1,92 @@
+from functools import lru_cache
+
+from utils.parsing import extract_json_object, parse_partial_object
+
+try:
+    import tiktoken
+except Exception:
+    tiktoken = None
+
+
+@lru_cache(maxsize=1)
+def _encoding():
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception:
+        # The BPE file is downloaded on first use; offline hosts fall back to estimates
+        return None
+
+
+def count_tokens(text: str) -> int:
+    """Token count with tiktoken's cl100k_base; ~4 chars/token if tiktoken is unavailable."""
+    enc = _encoding()
+    if enc is None:
+        return max(1, len(text) // 4)
+    return len(enc.encode(text, disallowed_special=()))
+
+
+def count_tokens_batch(texts):
+    enc = _encoding()
+    if enc is None:
+        return [max(1, len(t) // 4) for t in texts]
+    return [len(ids) for ids in enc.encode_batch(list(texts), disallowed_special=())]
+
+
+def pack_chunks(
+    chunks,
+    max_tokens: int,
+    overhead_tokens: int = 0,
+    max_chunks: int = 8,
+    max_output_tokens: int = 0,
+    output_tokens_per_chunk: int = 0,
+):
+    """
+    Greedily group consecutive chunk indices so each group's prompt stays within max_tokens.
+
+    When max_output_tokens and output_tokens_per_chunk are set, groups are also
+    small enough for every chunk's answer to fit in one response.
+    A chunk that alone exceeds the budget still gets a group of its own.
+    Returns a list of index lists covering every chunk exactly once, in order.
+    """
+    budget = max(1, max_tokens - overhead_tokens)
+    if max_output_tokens > 0 and output_tokens_per_chunk > 0:
+        max_chunks = min(max_chunks, max(1, max_output_tokens // output_tokens_per_chunk))
+    groups, current, used = [], [], 0
+    for i, n in enumerate(count_tokens_batch(chunks)):
+        if current and (used + n > budget or len(current) >= max_chunks):
+            groups.append(current)
+            current, used = [], 0
+        current.append(i)
+        used += n
+    if current:
+        groups.append(current)
+    return groups
+
+
+def format_batch(chunks, indices) -> str:
+    return "\n\n".join(f"### Chunk {i}\n{chunks[i]}" for i in indices)
+
+
+def split_batch_response(text: str, indices):
+    """
+    Split a batched response back into per-chunk item lists.
+
+    Expects a JSON object keyed by chunk number. Returns {index: list} for the
+    chunks that were answered, or None if no usable object could be found.
+    A response cut off by the output limit keeps its complete entries.
+    """
+    keys = {str(i) for i in indices}
+    parsed = extract_json_object(text)
+    if parsed is None or not keys & parsed.keys():
+        # truncated: the first decodable object is just one nested item
+        parsed = parse_partial_object(text) or parsed
+    if parsed is None:
+        return None
+    out = {}
+    for i in indices:
+        items = parsed.get(str(i), parsed.get(i))
+        if isinstance(items, list):
+            out[i] = items
+    return out
@@ -0,0 +1,120 @@
+import os
+import re
+from collections import Counter, defaultdict
+
+import numpy as np
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset(
+    "a an and are as at be but by can do does for from how in into is it its of on or "
+    "that the their then there these this to was were what when where which who why "
+    "will with".split()
+)
+
+
+def tokenize(text: str):
+    return [t for t in _TOKEN_RE.findall((text or "").lower()) if t not in STOPWORDS]
+
+
+class BM25Index:
+    """
+    Okapi BM25 over a fixed list of chunks, stored as a compressed inverted index.
+
+    Postings live in flat NumPy arrays (CSR layout: `ptr[j]:ptr[j+1]` slices
+    the chunk ids and term frequencies of term j), so a query touches only the
+    postings of its own terms and needs no network call. Results are chunk
+    ids, matching the order of the shard's chunk store.
+    """
+
+    def __init__(self, terms, ptr, doc_ids, tfs, doc_len, k1: float = 1.5, b: float = 0.75):
+        self.terms = list(terms)
+        self.vocab = {t: j for j, t in enumerate(self.terms)}
+        self.ptr = np.asarray(ptr, dtype=np.int64)
+        self.doc_ids = np.asarray(doc_ids, dtype=np.int32)
+        self.tfs = np.asarray(tfs, dtype=np.float32)
+        self.doc_len = np.asarray(doc_len, dtype=np.float32)
+        self.k1 = k1
+        n = len(self.doc_len)
+        df = np.diff(self.ptr).astype(np.float32)
+        self.idf = np.log1p((n - df + 0.5) / (df + 0.5)).astype(np.float32)
+        avgdl = float(self.doc_len.mean()) if n else 1.0
+        # Per-chunk length normalisation, computed once
+        self._norm = (k1 * (1 - b + b * self.doc_len / max(avgdl, 1e-9))).astype(np.float32)
+
+    def __len__(self):
+        return len(self.doc_len)
+
+    @classmethod
+    def build(cls, chunks, **kwargs):
+        postings = defaultdict(list)
+        doc_len = []
+        for i, text in enumerate(chunks):
+            counts = Counter(tokenize(text))
+            doc_len.append(sum(counts.values()))
+            for term, tf in counts.items():
+                postings[term].append((i, tf))
+        terms = sorted(postings)
+        ptr = [0]
+        doc_ids, tfs = [], []
+        for term in terms:
+            for i, tf in postings[term]:
+                doc_ids.append(i)
+                tfs.append(tf)
+            ptr.append(len(doc_ids))
+        return cls(terms, ptr, doc_ids, tfs, doc_len, **kwargs)
+
+    def search(self, query: str, k: int = 3):
+        """Return up to k (chunk_id, score) pairs with a positive score, best first."""
+        n = len(self)
+        if not n or k <= 0:
+            return []
+        scores = np.zeros(n, dtype=np.float32)
+        for term in set(tokenize(query)):
+            j = self.vocab.get(term)
+            if j is None:
+                continue
+            s, e = self.ptr[j], self.ptr[j + 1]
+            ids, tf = self.doc_ids[s:e], self.tfs[s:e]
+            # chunk ids are unique within one posting list, so += is safe
+            scores[ids] += self.idf[j] * tf * (self.k1 + 1) / (tf + self._norm[ids])
+        hits = np.flatnonzero(scores > 0)
+        if len(hits) > k:
+            hits = hits[np.argpartition(-scores[hits], k - 1)[:k]]
+        hits = hits[np.argsort(-scores[hits], kind="stable")]
+        return [(int(i), float(scores[i])) for i in hits]
+
+    def save(self, path: str):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            np.savez_compressed(
+                f,
+                terms=np.array(self.terms, dtype=str),
+                ptr=self.ptr,
+                doc_ids=self.doc_ids,
+                tfs=self.tfs.astype(np.uint16 if self.tfs.size and self.tfs.max() < 65536 else np.float32),
+                doc_len=self.doc_len,
+            )
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str, **kwargs):
+        with np.load(path, allow_pickle=False) as data:
+            return cls(
+                data["terms"].tolist(), data["ptr"], data["doc_ids"], data["tfs"], data["doc_len"], **kwargs
+            )
+
+
+def reciprocal_rank_fusion(rankings, k: int = 60, limit: int = None):
+    """
+    Fuse several best-first lists of keys: score(key) = sum of 1 / (k + rank).
+
+    Only ranks are used, so lists scored on different scales (BM25 scores,
+    FAISS distances) combine without calibration. Returns keys, best first.
+    """
+    fused = defaultdict(float)
+    for ranking in rankings:
+        for rank, key in enumerate(ranking, start=1):
+            fused[key] += 1.0 / (k + rank)
+    ordered = sorted(fused, key=lambda key: -fused[key])
+    return ordered[:limit] if limit else ordered
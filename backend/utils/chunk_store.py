@@ -0,0 +1,124 @@
+import os
+import json
+import time
+from array import array
+from contextlib import contextmanager
+
+
+# How long a reader waits for a writer to finish swapping the data/index pair
+_PAIR_RETRIES = 50
+_PAIR_RETRY_DELAY = 0.01
+
+
+class ChunkStore:
+    """
+    JSONL file of chunks with a binary offset index, replaced as a whole by write().
+
+    `<path>` starts with a header line holding the store's generation, then
+    one JSON record per line; `<path>.idx` holds the same generation followed
+    by the byte offset of each record (8-byte unsigned ints), so any chunk or
+    page of chunks can be read with a single seek. Readers only use an index
+    whose generation matches the data file they have open, so a read racing a
+    rewrite never applies one write's offsets to another's data. Generation
+    streams through the store page by page instead of loading the whole
+    document into memory.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.index_path = path + ".idx"
+        # (generation, offsets) of the last index read
+        self._cached = None
+
+    def exists(self) -> bool:
+        return os.path.exists(self.path) and os.path.exists(self.index_path)
+
+    def write(self, chunks) -> int:
+        """Replace the store with `chunks` (any iterable). Returns the number written."""
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp_data, tmp_index = self.path + ".tmp", self.index_path + ".tmp"
+        generation = int.from_bytes(os.urandom(8), "little")
+        offsets = array("Q", [generation])
+        with open(tmp_data, "wb") as f:
+            f.write(json.dumps({"generation": generation}).encode("utf-8") + b"\n")
+            for i, text in enumerate(chunks):
+                offsets.append(f.tell())
+                record = {"id": i, "text": text}
+                f.write(json.dumps(record, ensure_ascii=False).encode("utf-8") + b"\n")
+        with open(tmp_index, "wb") as f:
+            offsets.tofile(f)
+        # Data first, then its index: in between, readers see mismatched
+        # generations and wait for the index instead of misreading
+        os.replace(tmp_data, self.path)
+        os.replace(tmp_index, self.index_path)
+        self._cached = None
+        return len(offsets) - 1
+
+    @staticmethod
+    def _read_generation(f):
+        line = f.readline()
+        header = json.loads(line) if line else {}
+        if "generation" not in header:
+            # store written before generations existed: no header, bare offsets
+            f.seek(0)
+            return None
+        return header["generation"]
+
+    def _offsets_for(self, generation):
+        cached = self._cached
+        if cached is not None and cached[0] == generation:
+            return cached[1]
+        raw = array("Q")
+        with open(self.index_path, "rb") as f:
+            raw.frombytes(f.read())
+        if generation is None:
+            offsets = raw
+        elif raw and raw[0] == generation:
+            offsets = raw[1:]
+        else:
+            return None  # index of another write; its swap is still in flight
+        self._cached = (generation, offsets)
+        return offsets
+
+    @contextmanager
+    def _open(self):
+        """Yield (data file, offsets) for one consistent generation of the store."""
+        for _ in range(_PAIR_RETRIES):
+            # the open handle pins this data file even if a rewrite replaces it
+            with open(self.path, "rb") as f:
+                offsets = self._offsets_for(self._read_generation(f))
+                if offsets is not None:
+                    yield f, offsets
+                    return
+            time.sleep(_PAIR_RETRY_DELAY)
+        raise RuntimeError(f"{self.index_path} does not match {self.path}")
+
+    def __len__(self) -> int:
+        if not self.exists():
+            return 0
+        with self._open() as (_f, offsets):
+            return len(offsets)
+
+    def read_range(self, start: int, stop: int):
+        """Return the chunk texts for ids in [start, stop)."""
+        with self._open() as (f, offsets):
+            stop = min(stop, len(offsets))
+            if start >= stop:
+                return []
+            out = []
+            f.seek(offsets[start])
+            for _ in range(stop - start):
+                out.append(json.loads(f.readline())["text"])
+            return out
+
+    def get(self, i: int) -> str:
+        res = self.read_range(i, i + 1)
+        if not res:
+            raise IndexError(i)
+        return res[0]
+
+    def iter_pages(self, page_size: int = 64):
+        """Yield lists of at most page_size chunk texts, in order."""
+        total = len(self)
+        for start in range(0, total, page_size):
+            yield self.read_range(start, start + page_size)
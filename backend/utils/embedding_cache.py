@@ -0,0 +1,111 @@
+import os
+import hashlib
+import sqlite3
+import threading
+from typing import List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from utils import metrics
+
+
+def sha256_text(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def sha256_file(path: str, block_size: int = 1 << 20) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embeddings wrapper backed by a persistent chunk-hash -> vector table.
+
+    Only chunks whose content hash has not been embedded before (by the same
+    underlying model) are sent to the wrapped provider, so re-uploading a PDF or
+    a lightly edited version of it costs little or no embedding API time.
+    Queries are never cached here; they go straight to the provider.
+    """
+
+    def __init__(self, inner, path: Optional[str] = "./outputs/embedding_cache.sqlite3", namespace: str = None):
+        self.inner = inner
+        self.namespace = namespace or self._default_namespace(inner)
+        self.path = path
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "namespace TEXT NOT NULL, hash TEXT NOT NULL, vector BLOB NOT NULL, "
+            "PRIMARY KEY (namespace, hash))"
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def _default_namespace(inner) -> str:
+        model = getattr(inner, "model", None) or getattr(inner, "model_name", None)
+        return f"{type(inner).__name__}:{model}" if model else type(inner).__name__
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        hashes = [sha256_text(t) for t in texts]
+        found = self._lookup(set(hashes))
+
+        # Embed each distinct missing chunk once, in a single provider call
+        missing = {}
+        for h, t in zip(hashes, texts):
+            if h not in found and h not in missing:
+                missing[h] = t
+        if missing:
+            with metrics.EMBED_SECONDS.time(kind="documents"):
+                vectors = self.inner.embed_documents(list(missing.values()))
+            new = dict(zip(missing.keys(), vectors))
+            self._store(new)
+            found.update(new)
+
+        with self._lock:
+            self.hits += len(texts) - len(missing)
+            self.misses += len(missing)
+        metrics.CHUNKS.inc(len(missing), stage="embedded")
+        metrics.CHUNKS.inc(len(texts) - len(missing), stage="embedding_cache_hit")
+        return [list(found[h]) for h in hashes]
+
+    def embed_query(self, text: str) -> List[float]:
+        with metrics.EMBED_SECONDS.time(kind="query"):
+            return self.inner.embed_query(text)
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses}
+
+    def _lookup(self, hashes):
+        found = {}
+        hashes = list(hashes)
+        with self._lock:
+            # Stay below SQLite's bound-parameter limit
+            for i in range(0, len(hashes), 500):
+                batch = hashes[i:i + 500]
+                rows = self._conn.execute(
+                    f"SELECT hash, vector FROM embeddings WHERE namespace = ? AND hash IN ({','.join('?' * len(batch))})",
+                    [self.namespace, *batch],
+                ).fetchall()
+                for h, blob in rows:
+                    found[h] = np.frombuffer(blob, dtype=np.float32).tolist()
+        return found
+
+    def _store(self, vectors):
+        rows = [
+            (self.namespace, h, np.asarray(v, dtype=np.float32).tobytes())
+            for h, v in vectors.items()
+        ]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (namespace, hash, vector) VALUES (?, ?, ?)", rows
+            )
+            self._conn.commit()
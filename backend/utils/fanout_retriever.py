@@ -0,0 +1,59 @@
+from typing import Any, List
+
+from langchain_core.callbacks.manager import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from pydantic import Field
+
+from utils.bm25 import reciprocal_rank_fusion
+
+
+def _doc_key(doc: Document):
+    meta = doc.metadata
+    if "chunk" in meta:
+        return meta.get("doc_id"), meta["chunk"]
+    return meta.get("doc_id"), doc.page_content
+
+
+class FanOutRetriever(BaseRetriever):
+    """
+    LangChain retriever over several IndexRegistry shards.
+
+    mode "vector" searches the FAISS shards, "bm25" the keyword indexes only
+    (no embedding call), and "hybrid" fuses both rankings with reciprocal-rank
+    fusion over `fetch_k` candidates from each.
+    """
+
+    registry: Any
+    embeddings: Any = None
+    doc_ids: List[str]
+    k: int = 3
+    mode: str = "vector"
+    fetch_k: int = 10
+    rrf_k: int = 60
+    # query text -> embedding already computed by the caller (e.g. the answer cache)
+    query_vectors: dict = Field(default_factory=dict)
+
+    def _vector(self, query, k):
+        # Embed once, then every shard searches with the same vector
+        embedding = self.query_vectors.get(query)
+        if embedding is None:
+            embedding = self.embeddings.embed_query(query)
+        return [doc for doc, _ in self.registry.search(embedding, self.doc_ids, k=k)]
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        if self.mode == "vector":
+            return self._vector(query, self.k)
+        keyword = [doc for doc, _ in self.registry.keyword_search(query, self.doc_ids, k=self.fetch_k)]
+        if self.mode == "bm25":
+            return keyword[: self.k]
+        vector = self._vector(query, self.fetch_k)
+        docs = {}
+        for doc in keyword + vector:
+            docs.setdefault(_doc_key(doc), doc)
+        fused = reciprocal_rank_fusion(
+            [[_doc_key(d) for d in keyword], [_doc_key(d) for d in vector]], k=self.rrf_k, limit=self.k
+        )
+        return [docs[key] for key in fused]
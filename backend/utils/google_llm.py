@@ -1,8 +1,44 @@
+import asyncio
 import os
+import time
+from functools import lru_cache
 import google.generativeai as genai
 from langchain_core.language_models import LLM
-from langchain_core.callbacks.manager import CallbackManagerForLLMRun
-from typing import Optional, List, Any
+from langchain_core.callbacks.manager import CallbackManagerForLLMRun, AsyncCallbackManagerForLLMRun
+from langchain_core.outputs import GenerationChunk
+from typing import Optional, List, Any, Iterator
+from utils import metrics
+from utils.batching import count_tokens
+from utils.llm_cache import get_llm_cache
+from utils.log import get_logger
+
+logger = get_logger("google_llm")
+
+
+@lru_cache(maxsize=32)
+def get_gemini_model(
+    model: str,
+    temperature: float,
+    top_p: float,
+    top_k: int,
+    max_output_tokens: int,
+) -> "genai.GenerativeModel":
+    """
+    Return a GenerativeModel handle shared by every call with the same configuration.
+
+    The handle is stateless with respect to individual prompts, so one instance
+    can serve concurrent requests from any thread.
+    """
+    return genai.GenerativeModel(
+        model_name=model,
+        generation_config={
+            "temperature": temperature,
+            "top_p": top_p,
+            "top_k": top_k,
+            "max_output_tokens": max_output_tokens,
+        },
+    )
+
 
 class GoogleLLM(LLM):
     """
@@ -15,6 +51,7 @@ class GoogleLLM(LLM):
     top_p: float = 0.95
     top_k: int = 64
     max_output_tokens: int = 8192
+    use_response_cache: bool = True  # serve repeated prompts from utils.llm_cache
 
     def __init__(self, **kwargs):
         """
@@ -36,13 +73,43 @@ class GoogleLLM(LLM):
         
         # Configure the genai client with the API key
         genai.configure(api_key=api_key)
-        print(f"✓ Google Generative AI configured successfully with model: {self.model}")
+        logger.info("Google Generative AI configured with model: %s", self.model)
 
     @property
     def _llm_type(self) -> str:
         """Return type of llm."""
         return "google_generative_ai"
 
+    def _generation_config(self) -> dict:
+        return {
+            "temperature": self.temperature,
+            "top_p": self.top_p,
+            "top_k": self.top_k,
+            "max_output_tokens": self.max_output_tokens,
+        }
+
+    def _get_model(self) -> "genai.GenerativeModel":
+        return get_gemini_model(
+            self.model, self.temperature, self.top_p, self.top_k, self.max_output_tokens
+        )
+
+    def _cache_lookup(self, prompt: str, stop: Optional[List[str]]):
+        """Return (cache, key, cached_text); cache is None when caching is off."""
+        cache = get_llm_cache() if self.use_response_cache else None
+        if cache is None:
+            return None, None, None
+        key = cache.make_key(self._llm_type, self.model, self._generation_config(), prompt, stop)
+        return cache, key, cache.get(key)
+
+    def _record_usage(self, prompt: str, response, text: str):
+        """Count tokens from the response's usage metadata, estimating when absent."""
+        usage = getattr(response, "usage_metadata", None)
+        metrics.record_tokens(
+            self._llm_type,
+            getattr(usage, "prompt_token_count", None) or count_tokens(prompt),
+            getattr(usage, "candidates_token_count", None) or count_tokens(text),
+        )
+
     def _call(
         self,
         prompt: str,
@@ -62,25 +129,99 @@ class GoogleLLM(LLM):
         Returns:
             Generated text response
         """
+        cache, cache_key, cached = self._cache_lookup(prompt, stop)
+        if cached is not None:
+            metrics.LLM_CACHE_HITS.inc(provider=self._llm_type)
+            return cached
+
         try:
-            generation_config = {
-                "temperature": self.temperature,
-                "top_p": self.top_p,
-                "top_k": self.top_k,
-                "max_output_tokens": self.max_output_tokens,
-            }
-            
-            model = genai.GenerativeModel(
-                model_name=self.model,
-                generation_config=generation_config
-            )
-            response = model.generate_content(prompt)
-            
-            if response.text:
-                return response.text
-            else:
-                return ""
-                
+            started = time.perf_counter()
+            with metrics.llm_call(self._llm_type):
+                response = self._get_model().generate_content(prompt)
+                text = response.text or ""
+            self._record_usage(prompt, response, text)
+        except Exception as e:
+            raise RuntimeError(f"Google Gemini API error: {str(e)}")
+
+        # Don't cache empty responses; they are usually transient failures
+        if cache is not None and text:
+            cache.set(cache_key, text, latency=time.perf_counter() - started)
+        return text
+
+    async def _acall(
+        self,
+        prompt: str,
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> str:
+        """
+        Generate text without blocking the event loop.
+
+        The blocking client runs in a worker thread. The SDK's native async
+        client is a process-wide grpc.aio channel bound to the first event loop
+        that uses it, so it fails on every later loop (one per generation job,
+        plus the server's own).
+
+        Args:
+            prompt: The input prompt text
+            stop: Stop sequences (not used by Gemini)
+            run_manager: Async callback manager
+
+        Returns:
+            Generated text response
+        """
+        cache, cache_key, cached = self._cache_lookup(prompt, stop)
+        if cached is not None:
+            metrics.LLM_CACHE_HITS.inc(provider=self._llm_type)
+            return cached
+
+        try:
+            started = time.perf_counter()
+            with metrics.llm_call(self._llm_type):
+                response = await asyncio.to_thread(self._get_model().generate_content, prompt)
+                text = response.text or ""
+            self._record_usage(prompt, response, text)
+        except Exception as e:
+            raise RuntimeError(f"Google Gemini API error: {str(e)}")
+
+        if cache is not None and text:
+            cache.set(cache_key, text, latency=time.perf_counter() - started)
+        return text
+
+    def _stream(
+        self,
+        prompt: str,
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> Iterator[GenerationChunk]:
+        """
+        Stream text from Gemini as partial responses arrive.
+
+        Args:
+            prompt: The input prompt text
+            stop: Stop sequences (not used by Gemini)
+            run_manager: Callback manager notified of each new token
+
+        Yields:
+            GenerationChunk for each piece of generated text
+        """
+        try:
+            with metrics.llm_call(self._llm_type):
+                parts, last = [], None
+                for part in self._get_model().generate_content(prompt, stream=True):
+                    last = part
+                    text = part.text or ""
+                    if not text:
+                        continue
+                    parts.append(text)
+                    chunk = GenerationChunk(text=text)
+                    if run_manager:
+                        run_manager.on_llm_new_token(text, chunk=chunk)
+                    yield chunk
+            # the final part carries usage for the whole response
+            self._record_usage(prompt, last, "".join(parts))
         except Exception as e:
             raise RuntimeError(f"Google Gemini API error: {str(e)}")
 
@@ -96,6 +237,18 @@ class GoogleLLM(LLM):
         """
         return self._call(prompt)
 
+    async def apredict(self, prompt: str) -> str:
+        """
+        Async counterpart of predict().
+
+        Args:
+            prompt: The input prompt text
+
+        Returns:
+            Generated text response
+        """
+        return await self._acall(prompt)
+
 
 def create_google_llm(
     model: str = "gemini-2.5-flash",
@@ -0,0 +1,220 @@
+import os
+import json
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+from utils import metrics
+from utils.vectorstore_manager import VectorStoreManager
+from utils.chunk_store import ChunkStore
+from utils.bm25 import BM25Index
+
+RETRIEVAL_MODES = ("vector", "bm25", "hybrid")
+
+
+def _collections(entry: dict) -> List[str]:
+    collections = list(entry.get("collections") or [])
+    legacy = entry.get("collection")
+    if legacy and legacy not in collections:
+        collections.append(legacy)
+    return collections
+
+
+class IndexRegistry:
+    """
+    Registry of per-document vector index shards.
+
+    Every uploaded document gets its own directory under `root` holding its
+    FAISS index (`faiss/`), chunk store (`chunks.jsonl`) and BM25 keyword
+    index (`bm25.npz`), so adding a document never rebuilds anything else. `registry.json` records each
+    document's metadata and the collections it belongs to (re-uploading the
+    same PDF to another collection adds it there too); searches fan out over
+    any subset of shards in parallel and merge the top-k hits.
+    """
+
+    def __init__(self, root: str, loader, max_workers: int = 8):
+        self.root = root
+        self.loader = loader
+        self.registry_path = os.path.join(root, "registry.json")
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="search")
+        self._lock = threading.Lock()
+        self._stores = {}
+        self._chunk_stores = {}
+        self._bm25 = {}
+        self._docs = {}
+        self._stamp = None
+        os.makedirs(root, exist_ok=True)
+
+    # -- registry -----------------------------------------------------------
+
+    def _refresh(self):
+        # Another worker process may have registered documents
+        try:
+            st = os.stat(self.registry_path)
+        except FileNotFoundError:
+            return
+        stamp = (st.st_ino, st.st_mtime_ns, st.st_size)
+        if stamp != self._stamp:
+            with open(self.registry_path, encoding="utf-8") as f:
+                self._docs = json.load(f)
+            self._stamp = stamp
+
+    def _save(self):
+        tmp = self.registry_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self._docs, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, self.registry_path)
+        st = os.stat(self.registry_path)
+        self._stamp = (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def register(self, doc_id: str, collection: str = None, **meta):
+        """Create or update a document's entry; `collection` is added to its collections."""
+        with self._lock:
+            self._refresh()
+            entry = dict(self._docs.get(doc_id, {}))
+            entry.update(meta)
+            collections = _collections(entry)
+            if collection and collection not in collections:
+                collections.append(collection)
+            entry.pop("collection", None)  # single-collection entries from older registries
+            entry["collections"] = collections
+            entry["doc_id"] = doc_id
+            entry["updated"] = time.time()
+            self._docs[doc_id] = entry
+            self._save()
+            return entry
+
+    def get(self, doc_id: str) -> Optional[dict]:
+        with self._lock:
+            self._refresh()
+            return self._docs.get(doc_id)
+
+    def documents(self, collection: str = None) -> List[dict]:
+        with self._lock:
+            self._refresh()
+            docs = list(self._docs.values())
+        if collection:
+            docs = [d for d in docs if collection in _collections(d)]
+        return sorted(docs, key=lambda d: d.get("updated", 0))
+
+    def latest(self) -> Optional[str]:
+        docs = self.documents()
+        return docs[-1]["doc_id"] if docs else None
+
+    def resolve(self, doc_ids=None, collections=None) -> List[str]:
+        """Doc ids selected by explicit ids and/or collections; everything if neither is given."""
+        docs = self.documents()
+        if not doc_ids and not collections:
+            return [d["doc_id"] for d in docs]
+        wanted = set(doc_ids or [])
+        cols = set(collections or [])
+        return [d["doc_id"] for d in docs if d["doc_id"] in wanted or cols.intersection(_collections(d))]
+
+    # -- shards -------------------------------------------------------------
+
+    def shard_dir(self, doc_id: str) -> str:
+        return os.path.join(self.root, doc_id)
+
+    def store(self, doc_id: str) -> VectorStoreManager:
+        with self._lock:
+            mgr = self._stores.get(doc_id)
+            if mgr is None:
+                mgr = VectorStoreManager(os.path.join(self.shard_dir(doc_id), "faiss"), loader=self.loader)
+                self._stores[doc_id] = mgr
+            return mgr
+
+    def chunk_store(self, doc_id: str) -> ChunkStore:
+        # kept per shard so the offset index is loaded once
+        with self._lock:
+            cs = self._chunk_stores.get(doc_id)
+            if cs is None:
+                cs = ChunkStore(os.path.join(self.shard_dir(doc_id), "chunks.jsonl"))
+                self._chunk_stores[doc_id] = cs
+            return cs
+
+    def bm25_path(self, doc_id: str) -> str:
+        return os.path.join(self.shard_dir(doc_id), "bm25.npz")
+
+    def bm25(self, doc_id: str) -> Optional[BM25Index]:
+        """The shard's keyword index, reloaded only when its file changes; None if absent."""
+        path = self.bm25_path(doc_id)
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return None
+        stamp = (st.st_ino, st.st_mtime_ns, st.st_size)
+        with self._lock:
+            cached = self._bm25.get(doc_id)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+        index = BM25Index.load(path)
+        with self._lock:
+            self._bm25[doc_id] = (stamp, index)
+        return index
+
+    def has_index(self, doc_id: str) -> bool:
+        return self.get(doc_id) is not None and self.store(doc_id).exists()
+
+    # -- search -------------------------------------------------------------
+
+    def search(self, embedding: List[float], doc_ids: List[str], k: int = 3):
+        """
+        Search the given shards in parallel with one precomputed query vector.
+
+        Returns up to k (Document, score) pairs across all shards, best first.
+        Scores are FAISS distances (lower is closer); shards share one
+        embeddings model, so they are directly comparable.
+        """
+        def one(doc_id):
+            db = self.store(doc_id).get()
+            with metrics.SEARCH_SECONDS.time(index="faiss"):
+                hits = db.similarity_search_with_score_by_vector(embedding, k=k)
+            for doc, _ in hits:
+                doc.metadata.setdefault("doc_id", doc_id)
+            return hits
+
+        shards = [d for d in doc_ids if self.store(d).exists()]
+        merged = []
+        for hits in self._pool.map(one, shards):
+            merged.extend(hits)
+        merged.sort(key=lambda hit: hit[1])
+        return merged[:k]
+
+    def keyword_search(self, query: str, doc_ids: List[str], k: int = 3):
+        """
+        BM25 search over the given shards; no embedding call is made.
+
+        Returns up to k (Document, score) pairs, highest score first. Shards
+        without a keyword index are skipped.
+        """
+        # Imported here so importing the registry (and main) doesn't load langchain_core
+        from langchain_core.documents import Document
+
+        def one(doc_id):
+            index = self.bm25(doc_id)
+            if index is None:
+                return []
+            store = self.chunk_store(doc_id)
+            with metrics.SEARCH_SECONDS.time(index="bm25"):
+                ranked = index.search(query, k)
+            return [
+                (Document(page_content=store.get(i), metadata={"doc_id": doc_id, "chunk": i}), score)
+                for i, score in ranked
+            ]
+
+        merged = []
+        for hits in self._pool.map(one, doc_ids):
+            merged.extend(hits)
+        merged.sort(key=lambda hit: -hit[1])
+        return merged[:k]
+
+
+
+def __getattr__(name):
+    # FanOutRetriever subclasses langchain_core's BaseRetriever, which is slow
+    # to import; it lives in utils.fanout_retriever and loads on first access
+    if name == "FanOutRetriever":
+        from utils.fanout_retriever import FanOutRetriever
+        return FanOutRetriever
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,159 @@
+import time
+import logging
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from utils import metrics
+from utils.bm25 import BM25Index
+from utils.embedding_cache import sha256_file
+from utils.log import get_logger
+
+logger = get_logger("ingest")
+
+
+def extract_chunks(path: str, reader_kwargs: dict):
+    """
+    Extract and split one PDF. Runs in a worker process, so it builds its own
+    reader; returns (chunks, timings) so the parent can record the timings.
+    """
+    from agents.reader import ReaderAgent
+
+    reader = ReaderAgent(**reader_kwargs, record_metrics=False)
+    chunks = reader.read_pdf(path)
+    return chunks, reader.last_timings
+
+
+class BatchIngestor:
+    """
+    Index many PDFs in one go.
+
+    Extraction and splitting run in a process pool, one PDF per task. As
+    documents finish, their chunks join a shared queue that is embedded in
+    batches of `embed_batch_size` across documents, and each document's
+    shard (FAISS index, chunk store, BM25 index, registry entry) is published
+    as soon as all of its chunks have vectors. Identical files, within the
+    batch or already in the registry, are not processed again.
+    """
+
+    def __init__(self, registry, embeddings, vectorstore_cls, reader_kwargs=None,
+                 workers: int = 4, embed_batch_size: int = 256):
+        self.registry = registry
+        self.embeddings = embeddings
+        self.vectorstore_cls = vectorstore_cls
+        self.reader_kwargs = dict(reader_kwargs or {})
+        self.workers = max(1, workers)
+        self.embed_batch_size = embed_batch_size
+
+    def publish(self, doc_id: str, chunks, vectors, **meta) -> dict:
+        """Write one document's shard from precomputed chunk vectors and register it."""
+        metadatas = [{"doc_id": doc_id, "chunk": i} for i in range(len(chunks))]
+        db = self.vectorstore_cls.from_embeddings(
+            list(zip(chunks, vectors)), self.embeddings, metadatas=metadatas
+        )
+        store = self.registry.store(doc_id)
+        store.publish(db)
+        self.registry.chunk_store(doc_id).write(chunks)
+        BM25Index.build(chunks).save(self.registry.bm25_path(doc_id))
+        return self.registry.register(doc_id, chunks=len(chunks), version=store.version, **meta)
+
+    def ingest(self, files, collection: str = "default", on_result=None):
+        """
+        Index `files`, a list of (path, filename) or (path, filename, sha256)
+        when the hash is already known. Returns one status dict per
+        file, in input order; `on_result(status)` is called as each completes.
+        status is "indexed", "unchanged" (already in the registry),
+        "duplicate" (same content earlier in this batch) or "error".
+        """
+        results = [None] * len(files)
+        started = time.perf_counter()
+
+        def done(i, **status):
+            status.setdefault("seconds", round(time.perf_counter() - started, 3))
+            if status["status"] == "error":
+                metrics.ERRORS.inc(component="ingest")
+                logger.warning("ingest failed for %s: %s", files[i][1], status.get("error"))
+            else:
+                logger.log(logging.DEBUG, "%s %s", status["status"], files[i][1])
+            results[i] = {"filename": files[i][1], **status}
+            if on_result is not None:
+                on_result(results[i])
+
+        # Hash first so duplicates never reach the pool
+        todo, hashes = {}, {}
+        for i, (path, filename, *known) in enumerate(files):
+            try:
+                file_hash = known[0] if known else sha256_file(path)
+            except OSError as e:
+                done(i, status="error", error=str(e))
+                continue
+            doc_id = file_hash[:16]
+            if doc_id in hashes:
+                done(i, status="duplicate", doc_id=doc_id)
+            elif self.registry.has_index(doc_id):
+                entry = self.registry.register(doc_id, filename=filename, collection=collection)
+                done(i, status="unchanged", doc_id=doc_id, chunks=entry.get("chunks", 0))
+            else:
+                todo[i] = doc_id
+                hashes[doc_id] = file_hash
+
+        pending = []  # (file index, chunk list) waiting for vectors, in arrival order
+        queued = 0
+
+        def flush(force=False):
+            nonlocal pending, queued
+            while pending and (force or queued >= self.embed_batch_size):
+                # take whole documents until the batch is full
+                batch, size = [], 0
+                while pending and (not batch or size + len(pending[0][1]) <= self.embed_batch_size):
+                    batch.append(pending.pop(0))
+                    size += len(batch[-1][1])
+                queued -= size
+                texts = [c for _, chunks in batch for c in chunks]
+                try:
+                    vectors = self.embeddings.embed_documents(texts) if texts else []
+                except Exception as e:
+                    for i, _ in batch:
+                        done(i, status="error", doc_id=todo[i], error=f"embedding failed: {e}")
+                    continue
+                pos = 0
+                for i, chunks in batch:
+                    doc_vectors = vectors[pos:pos + len(chunks)]
+                    pos += len(chunks)
+                    try:
+                        self.publish(
+                            todo[i], chunks, doc_vectors,
+                            filename=files[i][1], collection=collection, sha256=hashes[todo[i]],
+                        )
+                        done(i, status="indexed", doc_id=todo[i], chunks=len(chunks))
+                    except Exception as e:
+                        done(i, status="error", doc_id=todo[i], error=str(e))
+
+        def extracted(i, result):
+            nonlocal queued
+            chunks, timings = result
+            metrics.observe_read(timings)
+            if not chunks:
+                done(i, status="error", doc_id=todo[i], error="no text extracted")
+                return
+            pending.append((i, chunks))
+            queued += len(chunks)
+            flush()
+
+        if self.workers == 1 or len(todo) <= 1:
+            for i in todo:
+                try:
+                    extracted(i, extract_chunks(files[i][0], self.reader_kwargs))
+                except Exception as e:
+                    done(i, status="error", doc_id=todo[i], error=str(e))
+        else:
+            with ProcessPoolExecutor(max_workers=min(self.workers, len(todo))) as pool:
+                futures = {pool.submit(extract_chunks, files[i][0], self.reader_kwargs): i for i in todo}
+                for fut in as_completed(futures):
+                    i = futures[fut]
+                    try:
+                        result = fut.result()
+                    except Exception as e:
+                        done(i, status="error", doc_id=todo[i], error=str(e))
+                        continue
+                    extracted(i, result)
+        flush(force=True)
+        return results
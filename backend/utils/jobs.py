@@ -0,0 +1,107 @@
+import time
+import uuid
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from utils import metrics
+from utils.log import get_logger
+
+logger = get_logger("jobs")
+
+
+class Job:
+    """State of one background job; progress is updated from the worker thread."""
+
+    def __init__(self, kind: str, total: int = 0):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.status = "queued"
+        self.total = total
+        self.done = 0
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.result = None
+        self.error = None
+        self._lock = threading.Lock()
+
+    def advance(self, n: int = 1):
+        with self._lock:
+            self.done += n
+
+    def to_dict(self):
+        with self._lock:
+            done, total = self.done, self.total
+        now = time.time()
+        eta = None
+        if self.status == "running" and self.started and done and total:
+            elapsed = now - self.started
+            eta = round(elapsed / done * max(total - done, 0), 1)
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "progress": {"done": done, "total": total},
+            "eta_seconds": eta,
+            "elapsed_seconds": round((self.finished or now) - self.started, 1) if self.started else None,
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+class JobManager:
+    """
+    Runs blocking work (LLM generation) on a bounded thread pool so the
+    FastAPI event loop stays free. At most `max_concurrent_jobs` run at once;
+    the rest wait in the pool's queue. Finished jobs are kept for polling,
+    up to `max_history` entries.
+    """
+
+    def __init__(self, max_concurrent_jobs: int = 1, max_history: int = 100):
+        self.max_concurrent_jobs = max_concurrent_jobs
+        self.max_history = max_history
+        self._pool = ThreadPoolExecutor(max_workers=max_concurrent_jobs, thread_name_prefix="job")
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, kind: str, fn, *args, total: int = 0, **kwargs) -> Job:
+        """Queue fn(job, *args, **kwargs); fn may call job.advance() and its return value becomes job.result."""
+        job = Job(kind, total=total)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._prune()
+        self._pool.submit(self._run, job, fn, args, kwargs)
+        return job
+
+    def get(self, job_id: str):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def active_count(self) -> int:
+        with self._lock:
+            return sum(1 for j in self._jobs.values() if j.status in ("queued", "running"))
+
+    def _run(self, job, fn, args, kwargs):
+        job.status = "running"
+        job.started = time.time()
+        try:
+            job.result = fn(job, *args, **kwargs)
+            job.status = "done"
+        except Exception as e:
+            job.error = str(e)
+            job.status = "failed"
+            metrics.ERRORS.inc(component=f"job_{job.kind}")
+            logger.exception("job %s (%s) failed", job.id, job.kind)
+        finally:
+            job.finished = time.time()
+
+    def _prune(self):
+        # Drop the oldest finished jobs once history is full
+        if len(self._jobs) <= self.max_history:
+            return
+        for job_id in list(self._jobs):
+            if len(self._jobs) <= self.max_history:
+                break
+            if self._jobs[job_id].status in ("done", "failed"):
+                del self._jobs[job_id]
@@ -0,0 +1,52 @@
+import os
+import json
+import hashlib
+import threading
+
+
+class CachedJson:
+    """Parsed contents of one JSON file plus its pre-serialized body and ETag."""
+
+    def __init__(self, data, raw: bytes):
+        self.data = data
+        self.etag = hashlib.blake2b(raw, digest_size=12).hexdigest()
+        # Compact serialization, computed once and reused for unpaginated GETs
+        self.body = json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class JsonFileCache:
+    """
+    In-memory cache of JSON output files, invalidated by file stat.
+
+    Each lookup costs one os.stat; the file is only re-read and re-parsed when
+    its inode, mtime or size changed (store_json and the demo runner rewrite
+    these files wholesale).
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, path: str):
+        """Return a CachedJson, or None if the file does not exist.
+
+        Raises ValueError for empty/invalid JSON and OSError for read failures.
+        """
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            with self._lock:
+                self._entries.pop(path, None)
+            return None
+        stamp = (st.st_ino, st.st_mtime_ns, st.st_size)
+        with self._lock:
+            cached = self._entries.get(path)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+
+        with open(path, "rb") as f:
+            raw = f.read()
+        entry = CachedJson(json.loads(raw), raw)
+        with self._lock:
+            self._entries[path] = (stamp, entry)
+        return entry
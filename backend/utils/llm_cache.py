@@ -0,0 +1,186 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Optional, Any, Dict
+
+
+class LLMCache:
+    """
+    Two-tier cache for LLM completions.
+
+    An in-memory LRU sits in front of a SQLite table on disk so repeated
+    prompts (e.g. re-running /generate_all on the same material) are answered
+    without another round-trip to the provider. Entries are keyed by provider,
+    model, sampling parameters and a hash of the prompt.
+
+    Lookups never write to SQLite: the LRU bump of a hit is kept in memory
+    and written out with the next `set` (or before eviction), so concurrent
+    readers only contend for the lock, not for a commit.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = "./outputs/llm_cache.sqlite3",
+        max_memory_items: int = 512,
+        max_disk_items: int = 20000,
+        max_age_seconds: float = 30 * 24 * 3600,
+    ):
+        self.path = path
+        self.max_memory_items = max_memory_items
+        self.max_disk_items = max_disk_items
+        self.max_age_seconds = max_age_seconds
+        self._memory = OrderedDict()
+        # key -> last access time not yet written to the disk tier
+        self._touched = {}
+        self._lock = threading.Lock()
+        self._conn = None
+        self._writes_since_evict = 0
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "seconds_saved": 0.0}
+
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, latency REAL NOT NULL, "
+                "created REAL NOT NULL, last_access REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS llm_cache_access ON llm_cache(last_access)")
+            self._conn.commit()
+            self._evict()
+
+    @staticmethod
+    def make_key(provider: str, model: str, params: Dict[str, Any], prompt: str, stop=None) -> str:
+        """Build a stable cache key from the request that would be sent."""
+        prompt_hash = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+        header = json.dumps(
+            {"provider": provider, "model": model, "params": params, "stop": stop or []},
+            sort_keys=True,
+        )
+        return hashlib.sha256(f"{header}|{prompt_hash}".encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and now - entry[2] <= self.max_age_seconds:
+                self._memory.move_to_end(key)
+                if self._conn is not None:
+                    self._touched[key] = now
+                self._stats["memory_hits"] += 1
+                self._stats["seconds_saved"] += entry[1]
+                return entry[0]
+            if entry is not None:
+                del self._memory[key]
+
+            if self._conn is not None:
+                row = self._conn.execute(
+                    "SELECT value, latency, created FROM llm_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None and now - row[2] <= self.max_age_seconds:
+                    self._touched[key] = now
+                    self._remember(key, row[0], row[1], row[2])
+                    self._stats["disk_hits"] += 1
+                    self._stats["seconds_saved"] += row[1]
+                    return row[0]
+
+            self._stats["misses"] += 1
+            return None
+
+    def set(self, key: str, value: str, latency: float = 0.0):
+        now = time.time()
+        with self._lock:
+            self._remember(key, value, latency, now)
+            if self._conn is not None:
+                self._touched.pop(key, None)
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO llm_cache (key, value, latency, created, last_access) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (key, value, latency, now, now),
+                )
+                # pending LRU bumps ride along with this commit
+                self._write_touches()
+                self._conn.commit()
+                self._writes_since_evict += 1
+                # Eviction scans the table, so only run it every so often
+                if self._writes_since_evict >= 100:
+                    self._evict()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            res = dict(self._stats)
+            res["memory_items"] = len(self._memory)
+            if self._conn is not None:
+                res["disk_items"] = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+        lookups = res["memory_hits"] + res["disk_hits"] + res["misses"]
+        res["hit_rate"] = (res["memory_hits"] + res["disk_hits"]) / lookups if lookups else 0.0
+        return res
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self._touched.clear()
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM llm_cache")
+                self._conn.commit()
+
+    def _remember(self, key, value, latency, created):
+        self._memory[key] = (value, latency, created)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_items:
+            self._memory.popitem(last=False)
+
+    def _write_touches(self):
+        # Caller holds the lock and commits
+        if self._touched:
+            self._conn.executemany(
+                "UPDATE llm_cache SET last_access = ? WHERE key = ?",
+                [(t, k) for k, t in self._touched.items()],
+            )
+            self._touched.clear()
+
+    def _evict(self):
+        # Caller holds the lock (or we are still in __init__)
+        self._writes_since_evict = 0
+        # LRU order on disk must include hits not yet written
+        self._write_touches()
+        cutoff = time.time() - self.max_age_seconds
+        self._conn.execute("DELETE FROM llm_cache WHERE created < ?", (cutoff,))
+        count = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+        if count > self.max_disk_items:
+            self._conn.execute(
+                "DELETE FROM llm_cache WHERE key IN ("
+                "SELECT key FROM llm_cache ORDER BY last_access ASC LIMIT ?)",
+                (count - self.max_disk_items,),
+            )
+        self._conn.commit()
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> Optional[LLMCache]:
+    """
+    Return the process-wide LLM cache, or None if disabled via LLM_CACHE_ENABLED=false.
+
+    Configured through LLM_CACHE_PATH, LLM_CACHE_MEMORY_ITEMS, LLM_CACHE_MAX_ITEMS
+    and LLM_CACHE_MAX_AGE_DAYS.
+    """
+    global _cache
+    if os.environ.get("LLM_CACHE_ENABLED", "true").lower() != "true":
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = LLMCache(
+                    path=os.environ.get("LLM_CACHE_PATH", "./outputs/llm_cache.sqlite3"),
+                    max_memory_items=int(os.environ.get("LLM_CACHE_MEMORY_ITEMS", "512")),
+                    max_disk_items=int(os.environ.get("LLM_CACHE_MAX_ITEMS", "20000")),
+                    max_age_seconds=float(os.environ.get("LLM_CACHE_MAX_AGE_DAYS", "30")) * 24 * 3600,
+                )
+    return _cache
@@ -0,0 +1,160 @@
+import os
+import time
+import asyncio
+import sys
+import importlib
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+from utils.log import get_logger
+from utils.parsing import response_to_text
+
+logger = get_logger("llm_providers")
+
+# provider name -> "module:factory". A provider's module (and its SDK) is only
+# imported the first time that provider is selected, so importing the app
+# never pays for google.generativeai / langchain_openai it won't use.
+PROVIDERS: Dict[str, str] = {
+    "ollama": "utils.ollama_llm:create_ollama_llm",
+    "google": "utils.google_llm:create_google_llm",
+    "openai": "utils.llm_providers:create_openai_llm",
+}
+
+_factories: Dict[str, Callable] = {}
+_lock = threading.Lock()
+# provider -> seconds spent importing its module on first use
+import_seconds: Dict[str, float] = {}
+
+
+def create_openai_llm(model: Optional[str] = None, temperature: float = 0.1, **kwargs):
+    from langchain_openai import ChatOpenAI
+
+    return ChatOpenAI(model_name=model or os.environ.get("LLM_MODEL", "gpt-4o-mini"), temperature=temperature, **kwargs)
+
+
+def register_provider(name: str, target: str):
+    """Register (or replace) a provider as "module:factory"; nothing is imported yet."""
+    if ":" not in target:
+        raise ValueError(f"provider target must be 'module:factory', got {target!r}")
+    with _lock:
+        PROVIDERS[name] = target
+        _factories.pop(name, None)
+
+
+def get_factory(name: str) -> Callable:
+    """Import the provider's module on first use and return its factory."""
+    factory = _factories.get(name)
+    if factory is not None:
+        return factory
+    try:
+        target = PROVIDERS[name]
+    except KeyError:
+        raise ValueError(f"Unknown LLM provider: {name}. Known: {', '.join(sorted(PROVIDERS))}")
+    module_name, attr = target.split(":", 1)
+    with _lock:
+        factory = _factories.get(name)
+        if factory is None:
+            started = time.perf_counter()
+            factory = getattr(importlib.import_module(module_name), attr)
+            import_seconds[name] = time.perf_counter() - started
+            logger.info("Loaded LLM provider %s in %.0f ms", name, import_seconds[name] * 1000)
+            _factories[name] = factory
+    return factory
+
+
+def create_llm(name: str, **kwargs):
+    return get_factory(name)(**kwargs)
+
+
+def configured_providers(use_ollama: bool, google_api_key: Optional[str], openai_api_key: Optional[str]) -> List[str]:
+    """Providers enabled by the environment, in preference order (Ollama > Gemini > OpenAI)."""
+    names = []
+    if use_ollama:
+        names.append("ollama")
+    if google_api_key:
+        names.append("google")
+    if openai_api_key:
+        names.append("openai")
+    return names
+
+
+def create_all(names: List[str], options: Optional[Dict[str, dict]] = None) -> List[Tuple[str, object]]:
+    """Create every provider in `names` that comes up, in order; raises if none does."""
+    options = options or {}
+    created, last = [], None
+    for name in names:
+        try:
+            created.append((name, create_llm(name, **options.get(name, {}))))
+        except (RuntimeError, ValueError, ImportError) as e:
+            logger.warning("LLM provider %s unavailable: %s", name, e)
+            last = e
+    if not created:
+        raise last or RuntimeError("No LLM configured. Set GOOGLE_API_KEY, OPENAI_API_KEY, or USE_OLLAMA=true")
+    return created
+
+
+def create_first(names: List[str], options: Optional[Dict[str, dict]] = None) -> Tuple[str, object]:
+    """
+    Create the first provider in `names` that comes up, falling back to the
+    next on failure (e.g. Ollama not running). Returns (name, llm).
+    """
+    if not names:
+        raise RuntimeError("No LLM configured. Set GOOGLE_API_KEY, OPENAI_API_KEY, or USE_OLLAMA=true")
+    options = options or {}
+    last = None
+    for name in names:
+        try:
+            return name, create_llm(name, **options.get(name, {}))
+        except (RuntimeError, ValueError, ImportError) as e:
+            logger.warning("LLM provider %s unavailable: %s", name, e)
+            last = e
+    raise last
+
+
+def output_token_limit(llm) -> Optional[int]:
+    """Most tokens one completion from `llm` may generate, or None if it has no fixed cap."""
+    providers = getattr(llm, "providers", None)
+    if providers:
+        # a router may send the prompt to any of its providers
+        limits = [n for n in map(output_token_limit, providers) if n]
+        return min(limits) if limits else None
+    # Ollama's num_predict, Gemini's max_output_tokens, OpenAI's max_tokens
+    for attr in ("num_predict", "max_output_tokens", "max_tokens"):
+        n = getattr(llm, attr, None)
+        if isinstance(n, int) and not isinstance(n, bool) and n > 0:
+            return n
+    return None
+
+
+async def aclose_loop_clients():
+    """
+    Close the async HTTP clients that loaded providers bound to the running loop.
+
+    Call it before a short-lived loop (one per generation job) ends; providers
+    that were never imported are skipped rather than loaded.
+    """
+    for target in list(PROVIDERS.values()):
+        module = sys.modules.get(target.split(":", 1)[0])
+        close = getattr(module, "aclose_loop_client", None)
+        if close is not None:
+            await close()
+
+
+def complete(llm, prompt: str) -> str:
+    """One completion as text, whatever the LLM object's interface."""
+    # Our wrappers and DummyLLM expose predict(); chat models only invoke()
+    if hasattr(llm, "predict"):
+        return response_to_text(llm.predict(prompt))
+    return response_to_text(llm.invoke(prompt))
+
+
+async def acomplete(llm, prompt: str) -> str:
+    """
+    Async counterpart of complete(): native apredict/ainvoke where the LLM has
+    one, so no thread is held per request; otherwise predict() on a thread.
+    """
+    if hasattr(llm, "apredict"):
+        return response_to_text(await llm.apredict(prompt))
+    if hasattr(llm, "ainvoke"):
+        return response_to_text(await llm.ainvoke(prompt))
+    return await asyncio.to_thread(complete, llm, prompt)
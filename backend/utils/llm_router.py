@@ -0,0 +1,440 @@
+import time
+import asyncio
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Any, Iterator, List, Optional
+
+from langchain_core.callbacks.manager import CallbackManagerForLLMRun, AsyncCallbackManagerForLLMRun
+from langchain_core.language_models import LLM
+from langchain_core.outputs import GenerationChunk
+from pydantic import PrivateAttr
+
+from utils import metrics
+from utils.llm_cache import get_llm_cache
+from utils.llm_providers import complete, acomplete
+from utils.log import get_logger
+
+logger = get_logger("llm_router")
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+# Ranking: a provider's median latency is inflated by this much per unit error rate
+ERROR_PENALTY = 4.0
+
+
+class ProviderHealth:
+    """
+    Rolling latency / error window and circuit breaker for one provider.
+
+    The breaker opens after `failure_threshold` consecutive failures, or when
+    the error rate over the window reaches `error_rate_threshold` (once there
+    are `min_samples` outcomes). After `cooldown` seconds one probe call is let
+    through (half-open); its success closes the breaker, its failure re-opens it.
+    """
+
+    def __init__(self, name: str, priority: int, window: int = 100, failure_threshold: int = 5,
+                 error_rate_threshold: float = 0.5, min_samples: int = 5, cooldown: float = 30.0,
+                 clock=time.monotonic):
+        self.name = name
+        self.priority = priority
+        self.failure_threshold = failure_threshold
+        self.error_rate_threshold = error_rate_threshold
+        self.min_samples = min_samples
+        self.cooldown = cooldown
+        self._clock = clock
+        self._latencies = deque(maxlen=window)  # successful call durations
+        self._outcomes = deque(maxlen=window)  # True = success
+        self._lock = threading.Lock()
+        self.state = CLOSED
+        self.opened_at = None
+        self.consecutive_failures = 0
+        self._probing = False
+
+    def available(self) -> bool:
+        """Whether a call could be let through now (does not take the probe slot)."""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN:
+                return self._clock() - self.opened_at >= self.cooldown
+            return not self._probing
+
+    def acquire(self) -> bool:
+        """Admit one call; in half-open state only a single probe is admitted."""
+        with self._lock:
+            if self.state == OPEN and self._clock() - self.opened_at >= self.cooldown:
+                self.state = HALF_OPEN
+                self._probing = False
+            if self.state == CLOSED:
+                return True
+            if self.state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def force(self):
+        """Make the next acquire() admit a probe despite the cooldown (used when every provider is open)."""
+        with self._lock:
+            if self.state != CLOSED:
+                self.state = HALF_OPEN
+                self._probing = False
+
+    def release(self):
+        """A call was abandoned without an outcome (e.g. cancelled); free the probe slot."""
+        with self._lock:
+            self._probing = False
+
+    def record(self, ok: bool, latency: Optional[float] = None):
+        with self._lock:
+            transition = None
+            if ok:
+                if latency is not None:
+                    self._latencies.append(latency)
+                self.consecutive_failures = 0
+                if self.state != CLOSED:
+                    # fresh window, so old failures don't trip the breaker again at once
+                    self._outcomes.clear()
+                    self.state, self.opened_at, transition = CLOSED, None, "breaker_close"
+                self._outcomes.append(True)
+            else:
+                self._outcomes.append(False)
+                self.consecutive_failures += 1
+                tripped = (
+                    self.state == HALF_OPEN
+                    or self.consecutive_failures >= self.failure_threshold
+                    or (len(self._outcomes) >= self.min_samples and self._error_rate() >= self.error_rate_threshold)
+                )
+                if tripped and self.state != OPEN:
+                    transition = "breaker_open"
+                if tripped:
+                    self.state, self.opened_at = OPEN, self._clock()
+            self._probing = False
+        if transition:
+            metrics.ROUTER_EVENTS.inc(provider=self.name, event=transition)
+            logger.warning("LLM provider %s: %s", self.name, transition.replace("_", " "))
+
+    def _error_rate(self) -> float:
+        if not self._outcomes:
+            return 0.0
+        return self._outcomes.count(False) / len(self._outcomes)
+
+    def percentile(self, q: float) -> Optional[float]:
+        with self._lock:
+            samples = sorted(self._latencies)
+        if len(samples) < self.min_samples:
+            return None
+        return samples[min(len(samples) - 1, int(round(q / 100 * (len(samples) - 1))))]
+
+    def score(self) -> float:
+        """Expected latency used for ranking; 0 until there are enough samples, so every provider gets tried."""
+        p50 = self.percentile(50)
+        if p50 is None:
+            return 0.0
+        with self._lock:
+            error_rate = self._error_rate()
+        return p50 * (1 + ERROR_PENALTY * error_rate)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            state, error_rate, n = self.state, self._error_rate(), len(self._outcomes)
+        p50, p95 = self.percentile(50), self.percentile(95)
+        return {
+            "provider": self.name,
+            "state": state,
+            "calls": n,
+            "error_rate": round(error_rate, 3),
+            "p50_ms": round(p50 * 1000, 1) if p50 is not None else None,
+            "p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+        }
+
+
+class RouterLLM(LLM):
+    """
+    Routes each call across several LLM providers by rolling latency and health.
+
+    Providers are ranked by median latency (penalised by error rate), with
+    providers whose circuit breaker is open left out. A failed call fails
+    over to the next provider. With `hedge` on, if the chosen provider has not
+    answered after its own p95 latency (at least `hedge_min_delay`), the same
+    prompt is also sent to the next provider and the first answer wins, so a
+    degraded backend bounds tail latency instead of setting it.
+
+    The response cache is looked up once here, in front of routing, and the
+    wrapped providers' own `use_response_cache` is switched off: a provider
+    answering from cache in a millisecond would otherwise be recorded as a
+    latency sample, skewing ranking and collapsing the hedge delay.
+    """
+
+    providers: List[Any]
+    names: List[str]
+    hedge: bool = False
+    hedge_quantile: float = 95
+    hedge_min_delay: float = 0.25
+    # hedge delay before the primary has min_samples latencies
+    hedge_default_delay: float = 2.0
+    window: int = 100
+    failure_threshold: int = 5
+    error_rate_threshold: float = 0.5
+    min_samples: int = 5
+    cooldown: float = 30.0
+    max_workers: int = 32
+    use_response_cache: bool = True  # serve repeated prompts from utils.llm_cache
+
+    _health: list = PrivateAttr(default_factory=list)
+    _pool: Any = PrivateAttr(default=None)
+    _pool_lock: Any = PrivateAttr(default_factory=threading.Lock)
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        if len(self.providers) != len(self.names) or not self.providers:
+            raise ValueError("RouterLLM needs one name per provider and at least one provider")
+        self._health = [
+            ProviderHealth(name, i, window=self.window, failure_threshold=self.failure_threshold,
+                           error_rate_threshold=self.error_rate_threshold, min_samples=self.min_samples,
+                           cooldown=self.cooldown)
+            for i, name in enumerate(self.names)
+        ]
+        for provider in self.providers:
+            if getattr(provider, "use_response_cache", False):
+                provider.use_response_cache = False
+
+    @property
+    def _llm_type(self) -> str:
+        return "router"
+
+    def stats(self) -> List[dict]:
+        return [h.snapshot() for h in self._health]
+
+    def _order(self) -> List[int]:
+        """Provider indices to try, best first; never empty."""
+        ready = [i for i, h in enumerate(self._health) if h.available()]
+        if not ready:
+            # Every breaker is open: probe the one that opened first rather than fail without a call
+            oldest = min(range(len(self._health)), key=lambda i: self._health[i].opened_at or 0)
+            self._health[oldest].force()
+            return [oldest]
+        return sorted(ready, key=lambda i: (self._health[i].score(), self._health[i].priority))
+
+    def _hedge_delay(self, i: int) -> float:
+        p = self._health[i].percentile(self.hedge_quantile)
+        return self.hedge_default_delay if p is None else max(self.hedge_min_delay, p)
+
+    def _cache_lookup(self, prompt: str, stop: Optional[List[str]]):
+        """Return (cache, key, cached_text); cache is None when caching is off."""
+        cache = get_llm_cache() if self.use_response_cache else None
+        if cache is None:
+            return None, None, None
+        key = cache.make_key(self._llm_type, ",".join(self.names), {}, prompt, stop)
+        return cache, key, cache.get(key)
+
+    def _executor(self) -> ThreadPoolExecutor:
+        if self._pool is None:
+            with self._pool_lock:
+                if self._pool is None:
+                    self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="llm-hedge")
+        return self._pool
+
+    def _attempt(self, i: int, prompt: str):
+        """Call provider i; returns (ok, text or exception) and records the outcome."""
+        health = self._health[i]
+        started = time.perf_counter()
+        try:
+            text = complete(self.providers[i], prompt)
+        except Exception as e:
+            health.record(False)
+            return False, e
+        health.record(True, time.perf_counter() - started)
+        return True, text
+
+    async def _aattempt(self, i: int, prompt: str):
+        health = self._health[i]
+        started = time.perf_counter()
+        try:
+            text = await acomplete(self.providers[i], prompt)
+        except asyncio.CancelledError:
+            health.release()
+            raise
+        except Exception as e:
+            health.record(False)
+            return False, e
+        health.record(True, time.perf_counter() - started)
+        return True, text
+
+    def _next(self, queue: List[int]) -> Optional[int]:
+        """Pop providers off `queue` until one admits a call."""
+        while queue:
+            i = queue.pop(0)
+            if self._health[i].acquire():
+                return i
+        return None
+
+    def _call(
+        self,
+        prompt: str,
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> str:
+        cache, cache_key, cached = self._cache_lookup(prompt, stop)
+        if cached is not None:
+            metrics.LLM_CACHE_HITS.inc(provider=self._llm_type)
+            return cached
+        started = time.perf_counter()
+        text = self._route(prompt)
+        if cache is not None and text:
+            cache.set(cache_key, text, latency=time.perf_counter() - started)
+        return text
+
+    def _route(self, prompt: str) -> str:
+        order = self._order()
+        if not self.hedge or len(order) < 2:
+            return self._failover(order, prompt)
+
+        queue = list(order)
+        primary = self._next(queue)
+        if primary is None:
+            return self._failover(queue, prompt)
+        pool = self._executor()
+        pending = {pool.submit(self._attempt, primary, prompt): primary}
+        hedged, last = False, None
+        while pending:
+            timeout = None if hedged or not queue else self._hedge_delay(primary)
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                # primary is slower than its own p95: race the next provider
+                hedged = True
+                i = self._next(queue)
+                if i is not None:
+                    metrics.ROUTER_EVENTS.inc(provider=self.names[i], event="hedge")
+                    pending[pool.submit(self._attempt, i, prompt)] = i
+                continue
+            for fut in done:
+                i = pending.pop(fut)
+                ok, value = fut.result()
+                if ok:
+                    if i != primary:
+                        metrics.ROUTER_EVENTS.inc(provider=self.names[i], event="hedge_win")
+                    # a still-running loser finishes in the pool and records its own outcome
+                    return value
+                last = value
+            if not pending:
+                i = self._next(queue)
+                if i is not None:
+                    metrics.ROUTER_EVENTS.inc(provider=self.names[i], event="failover")
+                    pending[pool.submit(self._attempt, i, prompt)] = i
+        raise last or RuntimeError("No LLM provider available")
+
+    def _failover(self, order: List[int], prompt: str) -> str:
+        queue, last, first = list(order), None, True
+        while True:
+            i = self._next(queue)
+            if i is None:
+                raise last or RuntimeError("No LLM provider available")
+            if not first:
+                metrics.ROUTER_EVENTS.inc(provider=self.names[i], event="failover")
+            first = False
+            ok, value = self._attempt(i, prompt)
+            if ok:
+                return value
+            last = value
+
+    async def _acall(
+        self,
+        prompt: str,
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> str:
+        cache, cache_key, cached = self._cache_lookup(prompt, stop)
+        if cached is not None:
+            metrics.LLM_CACHE_HITS.inc(provider=self._llm_type)
+            return cached
+        started = time.perf_counter()
+        text = await self._aroute(prompt)
+        if cache is not None and text:
+            cache.set(cache_key, text, latency=time.perf_counter() - started)
+        return text
+
+    async def _aroute(self, prompt: str) -> str:
+        queue = self._order()
+        primary = self._next(queue)
+        if primary is None:
+            raise RuntimeError("No LLM provider available")
+        pending = {asyncio.ensure_future(self._aattempt(primary, prompt)): primary}
+        hedged, last = False, None
+        try:
+            while pending:
+                timeout = None if hedged or not self.hedge or not queue else self._hedge_delay(primary)
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    hedged = True
+                    i = self._next(queue)
+                    if i is not None:
+                        metrics.ROUTER_EVENTS.inc(provider=self.names[i], event="hedge")
+                        pending[asyncio.ensure_future(self._aattempt(i, prompt))] = i
+                    continue
+                for task in done:
+                    i = pending.pop(task)
+                    ok, value = task.result()
+                    if ok:
+                        if i != primary:
+                            metrics.ROUTER_EVENTS.inc(provider=self.names[i], event="hedge_win")
+                        return value
+                    last = value
+                if not pending:
+                    i = self._next(queue)
+                    if i is not None:
+                        metrics.ROUTER_EVENTS.inc(provider=self.names[i], event="failover")
+                        pending[asyncio.ensure_future(self._aattempt(i, prompt))] = i
+            raise last or RuntimeError("No LLM provider available")
+        finally:
+            # async losers can be cancelled outright
+            for task in pending:
+                task.cancel()
+
+    def _stream(
+        self,
+        prompt: str,
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> Iterator[GenerationChunk]:
+        """
+        Stream from the best provider. Fails over only until the first token;
+        streams are not hedged, and only their outcome (not latency) is recorded.
+        """
+        queue, last = self._order(), None
+        while True:
+            i = self._next(queue)
+            if i is None:
+                raise last or RuntimeError("No LLM provider available")
+            llm, health, emitted = self.providers[i], self._health[i], False
+            try:
+                parts = llm.stream(prompt) if hasattr(llm, "stream") else [complete(llm, prompt)]
+                for part in parts:
+                    text = part if isinstance(part, str) else getattr(part, "content", "")
+                    if not text:
+                        continue
+                    emitted = True
+                    chunk = GenerationChunk(text=text)
+                    if run_manager:
+                        run_manager.on_llm_new_token(text, chunk=chunk)
+                    yield chunk
+            except GeneratorExit:
+                health.release()
+                raise
+            except Exception as e:
+                health.record(False)
+                if emitted:
+                    raise
+                metrics.ROUTER_EVENTS.inc(provider=self.names[i], event="failover")
+                last = e
+                continue
+            health.record(True)
+            return
+
+    def predict(self, prompt: str) -> str:
+        return self._call(prompt)
+
+    async def apredict(self, prompt: str) -> str:
+        return await self._acall(prompt)
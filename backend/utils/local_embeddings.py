@@ -0,0 +1,129 @@
+import os
+import re
+import zlib
+from typing import List, Optional
+
+import numpy as np
+import requests
+from langchain_core.embeddings import Embeddings
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+class HashingEmbeddings(Embeddings):
+    """
+    Fully offline embeddings using the feature-hashing trick.
+
+    Tokens (and optionally adjacent-token bigrams) are hashed into a fixed
+    number of signed buckets, weighted with sublinear term frequency and
+    L2-normalised. A whole batch is vectorised into one NumPy matrix, so ingest
+    throughput is bounded by CPU rather than by a remote API.
+    """
+
+    def __init__(self, dim: int = 1024, ngram_range=(1, 2), lowercase: bool = True):
+        self.dim = dim
+        self.ngram_range = ngram_range
+        self.lowercase = lowercase
+        self.model = f"hashing-{dim}-{ngram_range[0]}{ngram_range[1]}"
+
+    def _features(self, text: str) -> List[str]:
+        if self.lowercase:
+            text = text.lower()
+        tokens = _TOKEN_RE.findall(text)
+        feats = []
+        lo, hi = self.ngram_range
+        for n in range(lo, hi + 1):
+            if n == 1:
+                feats.extend(tokens)
+            else:
+                feats.extend(" ".join(tokens[i:i + n]) for i in range(len(tokens) - n + 1))
+        return feats
+
+    def _embed(self, texts: List[str]) -> np.ndarray:
+        rows, feats = [], []
+        for i, t in enumerate(texts):
+            f = self._features(t)
+            feats.extend(f)
+            rows.extend([i] * len(f))
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        if not feats:
+            return matrix
+
+        # Hash each distinct feature once for the whole batch. crc32 is stable
+        # across processes, unlike the built-in hash().
+        index = {}
+        inverse = np.fromiter((index.setdefault(f, len(index)) for f in feats), dtype=np.intp, count=len(feats))
+        vocab = list(index)
+        hashed = np.fromiter((zlib.crc32(v.encode("utf-8")) for v in vocab), dtype=np.uint32, count=len(vocab))
+        cols = (hashed % self.dim).astype(np.intp)[inverse]
+        signs = np.where((hashed >> 31) & 1, -1.0, 1.0).astype(np.float32)[inverse]
+        np.add.at(matrix, (np.asarray(rows, dtype=np.intp), cols), signs)
+
+        matrix = np.sign(matrix) * np.log1p(np.abs(matrix))
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return matrix / norms
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._embed(list(texts)).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed([text])[0].tolist()
+
+
+class OllamaEmbeddings(Embeddings):
+    """Embeddings served by a local Ollama server via its batched /api/embed endpoint."""
+
+    def __init__(self, model: str = "nomic-embed-text", base_url: str = None, batch_size: int = 64):
+        self.model = model
+        self.base_url = base_url or os.environ.get("OLLAMA_BASE_URL", "http://localhost:11434")
+        self.batch_size = batch_size
+
+    def _embed(self, texts: List[str]) -> List[List[float]]:
+        # shares the Ollama LLM's connection pool; imported here so the
+        # LLM wrapper isn't loaded unless Ollama embeddings are used
+        from utils.ollama_llm import get_ollama_session
+
+        out = []
+        for i in range(0, len(texts), self.batch_size):
+            batch = texts[i:i + self.batch_size]
+            try:
+                response = get_ollama_session().post(
+                    f"{self.base_url}/api/embed",
+                    json={"model": self.model, "input": batch},
+                    timeout=300,
+                )
+            except requests.exceptions.ConnectionError:
+                raise RuntimeError(f"Cannot connect to Ollama at {self.base_url}")
+            if response.status_code != 200:
+                raise RuntimeError(f"Ollama embeddings error: {response.status_code} - {response.text}")
+            out.extend(response.json().get("embeddings", []))
+        return out
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._embed(list(texts))
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed([text])[0]
+
+
+def create_embeddings(provider: Optional[str] = None) -> Embeddings:
+    """
+    Factory for the configured embeddings backend.
+
+    provider (or EMBEDDINGS_PROVIDER) is one of "openai", "ollama" or "hashing".
+    When unset, Ollama is used if USE_OLLAMA=true so a local deployment makes
+    no cloud calls, otherwise OpenAI.
+    """
+    provider = (provider or os.environ.get("EMBEDDINGS_PROVIDER", "")).lower()
+    if not provider:
+        provider = "ollama" if os.environ.get("USE_OLLAMA", "false").lower() == "true" else "openai"
+
+    if provider == "hashing":
+        return HashingEmbeddings(dim=int(os.environ.get("HASHING_EMBEDDINGS_DIM", "1024")))
+    if provider == "ollama":
+        return OllamaEmbeddings(model=os.environ.get("OLLAMA_EMBED_MODEL", "nomic-embed-text"))
+    if provider == "openai":
+        from langchain_openai import OpenAIEmbeddings
+        return OpenAIEmbeddings()
+    raise ValueError(f"Unknown EMBEDDINGS_PROVIDER: {provider}")
@@ -0,0 +1,44 @@
+import os
+import logging
+import threading
+
+# Level for the "study" logger tree; DEBUG shows per-chunk/per-batch progress
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()
+# log_sampled emits the 1st, then every Nth occurrence of a message key
+LOG_SAMPLE_EVERY = max(1, int(os.environ.get("LOG_SAMPLE_EVERY", "100")))
+
+_configured = False
+_counts = {}
+_counts_lock = threading.Lock()
+
+
+def get_logger(name: str) -> logging.Logger:
+    """Logger under the shared "study" namespace, configured once from LOG_LEVEL."""
+    global _configured
+    root = logging.getLogger("study")
+    if not _configured:
+        _configured = True
+        root.setLevel(getattr(logging, LOG_LEVEL, logging.INFO))
+        if not root.handlers:
+            handler = logging.StreamHandler()
+            handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+            root.addHandler(handler)
+        root.propagate = False
+    return root.getChild(name)
+
+
+def log_sampled(logger: logging.Logger, level: int, key: str, msg: str, *args, every: int = None):
+    """
+    Log `msg` for the first occurrence of `key` and then every `every`-th one.
+
+    Meant for hot loops (per chunk, per batch): the level check comes first, so
+    a disabled level costs one comparison and no formatting or console I/O.
+    """
+    if not logger.isEnabledFor(level):
+        return
+    every = every or LOG_SAMPLE_EVERY
+    with _counts_lock:
+        n = _counts.get(key, 0) + 1
+        _counts[key] = n
+    if n == 1 or n % every == 0:
+        logger.log(level, msg + (" (x%d)" % n if n > 1 else ""), *args)
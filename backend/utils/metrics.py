@@ -0,0 +1,193 @@
+import time
+import bisect
+import threading
+from contextlib import contextmanager
+
+# Seconds; spans cache hits (~ms) up to slow provider calls and large PDFs
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    pairs.extend(f'{n}="{v}"' for n, v in extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[n]) for n in self.labelnames)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+            lines.extend(self._render_items(items))
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def _render_items(self, items):
+        return [f"{self.name}_total{_labels(self.labelnames, k)} {v}" for k, v in items]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                # per-bucket (non-cumulative) counts, sum, count
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][i] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels) -> int:
+        with self._lock:
+            entry = self._values.get(self._key(labels))
+            return entry[2] if entry else 0
+
+    def _render_items(self, items):
+        lines = []
+        for key, (counts, total, n) in items:
+            cumulative = 0
+            for bound, c in zip(self.buckets + (float("inf"),), counts):
+                cumulative += c
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, [('le', le)])} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {total}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {n}")
+        return lines
+
+
+class Registry:
+    """Process-wide set of metrics, rendered in the Prometheus text exposition format."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name, documentation, labelnames, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, documentation, labelnames, **kwargs)
+            elif not isinstance(metric, cls) or metric.labelnames != tuple(labelnames):
+                raise ValueError(f"metric {name} already registered with a different type or labels")
+            return metric
+
+    def counter(self, name, documentation, labelnames=()) -> Counter:
+        return self._get(Counter, name, documentation, labelnames)
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self._get(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = [self._metrics[name] for name in sorted(self._metrics)]
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+# Ingestion
+PDF_EXTRACT_SECONDS = REGISTRY.histogram("study_pdf_extract_seconds", "PDF text extraction time per document")
+SPLIT_SECONDS = REGISTRY.histogram("study_split_seconds", "Text splitting time per document")
+EMBED_SECONDS = REGISTRY.histogram(
+    "study_embed_seconds", "Embedding provider call latency (cache misses only)", ("kind",)
+)
+CHUNKS = REGISTRY.counter("study_chunks", "Chunks processed", ("stage",))
+
+# Retrieval
+FAISS_LOAD_SECONDS = REGISTRY.histogram("study_faiss_load_seconds", "Time to load a FAISS shard into memory")
+SEARCH_SECONDS = REGISTRY.histogram("study_search_seconds", "Fan-out search latency", ("index",))
+
+# Generation
+LLM_SECONDS = REGISTRY.histogram("study_llm_seconds", "LLM provider call latency", ("provider", "outcome"))
+ROUTER_EVENTS = REGISTRY.counter(
+    "study_router_events", "LLM router decisions: hedge, hedge_win, failover, breaker_open, breaker_close",
+    ("provider", "event"),
+)
+LLM_CACHE_HITS = REGISTRY.counter("study_llm_cache_hits", "LLM calls answered from the response cache", ("provider",))
+TOKENS = REGISTRY.counter("study_llm_tokens", "Tokens sent to / received from LLM providers", ("provider", "direction"))
+PARSE_PATHS = REGISTRY.counter("study_parse_path", "Structured-output parse path taken", ("kind", "path"))
+
+ERRORS = REGISTRY.counter("study_errors", "Errors by component", ("component",))
+HTTP_SECONDS = REGISTRY.histogram(
+    "study_http_request_seconds", "HTTP request latency by route", ("method", "route", "status")
+)
+
+
+def observe_read(timings: dict):
+    """Record one document's extract/split timings (see ReaderAgent.last_timings)."""
+    PDF_EXTRACT_SECONDS.observe(timings["extract"])
+    SPLIT_SECONDS.observe(timings["split"])
+    CHUNKS.inc(timings["chunks"], stage="split")
+
+
+@contextmanager
+def llm_call(provider: str):
+    """
+    Time one provider call, labelled by outcome: ok, error, or cancelled
+    (e.g. a stream the caller stopped reading).
+    """
+    start = time.perf_counter()
+    outcome = "cancelled"
+    try:
+        yield
+        outcome = "ok"
+    except Exception:
+        outcome = "error"
+        ERRORS.inc(component=f"llm_{provider}")
+        raise
+    finally:
+        LLM_SECONDS.observe(time.perf_counter() - start, provider=provider, outcome=outcome)
+
+
+def record_tokens(provider: str, prompt_tokens: int, completion_tokens: int):
+    TOKENS.inc(prompt_tokens, provider=provider, direction="prompt")
+    TOKENS.inc(completion_tokens, provider=provider, direction="completion")
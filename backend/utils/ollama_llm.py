@@ -1,8 +1,83 @@
 import os
-from typing import Optional, List, Any
+import json
+import time
+import asyncio
+import threading
+import weakref
+from typing import Optional, List, Any, Iterator
+import httpx
 import requests
+from requests.adapters import HTTPAdapter
 from langchain_core.language_models import LLM
-from langchain_core.callbacks.manager import CallbackManagerForLLMRun
+from langchain_core.callbacks.manager import CallbackManagerForLLMRun, AsyncCallbackManagerForLLMRun
+from langchain_core.outputs import GenerationChunk
+from utils import metrics
+from utils.batching import count_tokens
+from utils.llm_cache import get_llm_cache
+from utils.log import get_logger
+
+logger = get_logger("ollama_llm")
+
+# Size of the shared keep-alive connection pools used for all Ollama calls
+OLLAMA_POOL_SIZE = int(os.environ.get("OLLAMA_POOL_SIZE", "32"))
+# How long a successful /api/tags probe is trusted before asking the server again
+OLLAMA_MODELS_CACHE_TTL = float(os.environ.get("OLLAMA_MODELS_CACHE_TTL", "300"))
+
+_session = None
+_session_lock = threading.Lock()
+# httpx.AsyncClient is bound to the event loop it was first used on
+_async_clients = weakref.WeakKeyDictionary()
+_models_cache = {}
+
+
+def get_ollama_session() -> requests.Session:
+    """Process-wide requests.Session so synchronous calls reuse TCP connections."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=OLLAMA_POOL_SIZE)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                _session = session
+    return _session
+
+
+def get_ollama_async_client() -> httpx.AsyncClient:
+    """Shared httpx.AsyncClient for the running event loop."""
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        limits = httpx.Limits(max_connections=OLLAMA_POOL_SIZE, max_keepalive_connections=OLLAMA_POOL_SIZE)
+        client = httpx.AsyncClient(limits=limits, timeout=httpx.Timeout(300, connect=5))
+        _async_clients[loop] = client
+    return client
+
+
+async def aclose_loop_client():
+    """Close the running loop's shared client; call before that loop shuts down."""
+    client = _async_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+
+def list_ollama_models(base_url: str, refresh: bool = False) -> List[str]:
+    """
+    Return model names served by Ollama at base_url.
+
+    The result is cached for OLLAMA_MODELS_CACHE_TTL seconds so creating many
+    OllamaLLM instances doesn't repeat the blocking /api/tags probe.
+    """
+    cached = _models_cache.get(base_url)
+    if cached and not refresh and time.time() - cached[0] < OLLAMA_MODELS_CACHE_TTL:
+        return cached[1]
+    response = get_ollama_session().get(f"{base_url}/api/tags", timeout=5)
+    if response.status_code != 200:
+        raise RuntimeError(f"Ollama returned status {response.status_code}")
+    models = [m["name"].split(":")[0] for m in response.json().get("models", [])]
+    _models_cache[base_url] = (time.time(), models)
+    return models
 
 
 class OllamaLLM(LLM):
@@ -19,6 +94,7 @@ class OllamaLLM(LLM):
     top_p: float = 0.95
     top_k: int = 40
     num_predict: int = 2048  # Max tokens to generate
+    use_response_cache: bool = True  # serve repeated prompts from utils.llm_cache
 
     def __init__(self, **kwargs):
         """
@@ -33,19 +109,17 @@ class OllamaLLM(LLM):
         if "OLLAMA_BASE_URL" in os.environ:
             self.base_url = os.environ.get("OLLAMA_BASE_URL")
         
-        # Verify Ollama is running
+        # Verify Ollama is running (cached across instances, see list_ollama_models)
         try:
-            response = requests.get(f"{self.base_url}/api/tags", timeout=5)
-            if response.status_code == 200:
-                available_models = [m["name"].split(":")[0] for m in response.json().get("models", [])]
-                print(f"✓ Ollama is running with models: {available_models}")
-                
-                # Check if our model is available
-                if not any(self.model in m for m in available_models):
-                    print(f"⚠ Model '{self.model}' not found. Available: {available_models}")
-                    print(f"  To pull the model, run: ollama pull {self.model}")
-            else:
-                raise RuntimeError(f"Ollama returned status {response.status_code}")
+            available_models = list_ollama_models(self.base_url)
+            logger.debug("Ollama is running with models: %s", available_models)
+
+            # Check if our model is available
+            if not any(self.model in m for m in available_models):
+                logger.warning(
+                    "Model '%s' not found. Available: %s. To pull it, run: ollama pull %s",
+                    self.model, available_models, self.model,
+                )
         except requests.exceptions.ConnectionError:
             raise RuntimeError(
                 f"Cannot connect to Ollama at {self.base_url}. "
@@ -54,13 +128,43 @@ class OllamaLLM(LLM):
         except Exception as e:
             raise RuntimeError(f"Error connecting to Ollama: {str(e)}")
         
-        print(f"✓ Ollama LLM configured with model: {self.model}")
+        logger.info("Ollama LLM configured with model: %s", self.model)
 
     @property
     def _llm_type(self) -> str:
         """Return type of llm."""
         return "ollama"
 
+    def _sampling(self) -> dict:
+        return {
+            "temperature": self.temperature,
+            "top_p": self.top_p,
+            "top_k": self.top_k,
+            "num_predict": self.num_predict,
+        }
+
+    def _payload(self, prompt: str, stop: Optional[List[str]], stream: bool) -> dict:
+        payload = {"model": self.model, "prompt": prompt, "stream": stream, **self._sampling()}
+        if stop:
+            payload["stop"] = stop
+        return payload
+
+    def _cache_lookup(self, prompt: str, stop: Optional[List[str]]):
+        """Return (cache, key, cached_text); cache is None when caching is off."""
+        cache = get_llm_cache() if self.use_response_cache else None
+        if cache is None:
+            return None, None, None
+        key = cache.make_key(self._llm_type, self.model, self._sampling(), prompt, stop)
+        return cache, key, cache.get(key)
+
+    def _record_usage(self, prompt: str, result: dict, text: str):
+        """Count tokens from Ollama's eval counters, estimating when absent."""
+        metrics.record_tokens(
+            self._llm_type,
+            result.get("prompt_eval_count") or count_tokens(prompt),
+            result.get("eval_count") or count_tokens(text),
+        )
+
     def _call(
         self,
         prompt: str,
@@ -80,31 +184,29 @@ class OllamaLLM(LLM):
         Returns:
             Generated text response
         """
+        cache, cache_key, cached = self._cache_lookup(prompt, stop)
+        if cached is not None:
+            metrics.LLM_CACHE_HITS.inc(provider=self._llm_type)
+            return cached
+
         try:
-            payload = {
-                "model": self.model,
-                "prompt": prompt,
-                "stream": False,
-                "temperature": self.temperature,
-                "top_p": self.top_p,
-                "top_k": self.top_k,
-                "num_predict": self.num_predict,
-            }
-            
-            if stop:
-                payload["stop"] = stop
-            
-            response = requests.post(
-                f"{self.base_url}/api/generate",
-                json=payload,
-                timeout=300  # 5 minutes timeout for long generations
-            )
-            
-            if response.status_code != 200:
-                raise RuntimeError(f"Ollama error: {response.status_code} - {response.text}")
-            
-            result = response.json()
-            return result.get("response", "")
+            started = time.perf_counter()
+            with metrics.llm_call(self._llm_type):
+                response = get_ollama_session().post(
+                    f"{self.base_url}/api/generate",
+                    json=self._payload(prompt, stop, stream=False),
+                    timeout=300  # 5 minutes timeout for long generations
+                )
+
+                if response.status_code != 200:
+                    raise RuntimeError(f"Ollama error: {response.status_code} - {response.text}")
+
+                result = response.json()
+            text = result.get("response", "")
+            self._record_usage(prompt, result, text)
+            if cache is not None and text:
+                cache.set(cache_key, text, latency=time.perf_counter() - started)
+            return text
             
         except requests.exceptions.Timeout:
             raise RuntimeError("Ollama request timed out. Model generation took too long.")
@@ -113,6 +215,89 @@ class OllamaLLM(LLM):
         except Exception as e:
             raise RuntimeError(f"Ollama generation error: {str(e)}")
 
+    async def _acall(
+        self,
+        prompt: str,
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> str:
+        """
+        Generate text using Ollama without blocking the event loop.
+
+        Uses a shared httpx.AsyncClient, so many concurrent generations share
+        keep-alive connections instead of each holding a thread.
+        """
+        cache, cache_key, cached = self._cache_lookup(prompt, stop)
+        if cached is not None:
+            metrics.LLM_CACHE_HITS.inc(provider=self._llm_type)
+            return cached
+
+        try:
+            started = time.perf_counter()
+            with metrics.llm_call(self._llm_type):
+                response = await get_ollama_async_client().post(
+                    f"{self.base_url}/api/generate",
+                    json=self._payload(prompt, stop, stream=False),
+                )
+                if response.status_code != 200:
+                    raise RuntimeError(f"Ollama error: {response.status_code} - {response.text}")
+                result = response.json()
+            text = result.get("response", "")
+            self._record_usage(prompt, result, text)
+            if cache is not None and text:
+                cache.set(cache_key, text, latency=time.perf_counter() - started)
+            return text
+        except httpx.TimeoutException:
+            raise RuntimeError("Ollama request timed out. Model generation took too long.")
+        except httpx.ConnectError:
+            raise RuntimeError(f"Cannot connect to Ollama at {self.base_url}")
+        except Exception as e:
+            raise RuntimeError(f"Ollama generation error: {str(e)}")
+
+    def _stream(
+        self,
+        prompt: str,
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> Iterator[GenerationChunk]:
+        """
+        Stream tokens from Ollama as they are generated.
+
+        Ollama's streaming API returns one JSON object per line; each carries
+        the next piece of the response until an object with "done": true.
+        """
+        try:
+            parts, data = [], {}
+            with metrics.llm_call(self._llm_type), get_ollama_session().post(
+                f"{self.base_url}/api/generate",
+                json=self._payload(prompt, stop, stream=True),
+                stream=True,
+                timeout=300,
+            ) as response:
+                if response.status_code != 200:
+                    raise RuntimeError(f"Ollama error: {response.status_code} - {response.text}")
+                for line in response.iter_lines():
+                    if not line:
+                        continue
+                    data = json.loads(line)
+                    token = data.get("response", "")
+                    if token:
+                        parts.append(token)
+                        chunk = GenerationChunk(text=token)
+                        if run_manager:
+                            run_manager.on_llm_new_token(token, chunk=chunk)
+                        yield chunk
+                    if data.get("done"):
+                        break
+            # the final "done" object carries the eval counters
+            self._record_usage(prompt, data, "".join(parts))
+        except requests.exceptions.Timeout:
+            raise RuntimeError("Ollama request timed out. Model generation took too long.")
+        except requests.exceptions.ConnectionError:
+            raise RuntimeError(f"Cannot connect to Ollama at {self.base_url}")
+
     def predict(self, prompt: str) -> str:
         """
         Convenience method to generate text (for backwards compatibility).
@@ -125,6 +310,18 @@ class OllamaLLM(LLM):
         """
         return self._call(prompt)
 
+    async def apredict(self, prompt: str) -> str:
+        """
+        Async counterpart of predict().
+
+        Args:
+            prompt: The input prompt text
+
+        Returns:
+            Generated text response
+        """
+        return await self._acall(prompt)
+
 
 def create_ollama_llm(
     model: str = "mistral",
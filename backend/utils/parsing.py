@@ -0,0 +1,385 @@
+# parsing.py
+# Shared structured-output parsing for agent responses. Output is scanned once:
+# a regex jumps between structural characters so prose is skipped at C speed,
+# and each balanced candidate span is decoded once (no greedy `\[.*\]` search).
+import json
+import re
+
+_STRUCT_RE = re.compile(r'[\[\]{}"]')
+_STRING_RE = re.compile(r'"(?:[^"\\]|\\.)*"', re.S)
+_PAIRS = {"]": "[", "}": "{"}
+_DECODER = json.JSONDecoder()
+_WS_RE = re.compile(r"[\s,]*")
+_COLON_RE = re.compile(r"\s*:\s*")
+
+
+def response_to_text(resp) -> str:
+    """
+    Normalize an LLM/chain response into a string safely.
+    Newer versions of LangChain may return dicts (mapping output keys -> values),
+    chat models return message objects, and older versions return a raw string.
+    """
+    if resp is None:
+        return ""
+    if isinstance(resp, str):
+        return resp
+    if isinstance(resp, dict):
+        # try common keys
+        for k in ("text", "output_text", "response", "result"):
+            if k in resp and isinstance(resp[k], str):
+                return resp[k]
+        # fallback: take the first string-like value
+        for v in resp.values():
+            if isinstance(v, str):
+                return v
+        # last resort: convert to json string
+        try:
+            return json.dumps(resp)
+        except Exception:
+            return str(resp)
+    content = getattr(resp, "content", None)
+    if isinstance(content, str):
+        return content
+    return str(resp)
+
+
+def _balanced_spans(text: str, opener: str, pos: int = 0):
+    """Yield (start, end) of each top-level balanced span beginning with `opener`."""
+    stack = []
+    start = -1
+    n = len(text)
+    while pos < n:
+        m = _STRUCT_RE.search(text, pos)
+        if m is None:
+            return
+        ch = m.group()
+        i = m.start()
+        if ch == '"':
+            if not stack:
+                # quotes in surrounding prose are not JSON strings
+                pos = i + 1
+                continue
+            s = _STRING_RE.match(text, i)
+            if s is None:
+                # unterminated string: nothing after it can close a span
+                return
+            pos = s.end()
+            continue
+        pos = i + 1
+        if ch in "[{":
+            if not stack and ch != opener:
+                continue
+            if not stack:
+                start = i
+            stack.append(ch)
+        elif stack:
+            if stack[-1] != _PAIRS[ch]:
+                # mismatched closer: abandon this span and keep looking
+                stack = []
+                continue
+            stack.pop()
+            if not stack:
+                yield start, pos
+
+
+def _extract(text: str, opener: str, accept, max_direct: int = 8):
+    stripped = text.strip()
+    if stripped.startswith(opener):
+        # fast path: the whole response is the JSON value
+        try:
+            parsed = json.loads(stripped)
+            if accept(parsed):
+                return parsed
+        except (ValueError, RecursionError):
+            pass
+    # Decode straight from the first few opener positions; the C decoder
+    # handles the usual "prose + JSON" response without a Python-level scan.
+    pos = text.find(opener)
+    for _ in range(max_direct):
+        if pos == -1:
+            return None
+        try:
+            parsed, _end = _DECODER.raw_decode(text, pos)
+            if accept(parsed):
+                return parsed
+        except (ValueError, RecursionError):
+            pass
+        pos = text.find(opener, pos + 1)
+    if pos == -1:
+        return None
+    # Many false starts (bracket-heavy prose, deep nesting): fall back to one
+    # linear balanced-span scan over the rest of the text.
+    for start, end in _balanced_spans(text, opener, pos):
+        try:
+            parsed = json.loads(text[start:end])
+        except (ValueError, RecursionError):
+            continue
+        if accept(parsed):
+            return parsed
+    return None
+
+
+def _is_list(value):
+    return isinstance(value, list)
+
+
+def _is_dict(value):
+    return isinstance(value, dict)
+
+
+def _is_records(value):
+    # stray non-object elements are left for schema validation to drop
+    return isinstance(value, list) and any(isinstance(v, dict) for v in value)
+
+
+def extract_json_array(text: str):
+    """Return the first JSON array in `text` that decodes, or None."""
+    return _extract(text or "", "[", _is_list)
+
+
+def extract_json_records(text: str):
+    """
+    Return the first JSON array of objects in `text`, or None.
+    Arrays of other shapes (a citation like "[1]", an item's "options" list
+    inside truncated output) are skipped and scanning continues.
+    """
+    return _extract(text or "", "[", _is_records)
+
+
+def extract_json_object(text: str):
+    """Return the first JSON object in `text` that decodes, or None."""
+    return _extract(text or "", "{", _is_dict)
+
+
+class StreamingArrayParser:
+    """
+    Incrementally parse a JSON array arriving in pieces (e.g. a token stream).
+
+    `feed` returns the elements that became complete with the new text, so
+    callers can surface items before the response has finished. Text before
+    the opening bracket (preamble, code fences) is ignored.
+    """
+
+    def __init__(self):
+        self._text = ""
+        self._pos = 0
+        self._started = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._item_start = None
+        self.done = False
+
+    def feed(self, chunk: str):
+        if self.done or not chunk:
+            return []
+        self._text += chunk
+        text = self._text
+        items = []
+        i = self._pos
+        n = len(text)
+        while i < n and not self.done:
+            ch = text[i]
+            if not self._started:
+                if ch == "[":
+                    self._started = True
+                    self._depth = 1
+            elif self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+                if self._depth == 1 and self._item_start is None:
+                    self._item_start = i
+            elif ch in "[{":
+                if self._depth == 1 and self._item_start is None:
+                    self._item_start = i
+                self._depth += 1
+            elif ch in "]}":
+                self._depth -= 1
+                if self._depth == 1 and self._item_start is not None:
+                    # object/array element closed
+                    items.extend(self._decode(text[self._item_start:i + 1]))
+                    self._item_start = None
+                elif self._depth == 0:
+                    # end of the top-level array; flush a trailing scalar
+                    if self._item_start is not None:
+                        items.extend(self._decode(text[self._item_start:i]))
+                        self._item_start = None
+                    self.done = True
+            elif ch == "," and self._depth == 1:
+                if self._item_start is not None:
+                    items.extend(self._decode(text[self._item_start:i]))
+                    self._item_start = None
+            elif self._depth == 1 and self._item_start is None and not ch.isspace():
+                # scalar element (number, true/false/null)
+                self._item_start = i
+            i += 1
+        # Drop consumed text so memory stays bounded by the current element
+        keep_from = self._item_start if self._item_start is not None else i
+        self._text = text[keep_from:]
+        if self._item_start is not None:
+            self._item_start = 0
+        self._pos = i - keep_from
+        return items
+
+    @staticmethod
+    def _decode(fragment):
+        try:
+            return [json.loads(fragment)]
+        except (ValueError, RecursionError):
+            return []
+
+
+def parse_partial_array(text: str):
+    """Return every complete element of a possibly truncated JSON array."""
+    text = text or ""
+    pos = text.find("[")
+    items = []
+    if pos == -1:
+        return items
+    pos = _WS_RE.match(text, pos + 1).end()
+    n = len(text)
+    # Decode element by element with the C decoder; stop at the first
+    # element that is cut off (or malformed).
+    while pos < n and text[pos] != "]":
+        try:
+            item, pos = _DECODER.raw_decode(text, pos)
+        except (ValueError, RecursionError):
+            break
+        items.append(item)
+        pos = _WS_RE.match(text, pos).end()
+    return items
+
+
+def parse_partial_object(text: str):
+    """Return every complete key/value pair of a possibly truncated JSON object."""
+    text = text or ""
+    pos = text.find("{")
+    out = {}
+    if pos == -1:
+        return out
+    pos = _WS_RE.match(text, pos + 1).end()
+    n = len(text)
+    # Same element-by-element decode as parse_partial_array; a value cut off
+    # by the token limit ends the scan and is left out.
+    while pos < n and text[pos] != "}":
+        try:
+            key, pos = _DECODER.raw_decode(text, pos)
+            sep = _COLON_RE.match(text, pos)
+            if not isinstance(key, str) or sep is None:
+                break
+            value, pos = _DECODER.raw_decode(text, sep.end())
+        except (ValueError, RecursionError):
+            break
+        out[key] = value
+        pos = _WS_RE.match(text, pos).end()
+    return out
+
+
+def validate_flashcard(item):
+    """Return a normalized flashcard dict, or None if the item doesn't fit the schema."""
+    if not isinstance(item, dict):
+        return None
+    q, a = item.get("question"), item.get("answer")
+    if isinstance(a, (int, float)) and not isinstance(a, bool):
+        a = str(a)
+    if not isinstance(q, str) or not isinstance(a, str):
+        return None
+    qs, as_ = q.strip(), a.strip()
+    if not qs or not as_:
+        return None
+    if qs is not q or as_ is not item.get("answer"):
+        # only copy when something actually changed
+        item = dict(item)
+        item["question"], item["answer"] = qs, as_
+    return item
+
+
+def validate_quiz_item(item, default_difficulty="Medium"):
+    """Return a normalized quiz dict (question, options, answer, difficulty), or None."""
+    if not isinstance(item, dict):
+        return None
+    q = item.get("question")
+    if not isinstance(q, str) or not q.strip():
+        return None
+    options = item.get("options")
+    if isinstance(options, dict):
+        options = list(options.values())
+    if options is not None and not isinstance(options, list):
+        return None
+    # items come straight from json.loads, so normalising in place is safe
+    item["question"] = q.strip()
+    if options is not None:
+        item["options"] = [o if isinstance(o, str) else str(o) for o in options]
+    if "answer" in item and not isinstance(item["answer"], str):
+        item["answer"] = str(item["answer"])
+    if "difficulty" not in item:
+        item["difficulty"] = default_difficulty
+    return item
+
+
+def parse_flashcard_lines(text: str):
+    # naive line extraction as last resort
+    # split into QA pairs by lines containing '?' or 'Q:' / 'A:'
+    lines = [ln.strip() for ln in text.splitlines() if ln.strip()]
+    qa = []
+    cur_q = None
+    for ln in lines:
+        if ln.endswith("?") and not cur_q:
+            cur_q = ln
+        elif ln.lower().startswith("q:"):
+            cur_q = ln[2:].strip()
+        elif ln.lower().startswith("a:") and cur_q:
+            qa.append({"question": cur_q, "answer": ln[2:].strip()})
+            cur_q = None
+    return qa
+
+
+def parse_quiz_lines(text: str):
+    # last-resort parsing: attempt to split into questions (very naive)
+    out = []
+    lines = [ln.strip() for ln in text.splitlines() if ln.strip()]
+    current = {}
+    for ln in lines:
+        if ln.lower().startswith("q:") or ln.endswith("?"):
+            if current:
+                out.append(current)
+                current = {}
+            current["question"] = ln[2:].strip() if ln.lower().startswith("q:") else ln
+        elif ln.lower().startswith("a)") or ln.startswith("-") or ln.lower().startswith("option"):
+            current.setdefault("options", []).append(ln.split(")", 1)[-1].strip() if ")" in ln else ln)
+        elif ln.lower().startswith("answer:") and current:
+            current["answer"] = ln.split(":", 1)[1].strip()
+    if current:
+        out.append(current)
+    return out
+
+
+def _parse_items(text, line_parser, validate):
+    # Each path only wins if something survives validation; otherwise fall
+    # through, e.g. a complete array of the wrong shape to the partial parser.
+    parsed = extract_json_records(text)
+    if parsed is not None:
+        items = [v for v in map(validate, parsed) if v]
+        if items:
+            return items, "json"
+    # truncated output (e.g. hit the token limit): keep the complete elements
+    items = [v for v in map(validate, parse_partial_array(text)) if v]
+    if items:
+        return items, "partial"
+    return [v for v in map(validate, line_parser(text or "")) if v], "lines"
+
+
+def parse_flashcards(text: str):
+    """Parse flashcards from raw LLM output. Returns (items, path); path is 'json', 'partial' or 'lines'."""
+    return _parse_items(text, parse_flashcard_lines, validate_flashcard)
+
+
+def parse_quiz(text: str, default_difficulty="Medium"):
+    """Parse quiz items from raw LLM output. Returns (items, path); path is 'json', 'partial' or 'lines'."""
+    return _parse_items(text, parse_quiz_lines, lambda q: validate_quiz_item(q, default_difficulty))
@@ -1,8 +1,53 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from collections import deque
+
 import fitz  # PyMuPDF
 
-def extract_text_from_pdf(path: str) -> str:
-    doc = fitz.open(path)
-    text = ""
-    for page in doc:
-        text += page.get_text()
-    return text
+
+def iter_pdf_pages(path: str):
+    """Yield the text of each page in order without holding the whole document."""
+    with fitz.open(path) as doc:
+        for page in doc:
+            yield page.get_text()
+
+
+def _extract_page_range(path: str, start: int, stop: int):
+    # Runs in a worker process: each worker opens its own document handle since
+    # PyMuPDF documents cannot be shared across processes.
+    with fitz.open(path) as doc:
+        return [doc[i].get_text() for i in range(start, min(stop, doc.page_count))]
+
+
+def iter_pdf_pages_parallel(path: str, workers: int = None, pages_per_task: int = 16):
+    """
+    Yield page texts in order, extracting page ranges in a process pool.
+
+    Only a bounded number of ranges is in flight at once so memory stays
+    proportional to `workers * pages_per_task` pages, not the document size.
+    """
+    with fitz.open(path) as doc:
+        page_count = doc.page_count
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1 or page_count <= pages_per_task:
+        yield from iter_pdf_pages(path)
+        return
+
+    ranges = iter(range(0, page_count, pages_per_task))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for start in ranges:
+            pending.append(pool.submit(_extract_page_range, path, start, start + pages_per_task))
+            if len(pending) >= workers * 2:
+                break
+        while pending:
+            for text in pending.popleft().result():
+                yield text
+            start = next(ranges, None)
+            if start is not None:
+                pending.append(pool.submit(_extract_page_range, path, start, start + pages_per_task))
+
+
+def extract_text_from_pdf(path: str, workers: int = 1) -> str:
+    pages = iter_pdf_pages_parallel(path, workers=workers) if workers > 1 else iter_pdf_pages(path)
+    return "".join(pages)
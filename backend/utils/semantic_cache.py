@@ -0,0 +1,150 @@
+import re
+import time
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+import numpy as np
+
+_PUNCT_RE = re.compile(r"[^\w\s]")
+
+
+def normalize_question(question: str) -> str:
+    return " ".join(_PUNCT_RE.sub(" ", (question or "").lower()).split())
+
+
+class _Entry:
+    __slots__ = ("scope", "question", "vector", "answer", "sources", "created")
+
+    def __init__(self, scope, question, vector, answer, sources):
+        self.scope = scope
+        self.question = question
+        self.vector = vector
+        self.answer = answer
+        self.sources = sources
+        self.created = time.time()
+
+
+class SemanticCache:
+    """
+    In-memory cache of chat answers, matched by question similarity.
+
+    Answers are grouped by scope: the retrieval mode plus the (doc_id,
+    index version) pairs that were searched. A new index version is a new
+    scope, so stale answers can never match; `invalidate` frees them early.
+    Within a scope, a question matches an earlier one if it is identical after
+    normalisation, or if the cosine similarity of their embeddings is at least
+    `threshold`. Entries stored without a vector (e.g. BM25-only chats, which
+    never embed) match exactly only. Entries expire after `ttl_seconds` and the
+    least recently used are evicted beyond `max_items`.
+    """
+
+    def __init__(self, threshold: float = 0.92, max_items: int = 1024, ttl_seconds: float = 24 * 3600):
+        self.threshold = threshold
+        self.max_items = max_items
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()  # id -> _Entry, in LRU order
+        self._scopes = {}  # scope -> {"ids": [...], "vec_ids": [...] | None, "matrix": ndarray | None}
+        self._exact = {}  # (scope, normalized question) -> id
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self._stats = {"exact_hits": 0, "semantic_hits": 0, "misses": 0}
+
+    @staticmethod
+    def make_scope(mode: str, versions) -> tuple:
+        """Scope key from a retrieval mode and an iterable of (doc_id, version)."""
+        return (mode, tuple(sorted(versions)))
+
+    def lookup_exact(self, scope, question: str, count_miss: bool = False) -> Optional[dict]:
+        """
+        Hit on a normalised-identical question; needs no embedding. A miss is
+        only counted with `count_miss` (when no semantic lookup follows).
+        """
+        with self._lock:
+            entry_id = self._exact.get((scope, normalize_question(question)))
+            hit = self._hit(entry_id, "exact_hits", 1.0)
+            if hit is None and count_miss:
+                self._stats["misses"] += 1
+            return hit
+
+    def lookup(self, scope, vector) -> Optional[dict]:
+        """Best entry in `scope` whose embedding is within the threshold, or None (counted as a miss)."""
+        v = self._unit(vector)
+        with self._lock:
+            bucket = self._scopes.get(scope)
+            if bucket and bucket["matrix"] is None:
+                bucket["vec_ids"] = [i for i in bucket["ids"] if self._entries[i].vector is not None]
+                if bucket["vec_ids"]:
+                    bucket["matrix"] = np.stack([self._entries[i].vector for i in bucket["vec_ids"]])
+            if bucket and bucket["matrix"] is not None:
+                sims = bucket["matrix"] @ v
+                best = int(np.argmax(sims))
+                if sims[best] >= self.threshold:
+                    hit = self._hit(bucket["vec_ids"][best], "semantic_hits", float(sims[best]))
+                    if hit is not None:
+                        return hit
+            self._stats["misses"] += 1
+            return None
+
+    def store(self, scope, question: str, vector, answer: str, sources):
+        """Cache an answer; with `vector=None` it can only be matched exactly."""
+        unit = self._unit(vector) if vector is not None else None
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            entry = _Entry(scope, normalize_question(question), unit, answer, list(sources))
+            self._entries[entry_id] = entry
+            bucket = self._scopes.setdefault(scope, {"ids": [], "vec_ids": None, "matrix": None})
+            bucket["ids"].append(entry_id)
+            bucket["matrix"] = None
+            old = self._exact.get((scope, entry.question))
+            self._exact[(scope, entry.question)] = entry_id
+            if old is not None:
+                self._drop(old)
+            while len(self._entries) > self.max_items:
+                self._drop(next(iter(self._entries)))
+
+    def invalidate(self, doc_id: str = None):
+        """Drop every scope that searched `doc_id` (everything if None)."""
+        with self._lock:
+            for scope, bucket in list(self._scopes.items()):
+                if doc_id is None or any(d == doc_id for d, _ in scope[1]):
+                    for entry_id in list(bucket["ids"]):
+                        self._drop(entry_id)
+
+    def stats(self):
+        with self._lock:
+            return {**self._stats, "entries": len(self._entries), "scopes": len(self._scopes)}
+
+    @staticmethod
+    def _unit(vector):
+        v = np.asarray(vector, dtype=np.float32)
+        norm = float(np.linalg.norm(v))
+        return v / norm if norm else v
+
+    def _hit(self, entry_id, counter, similarity):
+        # Caller holds the lock
+        entry = self._entries.get(entry_id) if entry_id is not None else None
+        if entry is None:
+            return None
+        if time.time() - entry.created > self.ttl_seconds:
+            self._drop(entry_id)
+            return None
+        self._entries.move_to_end(entry_id)
+        self._stats[counter] += 1
+        return {"answer": entry.answer, "sources": entry.sources, "similarity": similarity}
+
+    def _drop(self, entry_id):
+        # Caller holds the lock
+        entry = self._entries.pop(entry_id, None)
+        if entry is None:
+            return
+        bucket = self._scopes.get(entry.scope)
+        if bucket is not None:
+            bucket["ids"].remove(entry_id)
+            bucket["matrix"] = None
+            if not bucket["ids"]:
+                del self._scopes[entry.scope]
+        key = (entry.scope, entry.question)
+        if self._exact.get(key) == entry_id:
+            del self._exact[key]
@@ -0,0 +1,227 @@
+import os
+import time
+import heapq
+import hashlib
+import threading
+
+import numpy as np
+
+DAY = 86400.0
+_FIELDS = ("ease", "interval", "reps", "lapses", "due", "last")
+
+
+def card_id(card: dict) -> str:
+    """
+    Stable id for a generated flashcard, derived from its question and answer
+    (and source document, when the card records one), so cards that share a
+    question keep separate review state.
+    """
+    parts = (" ".join(str(card.get(k, "")).lower().split()) for k in ("doc_id", "question", "answer"))
+    return hashlib.blake2b("\x1f".join(parts).encode("utf-8"), digest_size=8).hexdigest()
+
+
+class ReviewScheduler:
+    """
+    SM-2 spaced-repetition state for many cards, kept in flat NumPy arrays.
+
+    Each card is a row: ease factor, interval (days), repetition count,
+    lapse count, due time and last review time (epoch seconds). Reviews are
+    applied as one vectorized update per batch. A min-heap of (due, row)
+    answers "what's due" in O(log n) per returned card; heap entries are
+    invalidated lazily by comparing against the `due` array.
+    """
+
+    def __init__(self, path: str = None, initial_ease: float = 2.5, min_ease: float = 1.3):
+        self.path = path
+        self.initial_ease = initial_ease
+        self.min_ease = min_ease
+        self._lock = threading.Lock()
+        self._ids = []
+        self._rows = {}
+        self._n = 0
+        self._alloc(1024)
+        self._heap = []
+        if path and os.path.exists(path):
+            self._load(path)
+
+    # -- storage ------------------------------------------------------------
+
+    def _alloc(self, capacity):
+        def grow(old, dtype, fill=0):
+            arr = np.full(capacity, fill, dtype=dtype)
+            if old is not None:
+                arr[: self._n] = old[: self._n]
+            return arr
+
+        self.ease = grow(getattr(self, "ease", None), np.float32, self.initial_ease)
+        self.interval = grow(getattr(self, "interval", None), np.float32)
+        self.reps = grow(getattr(self, "reps", None), np.int32)
+        self.lapses = grow(getattr(self, "lapses", None), np.int32)
+        self.due = grow(getattr(self, "due", None), np.float64)
+        self.last = grow(getattr(self, "last", None), np.float64)
+
+    def __len__(self):
+        return self._n
+
+    def __contains__(self, cid):
+        return cid in self._rows
+
+    def save(self, path: str = None):
+        path = path or self.path
+        if not path:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        n = self._n
+        tmp = path + ".tmp"
+        with self._lock, open(tmp, "wb") as f:
+            np.savez(
+                f,
+                ids=np.array(self._ids, dtype=str),
+                ease=self.ease[:n], interval=self.interval[:n], reps=self.reps[:n],
+                lapses=self.lapses[:n], due=self.due[:n], last=self.last[:n],
+            )
+        os.replace(tmp, path)
+
+    def _load(self, path):
+        with np.load(path, allow_pickle=False) as data:
+            ids = data["ids"].tolist()
+            n = len(ids)
+            self._ids = ids
+            self._rows = {cid: i for i, cid in enumerate(ids)}
+            self._n = 0
+            self._alloc(max(1024, 2 * n))
+            self._n = n
+            for name in _FIELDS:
+                getattr(self, name)[:n] = data[name]
+        self._rebuild_heap()
+
+    def _rebuild_heap(self):
+        # O(n) heapify; also drops stale entries accumulated by reviews
+        self._heap = [(float(d), i) for i, d in enumerate(self.due[: self._n])]
+        heapq.heapify(self._heap)
+
+    # -- scheduling ---------------------------------------------------------
+
+    def add(self, card_ids, now: float = None) -> int:
+        """Register new cards as due at `now`; known ids keep their state. Returns the number added."""
+        now = time.time() if now is None else now
+        added = 0
+        with self._lock:
+            for cid in card_ids:
+                if cid in self._rows:
+                    continue
+                if self._n == len(self.due):
+                    self._alloc(2 * len(self.due))
+                i = self._n
+                self._n += 1
+                self._rows[cid] = i
+                self._ids.append(cid)
+                self.due[i] = now
+                heapq.heappush(self._heap, (now, i))
+                added += 1
+        return added
+
+    def retain(self, card_ids) -> int:
+        """Drop every card not in `card_ids` (the deck was replaced). Returns the number removed."""
+        wanted = set(card_ids)
+        with self._lock:
+            keep = [i for i, cid in enumerate(self._ids) if cid in wanted]
+            removed = self._n - len(keep)
+            if not removed:
+                return 0
+            rows = np.array(keep, dtype=np.int64)
+            n, old_n = len(keep), self._n
+            for name in _FIELDS:
+                arr = getattr(self, name)
+                arr[:n] = arr[rows]
+            # freed rows are reused by add(), which only sets `due`
+            self.ease[n:old_n] = self.initial_ease
+            for name in _FIELDS[1:]:
+                getattr(self, name)[n:old_n] = 0
+            self._ids = [self._ids[i] for i in keep]
+            self._rows = {cid: i for i, cid in enumerate(self._ids)}
+            self._n = n
+            self._rebuild_heap()
+        return removed
+
+    def review(self, card_ids, grades, now: float = None):
+        """
+        Apply SM-2 to a batch of reviews (grades 0-5, 3+ counts as recalled).
+
+        A lapse restarts the card's repetitions without changing its ease, as
+        in SM-2; only recalled cards move their ease.
+        If a card appears more than once, its last grade wins. Raises KeyError
+        for unknown card ids. Returns the new state of each reviewed card.
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            latest = {}
+            for cid, grade in zip(card_ids, grades):
+                if cid not in self._rows:
+                    raise KeyError(cid)
+                latest[self._rows[cid]] = grade
+            rows = np.fromiter(latest.keys(), dtype=np.int64, count=len(latest))
+            q = np.clip(np.fromiter(latest.values(), dtype=np.float32, count=len(latest)), 0, 5)
+
+            recalled = q >= 3
+            miss = 5 - q
+            ease = np.where(
+                recalled,
+                np.maximum(self.min_ease, self.ease[rows] + 0.1 - miss * (0.08 + miss * 0.02)),
+                self.ease[rows],
+            ).astype(np.float32)
+            reps = np.where(recalled, self.reps[rows] + 1, 0)
+            interval = np.where(
+                reps <= 1, 1.0, np.where(reps == 2, 6.0, np.rint(self.interval[rows] * ease))
+            ).astype(np.float32)
+
+            self.ease[rows] = ease
+            self.reps[rows] = reps
+            self.interval[rows] = interval
+            self.lapses[rows] += (~recalled).astype(np.int32)
+            self.last[rows] = now
+            self.due[rows] = now + interval * DAY
+
+            for i in rows.tolist():
+                heapq.heappush(self._heap, (float(self.due[i]), i))
+            if len(self._heap) > 2 * self._n + 1024:
+                self._rebuild_heap()
+            return [self._state(i) for i in rows.tolist()]
+
+    def due_cards(self, now: float = None, limit: int = 50):
+        """Cards due at or before `now`, most overdue first (at most `limit`)."""
+        now = time.time() if now is None else now
+        out = []
+        with self._lock:
+            popped = []
+            while self._heap and len(out) < limit and self._heap[0][0] <= now:
+                entry = heapq.heappop(self._heap)
+                d, i = entry
+                if d != self.due[i]:
+                    continue  # superseded by a later review
+                popped.append(entry)
+                out.append(self._state(i))
+            # listing does not consume: put the live entries back
+            for entry in popped:
+                heapq.heappush(self._heap, entry)
+        return out
+
+    def count_due(self, now: float = None) -> int:
+        now = time.time() if now is None else now
+        with self._lock:
+            return int(np.count_nonzero(self.due[: self._n] <= now))
+
+    def state(self, cid: str) -> dict:
+        with self._lock:
+            return self._state(self._rows[cid])
+
+    def _state(self, i):
+        return {
+            "card_id": self._ids[i],
+            "ease": round(float(self.ease[i]), 3),
+            "interval_days": float(self.interval[i]),
+            "reps": int(self.reps[i]),
+            "lapses": int(self.lapses[i]),
+            "due": float(self.due[i]),
+            "last_review": float(self.last[i]) or None,
+        }
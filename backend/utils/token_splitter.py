@@ -0,0 +1,111 @@
+import re
+
+from utils.batching import count_tokens_batch
+
+# Chunk boundaries: paragraph breaks and sentence ends (trailing whitespace
+# stays with the preceding segment, so joining segments restores the text)
+_BOUNDARY_RE = re.compile(r"\n[ \t]*\n\s*|(?<=[.!?])\s+")
+_WORD_RE = re.compile(r"\S+\s*|\s+")
+
+
+def split_segments(text: str):
+    """Split text at sentence/paragraph boundaries. Returns (complete segments, unterminated rest)."""
+    segments = []
+    start = 0
+    for m in _BOUNDARY_RE.finditer(text):
+        if m.end() > start:
+            segments.append(text[start:m.end()])
+            start = m.end()
+    return segments, text[start:]
+
+
+class _Packer:
+    """Greedy single-pass packing of (segment, tokens) pairs into chunks."""
+
+    def __init__(self, chunk_tokens, overlap_tokens):
+        self.chunk_tokens = chunk_tokens
+        self.overlap_tokens = overlap_tokens
+        self.current = []
+        self.tokens = 0
+        self.fresh = False  # current holds text not yet emitted
+
+    def add(self, segment, n):
+        if self.current and self.tokens + n > self.chunk_tokens:
+            yield from self.emit()
+            if self.tokens + n > self.chunk_tokens:
+                # the carried-over overlap would push this chunk over budget
+                self.current, self.tokens = [], 0
+        self.current.append((segment, n))
+        self.tokens += n
+        self.fresh = True
+
+    def emit(self):
+        text = "".join(s for s, _ in self.current)
+        if text.strip():
+            yield text
+        # carry whole trailing segments (never the entire chunk) as overlap
+        carry, used = [], 0
+        for s, n in reversed(self.current[1:]):
+            if used + n > self.overlap_tokens:
+                break
+            carry.append((s, n))
+            used += n
+        self.current, self.tokens = carry[::-1], used
+        self.fresh = False
+
+    def finish(self):
+        if self.fresh:
+            yield from self.emit()
+
+
+class TokenTextSplitter:
+    """
+    Split text into chunks of at most `chunk_tokens` tokens, in one pass.
+
+    Text is cut only at paragraph breaks and sentence ends; a single sentence
+    longer than the budget is split between words. Segment token counts come
+    from one batched tokenizer call per input piece (cl100k_base via
+    utils.batching, ~4 chars/token without tiktoken). `overlap_tokens` of
+    trailing sentences are repeated at the start of the next chunk.
+
+    `split_stream` accepts any iterable of text pieces (e.g. PDF pages) and
+    yields chunks as soon as they are complete.
+    """
+
+    def __init__(self, chunk_tokens: int = 256, overlap_tokens: int = 0, max_pending_chars: int = None):
+        if overlap_tokens >= chunk_tokens:
+            raise ValueError("overlap_tokens must be smaller than chunk_tokens")
+        self.chunk_tokens = chunk_tokens
+        self.overlap_tokens = overlap_tokens
+        # text with no boundary in sight is force-split once it grows this long
+        self.max_pending_chars = max_pending_chars or chunk_tokens * 16
+
+    def split_text(self, text: str):
+        return list(self.split_stream([text]))
+
+    def split_stream(self, pieces):
+        packer = _Packer(self.chunk_tokens, self.overlap_tokens)
+        pending = ""
+        for piece in pieces:
+            if not piece:
+                continue
+            segments, pending = split_segments(pending + piece)
+            if len(pending) > self.max_pending_chars:
+                segments.append(pending)
+                pending = ""
+            yield from self._pack(packer, segments)
+        if pending:
+            yield from self._pack(packer, [pending])
+        yield from packer.finish()
+
+    def _pack(self, packer, segments):
+        if not segments:
+            return
+        for segment, n in zip(segments, count_tokens_batch(segments)):
+            if n <= self.chunk_tokens:
+                yield from packer.add(segment, n)
+                continue
+            # over-long sentence: fall back to word boundaries
+            words = _WORD_RE.findall(segment)
+            for word, m in zip(words, count_tokens_batch(words)):
+                yield from packer.add(word, m)
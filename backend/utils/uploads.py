@@ -0,0 +1,73 @@
+import os
+import uuid
+import hashlib
+
+import aiofiles
+import aiofiles.os
+
+PDF_MAGIC = b"%PDF-"
+
+
+class UploadError(Exception):
+    """Upload rejected; `status_code` is the HTTP status to answer with."""
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+class SavedUpload:
+    def __init__(self, path: str, sha256: str, size: int, filename: str, created: bool = True):
+        self.path = path
+        self.sha256 = sha256
+        self.size = size
+        self.filename = filename
+        # False when identical content was already stored (possibly for another job)
+        self.created = created
+
+
+async def save_upload(upload, dest_dir: str, max_bytes: int, chunk_size: int = 1 << 20) -> SavedUpload:
+    """
+    Stream an UploadFile to `dest_dir` in `chunk_size` pieces, hashing as it goes.
+
+    At most one chunk is held in memory and file writes go through aiofiles,
+    so the event loop is never blocked on disk. The upload is rejected with
+    413 as soon as it exceeds `max_bytes` (or up front if its declared size
+    already does), and with 400 if it does not start like a PDF. The file is
+    stored content-addressed as `<sha256[:16]>.pdf`; partial files are removed.
+    """
+    declared = getattr(upload, "size", None)
+    if max_bytes and declared and declared > max_bytes:
+        raise UploadError(413, f"{upload.filename} exceeds the {max_bytes // (1 << 20)} MB upload limit")
+
+    os.makedirs(dest_dir, exist_ok=True)
+    tmp_path = os.path.join(dest_dir, f".{uuid.uuid4().hex}.part")
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        async with aiofiles.open(tmp_path, "wb") as out:
+            while True:
+                chunk = await upload.read(chunk_size)
+                if not chunk:
+                    break
+                if size == 0 and not chunk.startswith(PDF_MAGIC[: len(chunk)]):
+                    raise UploadError(400, f"{upload.filename} is not a PDF")
+                size += len(chunk)
+                if max_bytes and size > max_bytes:
+                    raise UploadError(413, f"{upload.filename} exceeds the {max_bytes // (1 << 20)} MB upload limit")
+                digest.update(chunk)
+                await out.write(chunk)
+        if size == 0:
+            raise UploadError(400, f"{upload.filename} is empty")
+        sha = digest.hexdigest()
+        path = os.path.join(dest_dir, f"{sha[:16]}.pdf")
+        created = not await aiofiles.os.path.exists(path)
+        await aiofiles.os.replace(tmp_path, path)
+        return SavedUpload(path, sha, size, os.path.basename(upload.filename or ""), created)
+    except BaseException:
+        try:
+            await aiofiles.os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
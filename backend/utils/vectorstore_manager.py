@@ -0,0 +1,91 @@
+import os
+import shutil
+import threading
+import time
+import uuid
+from typing import Callable, Optional, Any
+
+from utils import metrics
+
+VERSION_FILE = "VERSION"
+
+
+class VectorStoreManager:
+    """
+    Keeps a FAISS vector store resident in memory for the whole process.
+
+    The index is loaded once and reused by every request. Writers publish a new
+    index through `publish`, which saves it next to the live one, swaps the
+    files into place and bumps a version stamp. Readers compare that stamp on
+    each `get` (a single small file read) and reload only when it changed, so
+    an index written by another worker process is also picked up.
+    """
+
+    def __init__(self, index_path: str, loader: Callable[[str], Any]):
+        self.index_path = index_path
+        self.loader = loader
+        self._db = None
+        self._version = None
+        self._lock = threading.Lock()
+
+    @property
+    def version(self) -> Optional[str]:
+        return self._version
+
+    def exists(self) -> bool:
+        return os.path.exists(self.index_path)
+
+    def get(self):
+        """Return the in-memory store, reloading it if the on-disk version changed."""
+        current = self._read_version()
+        db = self._db
+        if db is not None and current == self._version:
+            return db
+        with self._lock:
+            current = self._read_version()
+            if self._db is None or current != self._version:
+                # Load fully before swapping so concurrent readers never see a
+                # half-initialised store.
+                with metrics.FAISS_LOAD_SECONDS.time():
+                    self._db = self.loader(self.index_path)
+                self._version = current
+            return self._db
+
+    def publish(self, db):
+        """Persist `db` as the new live index and serve it from memory immediately."""
+        with self._lock:
+            parent = os.path.dirname(os.path.abspath(self.index_path))
+            os.makedirs(parent, exist_ok=True)
+            staging = f"{self.index_path}.tmp-{uuid.uuid4().hex}"
+            db.save_local(staging)
+            os.makedirs(self.index_path, exist_ok=True)
+            for name in os.listdir(staging):
+                os.replace(os.path.join(staging, name), os.path.join(self.index_path, name))
+            shutil.rmtree(staging, ignore_errors=True)
+            self._version = self._write_version()
+            self._db = db
+            return self._version
+
+    def invalidate(self):
+        with self._lock:
+            self._db = None
+            self._version = None
+
+    def _read_version(self) -> Optional[str]:
+        try:
+            with open(os.path.join(self.index_path, VERSION_FILE), encoding="utf-8") as f:
+                return f.read().strip()
+        except OSError:
+            # Index written before version stamps existed: fall back to mtime
+            try:
+                return str(os.stat(os.path.join(self.index_path, "index.faiss")).st_mtime_ns)
+            except OSError:
+                return None
+
+    def _write_version(self) -> str:
+        version = f"{time.time_ns()}-{uuid.uuid4().hex[:8]}"
+        tmp = os.path.join(self.index_path, f"{VERSION_FILE}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(version)
+        os.replace(tmp, os.path.join(self.index_path, VERSION_FILE))
+        return version
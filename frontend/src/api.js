@@ -19,8 +19,49 @@ export const uploadPdf = (file) => {
 };
 
 export const generateAll = () => API.post("/generate_all", {}, { timeout: LONG_TIMEOUT });
+export const fetchJob = (jobId) => API.get(`/jobs/${jobId}`);
+
+// Poll a background job until it finishes; onProgress receives each status payload
+export const waitForJob = async (jobId, onProgress, intervalMs = 1000) => {
+  for (;;) {
+    const { data } = await fetchJob(jobId);
+    onProgress && onProgress(data);
+    if (data.status === "done") return data;
+    if (data.status === "failed") throw new Error(data.error || "Job failed");
+    await new Promise((resolve) => setTimeout(resolve, intervalMs));
+  }
+};
 export const fetchFlashcards = () => API.get("/flashcards");
 export const fetchQuizzes = () => API.get("/quizzes");
 export const fetchPlanner = () => API.get("/planner");
 export const sendChat = (payload) => API.post("/chat", payload);
+
+// Stream a chat answer over Server-Sent Events. Handlers: onSources(list), onToken(text).
+export const streamChat = async (payload, { onSources, onToken } = {}) => {
+  const res = await fetch(`${API.defaults.baseURL}/chat/stream`, {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify(payload),
+  });
+  if (!res.ok) throw new Error(`Chat failed: ${res.status}`);
+  const reader = res.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = "";
+  for (;;) {
+    const { value, done } = await reader.read();
+    if (done) return;
+    buffer += decoder.decode(value, { stream: true });
+    let sep;
+    while ((sep = buffer.indexOf("\n\n")) !== -1) {
+      const raw = buffer.slice(0, sep);
+      buffer = buffer.slice(sep + 2);
+      const event = (raw.match(/^event: (.*)$/m) || [])[1];
+      const data = JSON.parse((raw.match(/^data: (.*)$/m) || [])[1] || "null");
+      if (event === "sources") onSources && onSources(data);
+      else if (event === "token") onToken && onToken(data);
+      else if (event === "error") throw new Error(data.detail);
+      else if (event === "done") return;
+    }
+  }
+};
 export const runDemo = () => API.post('/run_demo', {}, { timeout: LONG_TIMEOUT });
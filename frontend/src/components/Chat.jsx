@@ -1,5 +1,5 @@
 import React, { useState } from "react";
-import { sendChat } from "../api";
+import { streamChat } from "../api";
 
 export default function Chat(){
   const [q, setQ] = useState("");
@@ -10,10 +10,13 @@ export default function Chat(){
   const ask = async () => {
     if(!q) return;
     setLoading(true);
+    setAns("");
     try{
-      const res = await sendChat({ question: q, chat_history: history });
-      setAns(res.data.answer);
-      setHistory(h => [...h, [q, res.data.answer]]);
+      let answer = "";
+      await streamChat({ question: q, chat_history: history }, {
+        onToken: (t) => { answer += t; setAns(answer); },
+      });
+      setHistory(h => [...h, [q, answer]]);
     }catch(e){
       console.error(e);
       setAns("Error contacting server.");
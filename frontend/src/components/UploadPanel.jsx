@@ -1,5 +1,5 @@
 import React, { useState } from "react";
-import { uploadPdf, generateAll, runDemo } from "../api";
+import { uploadPdf, generateAll, waitForJob, runDemo } from "../api";
 
 export default function UploadPanel({ onDone }){
   const [file, setFile] = useState(null);
@@ -11,7 +11,12 @@ export default function UploadPanel({ onDone }){
     try{
       await uploadPdf(file);
       setStatus("Uploaded. Generating...");
-      await generateAll();
+      const { data } = await generateAll();
+      await waitForJob(data.job_id, (job) => {
+        const { done, total } = job.progress;
+        const eta = job.eta_seconds != null ? ` (~${Math.round(job.eta_seconds)}s left)` : "";
+        setStatus(`Generating... ${done}/${total}${eta}`);
+      });
       setStatus("Ready");
       onDone && onDone();
     }catch(e){